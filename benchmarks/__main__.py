@@ -0,0 +1,4 @@
+from .runner import run
+
+
+run()
@@ -0,0 +1,105 @@
+from lighthouse.haproxy.balancer import HAProxy
+from lighthouse.haproxy.config import HAProxyConfig
+from lighthouse.haproxy.control import HAProxyControl
+from lighthouse.haproxy.stanzas.backend import BackendStanza
+from lighthouse.haproxy.stanzas.stanza import Stanza
+
+from .fixtures import make_clusters, make_stats_response
+from .harness import Benchmark
+
+
+HAPROXY_VERSION = (1, 8, 0)
+
+
+class CannedStatsControl(HAProxyControl):
+    """
+    HAProxyControl that answers "show stat" with a fixed response and
+    accepts any node updates, so that the parsing and sync logic can be
+    timed without a running HAProxy.
+    """
+
+    def __init__(self, stats_response):
+        super(CannedStatsControl, self).__init__(
+            "/dev/null", "/dev/null", "/dev/null"
+        )
+        self.stats_response = stats_response
+
+    def send_command(self, command):
+        """
+        Returns the canned stats response regardless of the command.
+        """
+        return self.stats_response
+
+    def update_nodes(self, to_enable, to_disable):
+        """
+        Pretends the given nodes were all enabled or disabled just fine.
+        """
+        return []
+
+
+def make_config():
+    """
+    Returns an HAProxyConfig with global and defaults stanzas along the
+    lines of the ones in the examples.
+    """
+    global_stanza = Stanza("global")
+    global_stanza.add_lines([
+        "maxconn 4096",
+        "stats socket /var/run/haproxy.sock mode 600 level admin",
+        "stats timeout 2m",
+    ])
+    defaults_stanza = Stanza("defaults")
+    defaults_stanza.add_lines([
+        "timeout connect 5000",
+        "timeout client 50000",
+        "timeout server 50000",
+    ])
+
+    return HAProxyConfig(global_stanza, defaults_stanza)
+
+
+def get_benchmarks(cluster_count, node_count):
+    """
+    Returns the config generation and node sync benchmarks for the given
+    number of clusters with the given number of nodes each.
+    """
+    clusters = make_clusters(cluster_count, node_count)
+    params = {"clusters": cluster_count, "nodes": node_count}
+
+    config = make_config()
+
+    def generate():
+        config.stanza_cache = {}
+        config.generate(clusters, version=HAPROXY_VERSION)
+
+    cached_config = make_config()
+    cached_config.generate(clusters, version=HAPROXY_VERSION)
+
+    def generate_cached():
+        cached_config.generate(clusters, version=HAPROXY_VERSION)
+
+    def render_backends():
+        for cluster in clusters:
+            str(BackendStanza(cluster))
+
+    control = CannedStatsControl(make_stats_response(clusters))
+
+    balancer = HAProxy()
+    balancer.control = control
+
+    def sync_nodes():
+        balancer.restart_required = False
+        balancer.sync_nodes(clusters)
+
+    return [
+        Benchmark("generate", generate, **params),
+        Benchmark("generate_cached", generate_cached, **params),
+        Benchmark("render_backends", render_backends, **params),
+        Benchmark("parse_stats", control.get_active_nodes, **params),
+        Benchmark(
+            "get_current_nodes",
+            lambda: balancer.get_current_nodes(clusters),
+            **params
+        ),
+        Benchmark("sync_nodes", sync_nodes, **params),
+    ]
@@ -0,0 +1,80 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from lighthouse.haproxy.balancer import HAProxy
+from lighthouse.haproxy.control import HAProxyControl
+from lighthouse.haproxy.slots import SlotPool
+
+from .fakehaproxy import FakeHAProxy
+from .fixtures import make_clusters
+from .harness import Benchmark
+
+
+# seconds the fake HAProxy takes to answer each request line
+DEFAULT_LATENCY = .0002
+
+
+def start_fake_haproxy(clusters, latency):
+    """
+    Starts a FakeHAProxy listing the given clusters' nodes on a socket in a
+    temporary directory, both cleaned up at exit.
+    """
+    directory = tempfile.mkdtemp()
+    haproxy = FakeHAProxy(
+        os.path.join(directory, "haproxy.sock"), latency=latency
+    )
+    haproxy.add_clusters(clusters)
+    haproxy.start()
+
+    atexit.register(shutil.rmtree, directory, True)
+    atexit.register(haproxy.stop)
+
+    return haproxy
+
+
+def get_benchmarks(cluster_count, node_count):
+    """
+    Returns benchmarks of the HAProxy control socket paths against a fake
+    HAProxy listing every node of the given number of clusters with the
+    given number of nodes each, both with and without interactive mode.
+    """
+    clusters = make_clusters(cluster_count, node_count)
+    haproxy = start_fake_haproxy(clusters, DEFAULT_LATENCY)
+
+    slots = [
+        (cluster.name, SlotPool.slot_name(number + 1), node.ip, node.port)
+        for cluster in clusters
+        for number, node in enumerate(cluster.nodes)
+    ]
+
+    benchmarks = []
+    for interactive in (False, True):
+        params = {
+            "clusters": cluster_count, "nodes": node_count,
+            "latency": DEFAULT_LATENCY, "interactive": interactive,
+        }
+
+        control = HAProxyControl(
+            "/dev/null", haproxy.socket_path, "/dev/null",
+            interactive=interactive
+        )
+        balancer = HAProxy()
+        balancer.control = control
+
+        def sync_nodes(balancer=balancer):
+            balancer.restart_required = False
+            balancer.sync_nodes(clusters)
+
+        benchmarks.extend([
+            Benchmark("show_stat", control.get_active_nodes, **params),
+            Benchmark("sync_nodes", sync_nodes, **params),
+            Benchmark(
+                "update_slots",
+                lambda control=control: control.update_slots(slots, []),
+                **params
+            ),
+        ])
+
+    return benchmarks
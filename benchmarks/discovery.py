@@ -0,0 +1,288 @@
+import threading
+import time
+
+from lighthouse.cluster import Cluster
+from lighthouse.discovery import Discovery
+from lighthouse.service import Service
+from lighthouse.zookeeper import ZookeeperDiscovery
+
+from .fakezk import FakeZookeeper, FakeKazooClient
+from .fixtures import make_clusters
+from .harness import Benchmark
+
+
+BASE_PATH = "/lighthouse"
+
+# round trip time between the writer and the ZooKeeper ensemble, in seconds
+DEFAULT_LATENCY = .001
+
+# fraction of each cluster's reporters that flap in the churn benchmarks
+CHURN_FRACTION = .1
+
+# seconds to wait for changes to reach the writer before giving up
+PROPAGATION_TIMEOUT = 60
+
+# number of ports of the service reported up and down in the report benchmarks
+REPORT_PORT_COUNT = 20
+
+
+class FakeZookeeperDiscovery(ZookeeperDiscovery):
+    """
+    ZooKeeper discovery method that connects to a FakeZookeeper rather than
+    a real ensemble.
+    """
+
+    def __init__(self, server):
+        super(FakeZookeeperDiscovery, self).__init__()
+        self.server = server
+
+    def connect(self):
+        """
+        Creates a FakeKazooClient and starts its session.
+        """
+        self.client = FakeKazooClient(self.server, hosts=",".join(self.hosts))
+
+        self.client.add_listener(self.handle_connection_change)
+        self.client.start_async()
+
+
+class Reporter(object):
+    """
+    A simulated reporter, with its own session, reporting a single node up
+    or down by creating or deleting the node's ephemeral znode.
+
+    Only the writer is given latency, so that the time taken to make many
+    reporters flap doesn't count towards the propagation time.
+    """
+
+    def __init__(self, server, cluster, node):
+        self.server = server
+        self.node = node
+        self.path = "/".join([BASE_PATH, cluster.name, node.name])
+        self.data = node.serialize().encode()
+
+        self.client = FakeKazooClient(server, latency=0)
+        self.client.start()
+        self.is_up = False
+
+    def up(self):
+        """
+        Reports the node as up.
+        """
+        self.client.create(
+            self.path, value=self.data, ephemeral=True, makepath=True
+        )
+        self.is_up = True
+
+    def down(self):
+        """
+        Reports the node as down.
+        """
+        self.client.delete(self.path)
+        self.is_up = False
+
+    def expire(self):
+        """
+        Expires the reporter's session (taking its node down with it) and
+        starts a new one.
+        """
+        self.server.expire_session(self.client.client_id[0])
+        self.client.start()
+        self.is_up = False
+
+
+class ChurnScenario(object):
+    """
+    A fake ZooKeeper with a reporter for every node of the given number of
+    clusters, and a writer-side discovery method watching the clusters.
+    """
+
+    def __init__(self, cluster_count, node_count, latency=DEFAULT_LATENCY):
+        self.server = FakeZookeeper(latency=latency)
+        self.condition = threading.Condition()
+
+        self.reporters = {}
+        self.clusters = []
+        for cluster in make_clusters(cluster_count, node_count):
+            self.reporters[cluster.name] = [
+                Reporter(self.server, cluster, node) for node in cluster.nodes
+            ]
+            for reporter in self.reporters[cluster.name]:
+                reporter.up()
+
+            watched = Cluster()
+            watched.name = cluster.name
+            self.clusters.append(watched)
+
+        self.discovery = FakeZookeeperDiscovery(self.server)
+        self.discovery.apply_config({"hosts": ["fake"], "path": BASE_PATH})
+        self.discovery.connect()
+
+        for cluster in self.clusters:
+            self.discovery.start_watching(cluster, self.nodes_changed)
+
+        self.wait_for_writer()
+
+    def nodes_changed(self, added, removed):
+        """
+        Discovery callback, wakes up anything waiting on the writer's
+        clusters.
+        """
+        with self.condition:
+            self.condition.notify_all()
+
+    def writer_caught_up(self):
+        """
+        Returns True if the nodes of the writer's clusters match the nodes
+        of the reporters that are up.
+        """
+        for cluster in self.clusters:
+            expected = set(
+                reporter.node.name
+                for reporter in self.reporters[cluster.name]
+                if reporter.is_up
+            )
+            if set(node.name for node in cluster.nodes) != expected:
+                return False
+
+        return True
+
+    def wait_for_writer(self):
+        """
+        Blocks until the writer's clusters have caught up with the reporters.
+        """
+        deadline = time.time() + PROPAGATION_TIMEOUT
+
+        with self.condition:
+            while not self.writer_caught_up():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError("Changes never reached the writer.")
+                self.condition.wait(remaining)
+
+    def flap(self, reporters):
+        """
+        Toggles the given reporters up or down and waits for the writer to
+        catch up.
+        """
+        for reporter in reporters:
+            if reporter.is_up:
+                reporter.down()
+            else:
+                reporter.up()
+
+        self.wait_for_writer()
+
+    def expire(self, reporters):
+        """
+        Expires the sessions of the given reporters, waits for the writer to
+        see their nodes go, then brings them back and waits again.
+        """
+        for reporter in reporters:
+            reporter.expire()
+
+        self.wait_for_writer()
+
+        for reporter in reporters:
+            reporter.up()
+
+        self.wait_for_writer()
+
+    def churners(self):
+        """
+        Returns the `CHURN_FRACTION` of each cluster's reporters (at least
+        one per cluster) that flap in the churn benchmarks.
+        """
+        churners = []
+        for reporters in self.reporters.values():
+            count = max(1, int(len(reporters) * CHURN_FRACTION))
+            churners.extend(reporters[:count])
+
+        return churners
+
+
+class MultiPortReporter(object):
+    """
+    A reporter-side discovery method reporting the present node of a service
+    with many ports, all of which are flipped up or down at once.
+    """
+
+    def __init__(self, port_count, latency=DEFAULT_LATENCY):
+        self.server = FakeZookeeper(latency=latency)
+
+        self.service = Service()
+        self.service.name = "multiport"
+        self.ports = list(range(8000, 8000 + port_count))
+        self.is_up = False
+
+        self.discovery = FakeZookeeperDiscovery(self.server)
+        self.discovery.apply_config({"hosts": ["fake"], "path": BASE_PATH})
+        self.discovery.connect()
+
+    def flip(self, batched):
+        """
+        Reports the service up on all of its ports if it's down and vice
+        versa, either with a single batch or port by port.
+        """
+        up_ports, down_ports = [], self.ports
+        if not self.is_up:
+            up_ports, down_ports = down_ports, up_ports
+
+        if batched:
+            self.discovery.report_batch(self.service, up_ports, down_ports)
+        else:
+            Discovery.report_batch(
+                self.discovery, self.service, up_ports, down_ports
+            )
+
+        self.is_up = not self.is_up
+
+    def reported_ports(self):
+        """
+        Returns the number of the service's znodes that exist.
+        """
+        path = "/".join([BASE_PATH, self.service.name])
+        if not self.server.exists(path):
+            return 0
+
+        return len(self.server.get_children(path))
+
+
+def get_benchmarks(cluster_count, node_count):
+    """
+    Returns benchmarks of how long it takes for reporter changes to reach
+    the writer's clusters, for the given number of clusters with the given
+    number of nodes (i.e. reporters) each, and of how long it takes for a
+    reporter to report a change to many ports one by one and as a batch.
+    """
+    scenario = ChurnScenario(
+        cluster_count, node_count, latency=DEFAULT_LATENCY
+    )
+    params = {
+        "clusters": cluster_count, "nodes": node_count,
+        "latency": DEFAULT_LATENCY,
+    }
+
+    one = scenario.reporters[scenario.clusters[0].name][:1]
+    churners = scenario.churners()
+
+    reporter = MultiPortReporter(REPORT_PORT_COUNT, latency=DEFAULT_LATENCY)
+    report_params = {"ports": REPORT_PORT_COUNT, "latency": DEFAULT_LATENCY}
+
+    return [
+        Benchmark("propagate_one", lambda: scenario.flap(one), **params),
+        Benchmark(
+            "propagate_churn", lambda: scenario.flap(churners), **params
+        ),
+        Benchmark(
+            "session_expiry", lambda: scenario.expire(churners), **params
+        ),
+        Benchmark(
+            "report_each", lambda: reporter.flip(batched=False),
+            **report_params
+        ),
+        Benchmark(
+            "report_batch", lambda: reporter.flip(batched=True),
+            **report_params
+        ),
+    ]
@@ -0,0 +1,345 @@
+import collections
+import errno
+import logging
+import os
+import socket
+import threading
+import time
+
+from .fixtures import STATS_FIELDS
+
+
+PROMPT = b"\n> "
+
+UNKNOWN_COMMAND = (
+    "Unknown command. Please enter one of the following commands only :\n"
+    "  help           : this message\n"
+    "  prompt         : toggle interactive mode with prompt\n"
+    "  quit           : disconnect\n"
+    "  show info      : report information about the running process\n"
+    "  show stat      : report counters for each proxy and server\n"
+    "  disable server : put a server or several servers in maintenance mode\n"
+    "  enable server  : re-enable a server that was previously in maintenance"
+    " mode\n"
+    "  set server     : change a server's state, weight or address\n"
+)
+
+# backlog of pending connections on the listening socket
+LISTEN_BACKLOG = 128
+
+
+logger = logging.getLogger(__name__)
+
+
+class FakeServer(object):
+    """
+    A server listed in one of the fake HAProxy's backends.
+    """
+
+    def __init__(self, name, ip, port, index):
+        self.name = name
+        self.ip = ip
+        self.port = port
+        self.index = index
+        self.state = "READY"
+
+    @property
+    def status(self):
+        """
+        The status shown for the server in "show stat" output.
+        """
+        return "MAINT" if self.state == "MAINT" else "UP"
+
+
+class FakeHAProxy(object):
+    """
+    Emulates the UNIX stats socket of a running HAProxy process.
+
+    Answers the "show info", "show stat", "enable server", "disable server"
+    and "set server" commands (semicolon-separated commands included) for
+    the backends added via `add_backend()`, in both the default
+    one-command-per-connection mode and the interactive "prompt" mode.
+
+    Each request line is answered after `latency` seconds plus
+    `command_latency` seconds for each command on the line.  Each "show stat"
+    row is padded with `row_padding` extra bytes, for trying out larger
+    responses.
+    """
+
+    def __init__(self, socket_path, version="1.8.0", latency=0,
+                 command_latency=0, row_padding=0):
+        self.socket_path = socket_path
+        self.version = version
+        self.latency = latency
+        self.command_latency = command_latency
+        self.row_padding = row_padding
+
+        self.lock = threading.Lock()
+        self.backends = collections.OrderedDict()
+        self.counts = collections.Counter()
+
+        self.listener = None
+        self.thread = None
+
+    def add_backend(self, name, servers):
+        """
+        Adds a backend with the given list of (<name>, <ip>, <port>) servers,
+        all enabled.
+        """
+        with self.lock:
+            self.backends[name] = collections.OrderedDict(
+                (server_name, FakeServer(server_name, ip, port, index + 1))
+                for index, (server_name, ip, port) in enumerate(servers)
+            )
+
+    def add_clusters(self, clusters):
+        """
+        Adds a backend for each of the given clusters, with a server for each
+        of the cluster's nodes.
+        """
+        for cluster in clusters:
+            self.add_backend(cluster.name, [
+                (node.name, node.ip, node.port) for node in cluster.nodes
+            ])
+
+    def start(self):
+        """
+        Binds the socket and starts accepting connections on a background
+        thread.
+        """
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(LISTEN_BACKLOG)
+
+        self.thread = threading.Thread(target=self.accept_connections)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops accepting connections and removes the socket file.
+        """
+        if not self.listener:
+            return
+
+        listener, self.listener = self.listener, None
+        try:
+            listener.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        listener.close()
+        self.thread.join()
+
+        try:
+            os.remove(self.socket_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def accept_connections(self):
+        """
+        Accepts connections until stopped, handling each on its own thread.
+        """
+        while self.listener:
+            try:
+                connection, _ = self.listener.accept()
+            except socket.error:
+                return
+
+            thread = threading.Thread(
+                target=self.handle_connection, args=(connection,)
+            )
+            thread.daemon = True
+            thread.start()
+
+    def handle_connection(self, connection):
+        """
+        Answers the request lines sent on the given connection.
+
+        Outside of interactive mode the connection is closed after the first
+        line is answered, as HAProxy does.
+        """
+        with self.lock:
+            self.counts["connections"] += 1
+        reader = connection.makefile("rb")
+        interactive = False
+
+        try:
+            for line in reader:
+                commands = [
+                    command.strip()
+                    for command in line.decode().strip().split(";")
+                    if command.strip()
+                ]
+                if commands == ["quit"]:
+                    break
+
+                if self.latency or self.command_latency:
+                    time.sleep(
+                        self.latency + self.command_latency * len(commands)
+                    )
+
+                output, interactive = self.run_commands(commands, interactive)
+                connection.sendall(output)
+
+                if not interactive:
+                    break
+        except socket.error:
+            logger.debug("Fake HAProxy connection errored.", exc_info=True)
+        finally:
+            reader.close()
+            connection.close()
+
+    def run_commands(self, commands, interactive):
+        """
+        Runs the given commands, returning the bytes to send back and whether
+        or not the connection is now in interactive mode.
+        """
+        output = bytearray()
+
+        for command in commands:
+            if command == "prompt":
+                interactive = not interactive
+                if interactive:
+                    output.extend(PROMPT)
+                continue
+
+            output.extend(self.run_command(command).encode())
+            if interactive:
+                output.extend(PROMPT)
+
+        return bytes(output), interactive
+
+    def run_command(self, command):
+        """
+        Returns the output of a single command.
+        """
+        with self.lock:
+            self.counts["commands"] += 1
+
+        words = command.split()
+
+        if words[:2] == ["show", "info"]:
+            return self.show_info()
+        if words[:2] == ["show", "stat"]:
+            return self.show_stat()
+        if len(words) == 3 and words[0] in ("enable", "disable"):
+            if words[1] == "server":
+                return self.set_state(
+                    words[2], "READY" if words[0] == "enable" else "MAINT"
+                )
+        if len(words) >= 5 and words[:2] == ["set", "server"]:
+            return self.set_server(words[2], words[3:])
+
+        return UNKNOWN_COMMAND
+
+    def show_info(self):
+        """
+        Returns the output of "show info".
+        """
+        with self.lock:
+            server_count = sum(len(s) for s in self.backends.values())
+
+        return "".join("%s: %s\n" % pair for pair in [
+            ("Name", "HAProxy"),
+            ("Version", self.version),
+            ("Release_date", "2017/11/26"),
+            ("Nbproc", 1),
+            ("Process_num", 1),
+            ("Pid", os.getpid()),
+            ("Uptime_sec", 0),
+            ("Maxconn", 4096),
+            ("CurrConns", 0),
+            ("Servers", server_count),
+        ])
+
+    def show_stat(self):
+        """
+        Returns the "show stat" CSV of all of the servers.
+        """
+        lines = ["# " + ",".join(STATS_FIELDS) + ","]
+
+        with self.lock:
+            for backend_index, (backend, servers) in enumerate(
+                    self.backends.items()
+            ):
+                for server in servers.values():
+                    lines.append(
+                        self.stat_row(backend_index + 1, backend, server)
+                    )
+
+        return "\n".join(lines) + "\n\n"
+
+    def stat_row(self, backend_index, backend, server):
+        """
+        Returns the "show stat" CSV row for the given server.
+        """
+        values = dict((field, "0") for field in STATS_FIELDS)
+        values.update({
+            "pxname": backend,
+            "svname": server.name,
+            "status": server.status,
+            "weight": "1",
+            "act": "1",
+            "pid": "1",
+            "iid": str(backend_index),
+            "sid": str(server.index),
+            "type": "2",
+            "addr": "%s:%s" % (server.ip, server.port),
+            "mode": "http",
+            "check_desc": "Layer7 check passed" + "." * self.row_padding,
+        })
+
+        return ",".join(values[field] for field in STATS_FIELDS) + ","
+
+    def get_server(self, path):
+        """
+        Returns the server for the given "<backend>/<server>" path, or an
+        error message string if there's no such server.
+        """
+        backend, _, name = path.partition("/")
+        if backend not in self.backends:
+            return "No such backend.\n"
+        if name not in self.backends[backend]:
+            return "No such server.\n"
+
+        return self.backends[backend][name]
+
+    def set_state(self, path, state):
+        """
+        Sets the admin state of the given server.
+        """
+        with self.lock:
+            server = self.get_server(path)
+            if not isinstance(server, FakeServer):
+                return server
+
+            server.state = state
+
+        return ""
+
+    def set_server(self, path, args):
+        """
+        Handles the "state" and "addr" forms of the "set server" command.
+        """
+        if args[0] == "state" and args[1] in ("ready", "maint", "drain"):
+            return self.set_state(path, args[1].upper())
+        if args[0] != "addr":
+            return UNKNOWN_COMMAND
+
+        with self.lock:
+            server = self.get_server(path)
+            if not isinstance(server, FakeServer):
+                return server
+
+            old_ip, old_port = server.ip, server.port
+            server.ip = args[1]
+            if len(args) >= 4 and args[2] == "port":
+                server.port = int(args[3])
+
+        return (
+            "IP changed from '%s' to '%s', port changed from '%s' to '%s'"
+            " by 'stats socket command'\n" % (
+                old_ip, server.ip, old_port, server.port
+            )
+        )
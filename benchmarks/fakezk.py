@@ -0,0 +1,699 @@
+import collections
+import itertools
+import logging
+import threading
+import time
+
+from six.moves import queue
+
+from kazoo import exceptions
+from kazoo.client import KazooState
+from kazoo.protocol.states import (
+    EventType, KeeperState, WatchedEvent, ZnodeStat
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class Znode(object):
+    """
+    A single node in the fake ZooKeeper's tree.
+
+    Ephemeral znodes have the id of the session that owns them as their
+    `owner`, persistent ones have an `owner` of zero.
+    """
+
+    def __init__(self, data, owner, zxid):
+        self.data = data
+        self.owner = owner
+        self.children = set()
+
+        self.version = 0
+        self.cversion = 0
+
+        self.czxid = zxid
+        self.mzxid = zxid
+        self.pzxid = zxid
+        self.ctime = self.mtime = int(time.time() * 1000)
+
+    def stat(self):
+        """
+        Returns a kazoo ZnodeStat for this znode.
+        """
+        return ZnodeStat(
+            czxid=self.czxid, mzxid=self.mzxid,
+            ctime=self.ctime, mtime=self.mtime,
+            version=self.version, cversion=self.cversion, aversion=0,
+            ephemeralOwner=self.owner, dataLength=len(self.data),
+            numChildren=len(self.children), pzxid=self.pzxid
+        )
+
+
+def split_path(path):
+    """
+    Splits the given znode path into a (<parent path>, <name>) tuple.
+    """
+    parent, _, name = path.rpartition("/")
+
+    return parent or "/", name
+
+
+class FakeZookeeper(object):
+    """
+    In-memory stand-in for a ZooKeeper ensemble, for driving the ZooKeeper
+    discovery method without a real server.
+
+    Keeps a tree of znodes (including ephemeral ones tied to client
+    sessions) and supports one-shot data and child watches, versioned
+    updates and atomic multi-op transactions.  Every operation and watch
+    notification of a `FakeKazooClient` is delayed by the client's latency,
+    which defaults to the server's `latency` (in seconds).
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+
+        self.lock = threading.RLock()
+        self.znodes = {"/": Znode(b"", 0, 0)}
+        self.zxids = itertools.count(1)
+
+        self.session_ids = itertools.count(1)
+        self.sessions = {}
+
+        self.data_watches = collections.defaultdict(list)
+        self.child_watches = collections.defaultdict(list)
+
+    def open_session(self, client):
+        """
+        Starts a new session for the given client and returns its id.
+        """
+        with self.lock:
+            session_id = next(self.session_ids)
+            self.sessions[session_id] = client
+
+        return session_id
+
+    def close_session(self, session_id):
+        """
+        Ends the given session, deleting any ephemeral znodes it owned and
+        dropping any watches its client had set.
+        """
+        with self.lock:
+            client = self.sessions.pop(session_id, None)
+            if client is None:
+                return
+
+            for watches in itertools.chain(
+                    self.data_watches.values(), self.child_watches.values()
+            ):
+                watches[:] = [
+                    (owner, fn) for owner, fn in watches if owner is not client
+                ]
+
+            ephemerals = sorted(
+                (path for path, znode in self.znodes.items()
+                 if znode.owner == session_id),
+                reverse=True
+            )
+            self.run([("delete", path, -1) for path in ephemerals])
+
+    def expire_session(self, session_id):
+        """
+        Expires the given session, as happens when a client can't reach the
+        ensemble for longer than its session timeout.
+
+        The session's ephemeral znodes are deleted and its client is told the
+        session was lost.
+        """
+        with self.lock:
+            client = self.sessions.get(session_id)
+            self.close_session(session_id)
+
+        if client:
+            client.session_lost()
+
+    def add_watch(self, kind, path, client, fn):
+        """
+        Sets a one-shot watch of the given kind ("data" or "child") on the
+        given path, which calls `fn` via the given client once triggered.
+        """
+        watches = self.data_watches if kind == "data" else self.child_watches
+        with self.lock:
+            watches[path].append((client, fn))
+
+    def get(self, path):
+        """
+        Returns the (<data>, <ZnodeStat>) of the znode at the given path.
+        """
+        with self.lock:
+            znode = self.get_znode(path)
+            return znode.data, znode.stat()
+
+    def get_children(self, path):
+        """
+        Returns a list of the names of the children of the given znode.
+        """
+        with self.lock:
+            return list(self.get_znode(path).children)
+
+    def exists(self, path):
+        """
+        Returns the ZnodeStat of the znode at the given path, or None if there
+        is no such znode.
+        """
+        with self.lock:
+            znode = self.znodes.get(path)
+            return znode.stat() if znode else None
+
+    def get_znode(self, path):
+        """
+        Returns the znode at the given path, raising NoNodeError if there is
+        no such znode.  Must be called with the `lock` held.
+        """
+        if path not in self.znodes:
+            raise exceptions.NoNodeError(path)
+
+        return self.znodes[path]
+
+    def run(self, operations, session_id=0):
+        """
+        Atomically applies the given list of operations on behalf of the
+        given session.
+
+        Operations are tuples along the lines of the ones kazoo sends in a
+        transaction: ("create", <path>, <value>, <ephemeral>, <makepath>),
+        ("delete", <path>, <version>), ("set_data", <path>, <value>,
+        <version>) and ("check", <path>, <version>).
+
+        Returns the list of results, one per operation.  If an operation
+        fails the ones applied before it are undone and the error is raised,
+        with the index of the failed operation set as its `index` attribute.
+        Watches are only triggered if all of the operations were applied.
+        """
+        with self.lock:
+            results = []
+            events = []
+            undos = []
+
+            for index, operation in enumerate(operations):
+                handler = getattr(self, "apply_" + operation[0])
+                try:
+                    result = handler(
+                        session_id, events, undos, *operation[1:]
+                    )
+                except exceptions.ZookeeperError as e:
+                    for undo in reversed(undos):
+                        undo()
+                    e.index = index
+                    raise
+                results.append(result)
+
+            self.trigger_watches(events)
+
+        return results
+
+    def apply_create(self, session_id, events, undos, path, value,
+                     ephemeral=False, makepath=False):
+        """
+        Creates a znode, and any missing parent znodes if `makepath` is set.
+        """
+        if path in self.znodes:
+            raise exceptions.NodeExistsError(path)
+
+        parent_path, name = split_path(path)
+        if parent_path not in self.znodes:
+            if not makepath:
+                raise exceptions.NoNodeError(parent_path)
+            self.apply_create(
+                session_id, events, undos, parent_path, b"", makepath=True
+            )
+
+        parent = self.znodes[parent_path]
+        if parent.owner:
+            raise exceptions.NoChildrenForEphemeralsError(path)
+
+        zxid = next(self.zxids)
+        self.znodes[path] = Znode(
+            value or b"", session_id if ephemeral else 0, zxid
+        )
+        parent.children.add(name)
+        parent.cversion += 1
+        parent.pzxid = zxid
+
+        def undo():
+            del self.znodes[path]
+            parent.children.discard(name)
+            parent.cversion -= 1
+
+        undos.append(undo)
+        events.extend([
+            ("data", EventType.CREATED, path),
+            ("child", EventType.CHILD, parent_path),
+        ])
+
+        return path
+
+    def apply_delete(self, session_id, events, undos, path, version=-1):
+        """
+        Deletes the childless znode at the given path.
+        """
+        znode = self.get_znode(path)
+        if version != -1 and version != znode.version:
+            raise exceptions.BadVersionError(path)
+        if znode.children:
+            raise exceptions.NotEmptyError(path)
+
+        parent_path, name = split_path(path)
+        parent = self.znodes[parent_path]
+
+        del self.znodes[path]
+        parent.children.discard(name)
+        parent.cversion += 1
+
+        def undo():
+            self.znodes[path] = znode
+            parent.children.add(name)
+            parent.cversion -= 1
+
+        undos.append(undo)
+        events.extend([
+            ("data", EventType.DELETED, path),
+            ("child", EventType.DELETED, path),
+            ("child", EventType.CHILD, parent_path),
+        ])
+
+        return True
+
+    def apply_set_data(self, session_id, events, undos, path, value,
+                       version=-1):
+        """
+        Sets the data of the znode at the given path.
+        """
+        znode = self.get_znode(path)
+        if version != -1 and version != znode.version:
+            raise exceptions.BadVersionError(path)
+
+        previous = (znode.data, znode.version, znode.mzxid, znode.mtime)
+
+        znode.data = value
+        znode.version += 1
+        znode.mzxid = next(self.zxids)
+        znode.mtime = int(time.time() * 1000)
+
+        def undo():
+            znode.data, znode.version, znode.mzxid, znode.mtime = previous
+
+        undos.append(undo)
+        events.append(("data", EventType.CHANGED, path))
+
+        return znode.stat()
+
+    def apply_check(self, session_id, events, undos, path, version):
+        """
+        Checks that the znode at the given path is at the given version.
+        """
+        if self.get_znode(path).version != version:
+            raise exceptions.BadVersionError(path)
+
+        return True
+
+    def trigger_watches(self, events):
+        """
+        Fires and clears the watches set for the given list of (<watch kind>,
+        <event type>, <path>) events.  Must be called with the `lock` held.
+        """
+        for kind, event_type, path in events:
+            watches = (
+                self.data_watches if kind == "data" else self.child_watches
+            )
+            event = WatchedEvent(event_type, KeeperState.CONNECTED, path)
+            for client, fn in watches.pop(path, []):
+                client.deliver(fn, event)
+
+
+class FakeAsyncResult(object):
+    """
+    Result of an asynchronous request, available once the client's latency
+    has passed since the request was made.
+    """
+
+    def __init__(self, ready_at, value=None, exception=None):
+        self.ready_at = ready_at
+        self.value = value
+        self.exception = exception
+
+    def get(self, block=True, timeout=None):
+        """
+        Waits for the result to be ready and returns it, or raises the error
+        the request failed with.
+        """
+        delay = self.ready_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.exception:
+            raise self.exception
+
+        return self.value
+
+
+class FakeTransaction(object):
+    """
+    Collects operations to run atomically on commit, along the lines of
+    kazoo's TransactionRequest.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.operations = []
+
+    def create(self, path, value=b"", acl=None, ephemeral=False,
+               sequence=False):
+        """
+        Adds a create operation to the transaction.
+        """
+        self.operations.append(("create", path, value, ephemeral))
+
+    def delete(self, path, version=-1):
+        """
+        Adds a delete operation to the transaction.
+        """
+        self.operations.append(("delete", path, version))
+
+    def set_data(self, path, value, version=-1):
+        """
+        Adds a set data operation to the transaction.
+        """
+        self.operations.append(("set_data", path, value, version))
+
+    def check(self, path, version):
+        """
+        Adds a version check operation to the transaction.
+        """
+        self.operations.append(("check", path, version))
+
+    def commit(self):
+        """
+        Runs the transaction's operations.
+
+        Like kazoo, returns a list of results rather than raising errors: if
+        an operation failed its result is the error and the results of the
+        others are RolledBackErrors.
+        """
+        try:
+            return self.client.request(
+                "run", self.operations, self.client.client_id[0]
+            )
+        except exceptions.ZookeeperError as e:
+            results = [
+                exceptions.RolledBackError() for _ in self.operations
+            ]
+            results[getattr(e, "index", 0)] = e
+            return results
+
+
+class FakeHandler(object):
+    """
+    Stand-in for kazoo's threading handler, with just `spawn()`.
+    """
+
+    def spawn(self, func, *args, **kwargs):
+        """
+        Runs the given function in a new daemon thread.
+        """
+        thread = threading.Thread(target=func, args=args, kwargs=kwargs)
+        thread.daemon = True
+        thread.start()
+
+        return thread
+
+
+class FakeKazooClient(object):
+    """
+    Client of a FakeZookeeper, with the parts of KazooClient's interface that
+    Lighthouse uses.
+
+    Each request made by the client takes `latency` seconds (the server's
+    latency by default), as do watch notifications.  Watch functions are
+    called in order on a single thread per client, as with kazoo.
+    """
+
+    def __init__(self, server, hosts=None, latency=None):
+        self.server = server
+        self.hosts = hosts
+        self.latency = server.latency if latency is None else latency
+
+        self.client_id = None
+        self.state = KazooState.LOST
+        self.listeners = []
+
+        self.notifications = queue.Queue()
+        self.notifier = None
+
+        self.handler = FakeHandler()
+
+    @property
+    def connected(self):
+        """
+        Whether or not the client has a session.
+        """
+        return self.state == KazooState.CONNECTED
+
+    def add_listener(self, listener):
+        """
+        Adds a function to be called with the state whenever the client's
+        connection state changes.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Removes a connection state listener.
+        """
+        self.listeners.remove(listener)
+
+    def set_state(self, state):
+        """
+        Updates the client's connection state and calls the listeners.
+        """
+        self.state = state
+        for listener in list(self.listeners):
+            listener(state)
+
+    def start(self, timeout=None):
+        """
+        Opens a session with the server.
+        """
+        self.client_id = (self.server.open_session(self), b"")
+        self.set_state(KazooState.CONNECTED)
+
+    def start_async(self):
+        """
+        Opens a session with the server, returning an already-set event.
+        """
+        self.start()
+
+        started = threading.Event()
+        started.set()
+
+        return started
+
+    def stop(self):
+        """
+        Closes the client's session, deleting its ephemeral znodes.
+        """
+        if not self.connected:
+            return
+
+        self.server.close_session(self.client_id[0])
+        self.set_state(KazooState.LOST)
+
+        if self.notifier:
+            self.notifications.put(None)
+            self.notifier = None
+
+    def close(self):
+        """
+        Nothing to free up, present for compatibility with KazooClient.
+        """
+
+    def set_hosts(self, hosts):
+        """
+        Records the given hosts string, the server stays the same.
+        """
+        self.hosts = hosts
+
+    def session_lost(self):
+        """
+        Called by the server when the client's session expires.
+        """
+        self.set_state(KazooState.LOST)
+
+    def deliver(self, fn, event):
+        """
+        Queues up a call of the given watch function with the given event.
+        """
+        if self.notifier is None:
+            self.notifier = threading.Thread(target=self.notify)
+            self.notifier.daemon = True
+            self.notifier.start()
+
+        self.notifications.put((time.time() + self.latency, fn, event))
+
+    def notify(self):
+        """
+        Calls the queued watch functions, in order, once their notification
+        latency has passed.
+        """
+        while True:
+            notification = self.notifications.get()
+            if notification is None:
+                return
+
+            ready_at, fn, event = notification
+            delay = ready_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            try:
+                fn(event)
+            except Exception:
+                logger.exception("Error in watch function for %s", event.path)
+
+    def begin_request(self):
+        """
+        Checks that the client is connected and waits out the latency of a
+        request.
+        """
+        if not self.connected:
+            raise exceptions.ConnectionClosedError("Connection is closed")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def request(self, method, *args):
+        """
+        Makes a request of the server, waiting out the latency first.
+        """
+        self.begin_request()
+
+        return getattr(self.server, method)(*args)
+
+    def read(self, method, kind, path, watch):
+        """
+        Calls the given read method of the server for the given path and sets
+        a watch of the given kind if a watch function is given, atomically so
+        that no change is missed in between.
+        """
+        with self.server.lock:
+            result = getattr(self.server, method)(path)
+            if watch:
+                self.server.add_watch(kind, path, self, watch)
+
+        return result
+
+    def exists(self, path, watch=None):
+        """
+        Returns the stat of the znode at the given path, or None.
+        """
+        self.begin_request()
+
+        return self.read("exists", "data", path, watch)
+
+    def get(self, path, watch=None):
+        """
+        Returns the (<data>, <stat>) of the znode at the given path.
+        """
+        self.begin_request()
+
+        return self.read("get", "data", path, watch)
+
+    def read_async(self, method, kind, path, watch):
+        """
+        Returns a FakeAsyncResult for the given read.  Unlike the synchronous
+        methods this doesn't block, so many requests can be in flight at
+        once.
+        """
+        if not self.connected:
+            raise exceptions.ConnectionClosedError("Connection is closed")
+
+        ready_at = time.time() + self.latency
+        try:
+            value = self.read(method, kind, path, watch)
+        except exceptions.ZookeeperError as e:
+            return FakeAsyncResult(ready_at, exception=e)
+
+        return FakeAsyncResult(ready_at, value=value)
+
+    def exists_async(self, path, watch=None):
+        """
+        Returns a FakeAsyncResult for fetching the stat of the znode at the
+        given path, or None.
+        """
+        return self.read_async("exists", "data", path, watch)
+
+    def get_async(self, path, watch=None):
+        """
+        Returns a FakeAsyncResult for fetching the given znode's data and
+        stat.
+        """
+        return self.read_async("get", "data", path, watch)
+
+    def get_children(self, path, watch=None, include_data=False):
+        """
+        Returns the list of child names of the znode at the given path, along
+        with the znode's stat if `include_data` is set.
+        """
+        self.begin_request()
+
+        with self.server.lock:
+            children = self.read("get_children", "child", path, watch)
+            if include_data:
+                return children, self.server.exists(path)
+
+        return children
+
+    def create(self, path, value=b"", acl=None, ephemeral=False,
+               sequence=False, makepath=False):
+        """
+        Creates a znode at the given path.
+        """
+        return self.request(
+            "run", [("create", path, value, ephemeral, makepath)],
+            self.client_id[0]
+        )[0]
+
+    def ensure_path(self, path, acl=None):
+        """
+        Creates the persistent znode at the given path (and its parents) if
+        it doesn't exist.
+        """
+        try:
+            self.create(path, makepath=True)
+        except exceptions.NodeExistsError:
+            pass
+
+        return True
+
+    def set(self, path, value, version=-1):
+        """
+        Sets the data of the znode at the given path.
+        """
+        return self.request(
+            "run", [("set_data", path, value, version)], self.client_id[0]
+        )[0]
+
+    def delete(self, path, version=-1, recursive=False):
+        """
+        Deletes the znode at the given path.
+        """
+        return self.request(
+            "run", [("delete", path, version)], self.client_id[0]
+        )[0]
+
+    def transaction(self):
+        """
+        Returns a new FakeTransaction.
+        """
+        return FakeTransaction(self)
@@ -0,0 +1,97 @@
+from lighthouse.cluster import Cluster
+from lighthouse.node import Node
+from lighthouse.peer import Peer
+
+
+BASE_PORT = 8000
+
+# the columns of a "show stat" response, as of HAProxy 1.8
+STATS_FIELDS = (
+    "pxname", "svname", "qcur", "qmax", "scur", "smax", "slim", "stot",
+    "bin", "bout", "dreq", "dresp", "ereq", "econ", "eresp", "wretr",
+    "wredis", "status", "weight", "act", "bck", "chkfail", "chkdown",
+    "lastchg", "downtime", "qlimit", "pid", "iid", "sid", "throttle",
+    "lbtot", "tracked", "type", "rate", "rate_lim", "rate_max",
+    "check_status", "check_code", "check_duration", "hrsp_1xx", "hrsp_2xx",
+    "hrsp_3xx", "hrsp_4xx", "hrsp_5xx", "hrsp_other", "hanafail",
+    "req_rate", "req_rate_max", "req_tot", "cli_abrt", "srv_abrt",
+    "comp_in", "comp_out", "comp_byp", "comp_rsp", "lastsess", "last_chk",
+    "last_agt", "qtime", "ctime", "rtime", "ttime", "agent_status",
+    "agent_code", "agent_duration", "check_desc", "agent_desc",
+    "check_rise", "check_fall", "check_health", "agent_rise", "agent_fall",
+    "agent_health", "addr", "cookie", "mode", "algo", "conn_rate",
+    "conn_rate_max", "conn_tot", "intercepted", "dcon", "dses",
+)
+
+
+def make_node(cluster_index, node_index):
+    """
+    Returns a Node with a unique, made up host and IP for the given indexes.
+    """
+    ip = "10.%d.%d.%d" % (
+        cluster_index % 256, node_index // 256 % 256, node_index % 256
+    )
+    host = "node-%d-%d.example.com" % (cluster_index, node_index)
+
+    return Node(
+        host, ip, BASE_PORT + cluster_index,
+        peer=Peer(host, ip), metadata={"index": node_index}
+    )
+
+
+def make_clusters(cluster_count, node_count, mode="http"):
+    """
+    Returns a list of `cluster_count` clusters, each with `node_count` nodes
+    and an haproxy config along the lines of the ones in the examples.
+    """
+    clusters = []
+
+    for cluster_index in range(cluster_count):
+        cluster = Cluster()
+        cluster.name = "cluster%d" % cluster_index
+        cluster.discovery = "zookeeper"
+        cluster.haproxy = {
+            "port": BASE_PORT + cluster_index,
+            "frontend": ["mode %s" % mode],
+            "backend": ["mode %s" % mode, "balance roundrobin"],
+            "server_options": "check inter 2000 rise 2 fall 3",
+        }
+        cluster.nodes = [
+            make_node(cluster_index, node_index)
+            for node_index in range(node_count)
+        ]
+        clusters.append(cluster)
+
+    return clusters
+
+
+def make_stats_response(clusters, down_every=10):
+    """
+    Returns the content of a "show stat -1 4 -1" response listing every node
+    of the given clusters as a server, with every `down_every`-th server
+    marked as in maintenance.
+
+    Like HAProxy's, each line ends with a trailing comma.  The trailing
+    newlines are left off, as they are by `HAProxyControl.send_command()`.
+    """
+    lines = ["# " + ",".join(STATS_FIELDS) + ","]
+
+    for cluster in clusters:
+        for index, node in enumerate(cluster.nodes):
+            values = dict((field, "0") for field in STATS_FIELDS)
+            values.update({
+                "pxname": cluster.name,
+                "svname": node.name,
+                "status": "MAINT" if index % down_every == 0 else "UP",
+                "weight": "1",
+                "act": "1",
+                "type": "2",
+                "addr": "%s:%s" % (node.ip, node.port),
+                "mode": "http",
+                "check_desc": "Layer7 check passed",
+            })
+            lines.append(
+                ",".join(values[field] for field in STATS_FIELDS) + ","
+            )
+
+    return "\n".join(lines)
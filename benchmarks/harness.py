@@ -0,0 +1,210 @@
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+
+DEFAULT_REPEAT = 5
+
+# a benchmark that's this much slower (as a fraction) than its baseline
+# counts as a regression
+DEFAULT_THRESHOLD = 0.1
+
+
+logger = logging.getLogger(__name__)
+
+
+class Benchmark(object):
+    """
+    A named function to time along with the parameters (e.g. cluster and
+    node counts) of the data it was set up with.
+
+    The function is called with no arguments, any setup should be done
+    before the Benchmark is created so that it isn't included in the timings.
+    """
+
+    unit = "s"
+
+    def __init__(self, name, fn, **params):
+        self.name = name
+        self.fn = fn
+        self.params = params
+
+    @property
+    def key(self):
+        """
+        Identifier used to match up results of the same benchmark across
+        runs, e.g. "generate[clusters=10,nodes=100]".
+        """
+        return "%s[%s]" % (
+            self.name,
+            ",".join(
+                "%s=%s" % (name, value)
+                for name, value in sorted(self.params.items())
+            )
+        )
+
+
+class MemoryBenchmark(Benchmark):
+    """
+    A benchmark of how much memory is held by the return value of a function
+    (e.g. a list of deserialized nodes), rather than how long it takes.
+
+    The bytes allocated while the function runs that are still in use once
+    it has returned are counted, via `tracemalloc`.
+    """
+
+    unit = "bytes"
+
+
+def run_benchmark(benchmark, repeat=DEFAULT_REPEAT, number=1):
+    """
+    Times the given benchmark's function (or for MemoryBenchmarks, measures
+    the memory its result holds) and returns a dictionary of the results.
+
+    The function is called `number` times in a row, `repeat` times over.
+    The "min", "mean", "median" and "max" values are the seconds taken by a
+    single call, or the bytes held by a single call's result.
+    """
+    if isinstance(benchmark, MemoryBenchmark):
+        number = 1
+        values = measure_memory(benchmark.fn, repeat)
+    else:
+        timer = timeit.Timer(benchmark.fn)
+        values = [
+            total / number
+            for total in timer.repeat(repeat=repeat, number=number)
+        ]
+    values = sorted(values)
+
+    middle = len(values) // 2
+    if len(values) % 2:
+        median = values[middle]
+    else:
+        median = (values[middle - 1] + values[middle]) / 2.0
+
+    return {
+        "key": benchmark.key,
+        "name": benchmark.name,
+        "params": benchmark.params,
+        "unit": benchmark.unit,
+        "repeat": repeat,
+        "number": number,
+        "min": values[0],
+        "mean": sum(values) / len(values),
+        "median": median,
+        "max": values[-1],
+    }
+
+
+def measure_memory(fn, repeat):
+    """
+    Returns a list of the bytes held by the result of each of `repeat` calls
+    to the given function.
+    """
+    if tracemalloc is None:
+        raise RuntimeError("Measuring memory use needs python 3.4+.")
+
+    sizes = []
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = fn()
+            gc.collect()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+        sizes.append(size)
+
+    return sizes
+
+
+def format_value(value, unit):
+    """
+    Formats a benchmark result value of the given unit for printing.
+    """
+    if unit == MemoryBenchmark.unit:
+        return "%dB" % value
+
+    return "%.6fs" % value
+
+
+def get_environment():
+    """
+    Returns a dictionary describing where the benchmarks were run: the git
+    commit, python version and platform, and when.
+    """
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": "%s %s" % (
+            platform.python_implementation(), platform.python_version()
+        ),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+def write_results(path, results):
+    """
+    Writes the given list of result dictionaries to a JSON file at the given
+    path, along with the environment they were run in.
+    """
+    with open(path, "w") as fd:
+        json.dump(
+            {"environment": get_environment(), "results": results},
+            fd, indent=2, sort_keys=True
+        )
+
+
+def load_results(path):
+    """
+    Loads a results file written by `write_results()`.
+    """
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def compare(baseline, results, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the given list of results against a baseline results file's
+    contents.
+
+    Returns a list of (<key>, <baseline median>, <median>) tuples, one for
+    each benchmark whose median time (or memory) grew by more than
+    `threshold` (as a fraction of the baseline's).  Benchmarks missing from
+    the baseline are ignored.
+    """
+    baseline_medians = dict(
+        (result["key"], result["median"]) for result in baseline["results"]
+    )
+
+    regressions = []
+    for result in results:
+        if result["key"] not in baseline_medians:
+            continue
+
+        old = baseline_medians[result["key"]]
+        if result["median"] > old * (1 + threshold):
+            regressions.append((result["key"], old, result["median"]))
+
+    return regressions
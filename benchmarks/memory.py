@@ -0,0 +1,60 @@
+from lighthouse.node import Node, FORMATS
+from lighthouse.peer import Peer
+
+from .fixtures import BASE_PORT
+from .harness import Benchmark, MemoryBenchmark, tracemalloc
+
+
+def make_payloads(cluster_count, node_count, version=FORMATS["legacy"]):
+    """
+    Returns the serialized nodes of the given number of clusters with the
+    given number of nodes each, as reporters would write them to discovery
+    in the given node format version.
+
+    Node N of every cluster runs on host N, so each host's peer appears in
+    every cluster, and the nodes of each cluster share that service's
+    metadata.
+    """
+    payloads = []
+
+    for cluster_index in range(cluster_count):
+        metadata = {"service": "cluster%d" % cluster_index, "tier": "web"}
+        for node_index in range(node_count):
+            ip = "10.0.%d.%d" % (node_index // 256 % 256, node_index % 256)
+            host = "host-%d.example.com" % node_index
+            node = Node(
+                host, ip, BASE_PORT + cluster_index,
+                peer=Peer(host, ip), metadata=metadata
+            )
+            payloads.append(node.serialize(version))
+
+    return payloads
+
+
+def get_benchmarks(cluster_count, node_count):
+    """
+    Returns benchmarks of the memory held by, and time taken by,
+    deserializing the nodes of the given number of clusters with the given
+    number of nodes each, as a writer does on every refresh, for each of the
+    node formats.
+
+    The memory benchmarks need python 3.4+ and are left out otherwise.
+    """
+    benchmarks = []
+    for format_name, version in sorted(FORMATS.items()):
+        payloads = make_payloads(cluster_count, node_count, version)
+        params = {
+            "clusters": cluster_count, "nodes": node_count,
+            "format": format_name,
+        }
+
+        def deserialize(payloads=payloads):
+            return [Node.deserialize(payload) for payload in payloads]
+
+        benchmarks.append(Benchmark("deserialize", deserialize, **params))
+        if tracemalloc is not None:
+            benchmarks.append(
+                MemoryBenchmark("node_memory", deserialize, **params)
+            )
+
+    return benchmarks
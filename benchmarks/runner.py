@@ -0,0 +1,128 @@
+import argparse
+import itertools
+import logging
+import sys
+
+from . import config, control, discovery, harness, memory
+
+
+# the functions returning each suite's benchmarks, given cluster and
+# node counts
+SUITES = {
+    "config": config.get_benchmarks,
+    "control": control.get_benchmarks,
+    "discovery": discovery.get_benchmarks,
+    "memory": memory.get_benchmarks,
+}
+
+DEFAULT_CLUSTER_COUNTS = "1,10,50"
+DEFAULT_NODE_COUNTS = "1,10,100"
+
+
+parser = argparse.ArgumentParser(
+    description="Lighthouse benchmark suite."
+)
+
+parser.add_argument(
+    "suites", type=str, nargs="*", metavar="suite",
+    help="Which suites to run (all by default), out of: %s." % (
+        ", ".join(sorted(SUITES))
+    )
+)
+parser.add_argument(
+    "--clusters", type=str, default=DEFAULT_CLUSTER_COUNTS,
+    help="Comma-separated numbers of clusters to benchmark with."
+)
+parser.add_argument(
+    "--nodes", type=str, default=DEFAULT_NODE_COUNTS,
+    help="Comma-separated numbers of nodes per cluster to benchmark with."
+)
+parser.add_argument(
+    "--repeat", type=int, default=harness.DEFAULT_REPEAT,
+    help="How many times to time each benchmark."
+)
+parser.add_argument(
+    "--output", type=str, default=None,
+    help="Path of a JSON file to write the results to."
+)
+parser.add_argument(
+    "--compare", type=str, default=None,
+    help="Path of a JSON results file to check for regressions against."
+)
+parser.add_argument(
+    "--threshold", type=float, default=harness.DEFAULT_THRESHOLD,
+    help="Fraction slower than the baseline that counts as a regression."
+)
+
+
+def parse_counts(value):
+    """
+    Parses a comma-separated string of counts into a list of ints.
+    """
+    return [int(count) for count in value.split(",") if count.strip()]
+
+
+def run_suites(suites, cluster_counts, node_counts, repeat):
+    """
+    Runs the benchmarks of the named suites for each combination of cluster
+    and node counts, printing and returning the results.
+    """
+    results = []
+
+    for suite in suites:
+        for cluster_count, node_count in itertools.product(
+                cluster_counts, node_counts
+        ):
+            for benchmark in SUITES[suite](cluster_count, node_count):
+                result = harness.run_benchmark(benchmark, repeat=repeat)
+                result["suite"] = suite
+                print(
+                    "%-10s %-70s %13s" % (
+                        suite, result["key"],
+                        harness.format_value(result["median"], result["unit"])
+                    )
+                )
+                results.append(result)
+
+    return results
+
+
+def run():
+    """
+    Runs the benchmark suites, optionally writing the results to a file and
+    comparing them to a baseline.  Exits with status 1 if any regressions
+    were found.
+    """
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    unknown = [suite for suite in args.suites if suite not in SUITES]
+    if unknown:
+        parser.error("Unknown suite(s): %s" % ", ".join(unknown))
+
+    results = run_suites(
+        args.suites or sorted(SUITES),
+        parse_counts(args.clusters), parse_counts(args.nodes),
+        args.repeat
+    )
+
+    if args.output:
+        harness.write_results(args.output, results)
+
+    if not args.compare:
+        return
+
+    regressions = harness.compare(
+        harness.load_results(args.compare), results, args.threshold
+    )
+    units = dict((result["key"], result["unit"]) for result in results)
+    for key, old, new in regressions:
+        print("REGRESSION %s: %s -> %s" % (
+            key,
+            harness.format_value(old, units[key]),
+            harness.format_value(new, units[key]),
+        ))
+
+    if regressions:
+        sys.exit(1)
@@ -1,12 +1,28 @@
 import collections
+import inspect
 import logging
 import itertools
+import time
 
+from . import metrics
 from .pluggable import Pluggable
 
 logger = logging.getLogger(__name__)
 
 
+# inspect.iscoroutine is only around on python 3.5+, where checks can
+# define an `async def perform()`
+if hasattr(inspect, "iscoroutine"):
+    is_coroutine = inspect.iscoroutine
+else:
+    def is_coroutine(obj):
+        """
+        Stand-in for `inspect.iscoroutine()` on older pythons, which have no
+        coroutines.
+        """
+        return False
+
+
 class Check(Pluggable):
     """
     Base class for service check plugins.
@@ -19,11 +35,13 @@ class Check(Pluggable):
     entry_point = "lighthouse.checks"
 
     def __init__(self):
+        self.service_name = None
         self.host = None
         self.port = None
 
         self.rise = None
         self.fall = None
+        self.timeout = None
 
         self.results = deque()
         self.passing = False
@@ -54,31 +72,67 @@ class Check(Pluggable):
 
         Note that this method takes no arguments.  Any sort of context required
         for performing a check should be handled by the config.
+
+        On python 3.5+ this method can be defined as a coroutine function
+        (`async def perform(self)`), such checks require the reporter to use
+        the asyncio check engine.
         """
         raise NotImplementedError
 
     def run(self):
         """
-        Calls the `perform()` method defined by subclasses and stores the
-        result in a `results` deque.
+        Calls the `perform()` method defined by subclasses and records the
+        result via `record_result()`.
 
-        After the result is determined the `results` deque is analyzed to see
-        if the `passing` flag should be updated.  If the check was considered
-        passing and the previous `self.fall` number of checks failed, the check
-        is updated to not be passing.  If the check was not passing and the
-        previous `self.rise` number of checks passed, the check is updated to
-        be considered passing.
+        Any errors raised by `perform()` count as a failed check.
         """
         logger.debug("Running %s check", self.name)
 
+        start = time.time()
         try:
             result = self.perform()
         except Exception:
             logger.exception("Error while performing %s check", self.name)
             result = False
 
+        self.record_duration(time.time() - start)
+
+        if is_coroutine(result):
+            result.close()
+            logger.error(
+                "%s check is asynchronous, use the asyncio check engine.",
+                self.name
+            )
+            result = False
+
+        self.record_result(result)
+
+    def record_duration(self, duration):
+        """
+        Records how many seconds it took to perform the check.
+        """
+        metrics.check_duration.observe(
+            duration, service=self.service_name, check=self.name
+        )
+
+    def record_result(self, result):
+        """
+        Stores the given result in the `results` deque.
+
+        After the result is stored the `results` deque is analyzed to see
+        if the `passing` flag should be updated.  If the check was considered
+        passing and the previous `self.fall` number of checks failed, the check
+        is updated to not be passing.  If the check was not passing and the
+        previous `self.rise` number of checks passed, the check is updated to
+        be considered passing.
+        """
         logger.debug("Result: %s", result)
 
+        metrics.check_results.inc(
+            service=self.service_name, check=self.name,
+            result="pass" if result else "fail"
+        )
+
         self.results.append(result)
         if self.passing and not any(self.last_n_results(self.fall)):
             logger.info(
@@ -105,7 +159,8 @@ class Check(Pluggable):
 
     def apply_config(self, config):
         """
-        Sets attributes based on the given config.
+        Sets attributes based on the given config, including the optional
+        `timeout` used by the asyncio check engine.
 
         Also adjusts the `results` deque to either expand (padding itself with
         False results) or contract (by removing the oldest results) until it
@@ -113,6 +168,10 @@ class Check(Pluggable):
         """
         self.rise = int(config["rise"])
         self.fall = int(config["fall"])
+        if config.get("timeout") is not None:
+            self.timeout = float(config["timeout"])
+        else:
+            self.timeout = None
 
         self.apply_check_config(config)
 
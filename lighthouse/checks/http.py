@@ -1,19 +1,60 @@
 import logging
+import socket
+import ssl
+import threading
 
 from six.moves import http_client as client
+from six.moves.http_client import HTTPException
 
 from lighthouse import check
 
 
+DEFAULT_CONNECT_TIMEOUT = 2  # seconds
+DEFAULT_READ_TIMEOUT = 5  # seconds
+
+
 logger = logging.getLogger(__name__)
 
 
+class HTTPSConnection(client.HTTPSConnection):
+    """
+    HTTPSConnection subclass that can resume a previous TLS session.
+
+    If a `tls_session` is given the TLS handshake is done with that session
+    so that the server can skip the full key exchange.  TLS session objects
+    are only available on python 3.6+, on other versions this behaves like
+    a regular HTTPSConnection.
+    """
+
+    def __init__(self, host, port, tls_session=None, **kwargs):
+        client.HTTPSConnection.__init__(self, host, port, **kwargs)
+        self.tls_session = tls_session
+
+    def connect(self):
+        """
+        Establishes the TCP connection and wraps it in TLS, resuming the
+        `tls_session` if there is one.
+        """
+        if self.tls_session is None:
+            return client.HTTPSConnection.connect(self)
+
+        client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self.tls_session
+        )
+
+
 class HTTPCheck(check.Check):
     """
     Simple check for HTTP services.
 
     Pings a configured uri on the host.  The check passes if the response
     code is in the 2xx range.
+
+    If configured with "keep_alive", the HTTP connection is kept open between
+    checks and re-established automatically if the server closed it.  For
+    https checks the TLS context and session are kept around as well so
+    that reconnects can skip the full TLS handshake.
     """
 
     name = "http"
@@ -24,6 +65,14 @@ class HTTPCheck(check.Check):
         self.uri = None
         self.use_https = None
         self.method = None
+        self.connect_timeout = None
+        self.read_timeout = None
+        self.keep_alive = False
+
+        self.connection = None
+        self.ssl_context = None
+        self.tls_session = None
+        self.lock = threading.Lock()
 
     @classmethod
     def validate_dependencies(cls):
@@ -42,12 +91,20 @@ class HTTPCheck(check.Check):
 
     def apply_check_config(self, config):
         """
-        Takes a validated config dictionary and sets the `uri`, `use_https`
-        and `method` attributes based on the config's contents.
+        Takes a validated config dictionary and sets the `uri`, `use_https`,
+        `method`, timeout and `keep_alive` attributes based on the config's
+        contents.
         """
         self.uri = config["uri"]
         self.use_https = config.get("https", False)
         self.method = config.get("method", "GET")
+        self.connect_timeout = float(
+            config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        )
+        self.read_timeout = float(
+            config.get("read_timeout", DEFAULT_READ_TIMEOUT)
+        )
+        self.keep_alive = config.get("keep_alive", False)
 
     def perform(self):
         """
@@ -58,16 +115,92 @@ class HTTPCheck(check.Check):
         in the config, as well as a custom HTTP method via the "method" key.
 
         The default is to not use https and the GET method.
+
+        If a kept-alive connection turns out to have gone stale the request
+        is retried once on a fresh connection.
         """
-        if self.use_https:
-            conn = client.HTTPSConnection(self.host, self.port)
+        with self.lock:
+            reused = self.connection is not None
+            try:
+                status = self.request()
+            except socket.timeout:
+                raise
+            except (HTTPException, socket.error):
+                if not reused:
+                    raise
+                logger.debug("Kept-alive connection went stale, reconnecting.")
+                status = self.request()
+
+        return bool(status >= 200 and status < 300)
+
+    def request(self):
+        """
+        Sends the configured request over the current connection (opening
+        one if needed) and returns the response status.
+
+        The connection is closed afterwards unless it's to be kept alive, or
+        if anything goes wrong.
+        """
+        if self.connection is None:
+            self.connection = self.connect()
+
+        try:
+            self.connection.request(self.method, self.uri)
+            response = self.connection.getresponse()
+            if self.keep_alive and not response.will_close:
+                response.read()
+        except Exception:
+            self.close()
+            raise
+
+        if not self.keep_alive or response.will_close:
+            self.close()
+
+        return response.status
+
+    def connect(self):
+        """
+        Opens a new connection to the configured host and port.
+
+        The configured connect timeout applies to establishing the connection
+        (including the TLS handshake), the read timeout applies from then on.
+
+        On python versions without `ssl.create_default_context()` (i.e. older
+        than 2.7.9) https connections are made without a shared TLS context
+        or session.
+        """
+        if self.use_https and not hasattr(ssl, "create_default_context"):
+            connection = HTTPSConnection(
+                self.host, self.port, timeout=self.connect_timeout
+            )
+        elif self.use_https:
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            connection = HTTPSConnection(
+                self.host, self.port,
+                timeout=self.connect_timeout,
+                context=self.ssl_context,
+                tls_session=self.tls_session
+            )
         else:
-            conn = client.HTTPConnection(self.host, self.port)
+            connection = client.HTTPConnection(
+                self.host, self.port, timeout=self.connect_timeout
+            )
 
-        conn.request(self.method, self.uri)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
 
-        response = conn.getresponse()
+        if self.use_https:
+            self.tls_session = getattr(connection.sock, "session", None)
 
-        conn.close()
+        return connection
+
+    def close(self):
+        """
+        Closes the current connection, if any.
+        """
+        if self.connection is None:
+            return
 
-        return bool(response.status >= 200 and response.status < 300)
+        self.connection.close()
+        self.connection = None
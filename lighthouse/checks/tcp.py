@@ -1,11 +1,17 @@
 import logging
 import socket
+import time
+
+import six
 
 from lighthouse import check, sockutils
 
 
 SOCKET_BUFFER_SIZE = 4096
 
+DEFAULT_CONNECT_TIMEOUT = 2  # seconds
+DEFAULT_READ_TIMEOUT = 5  # seconds
+
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,10 @@ class TCPCheck(check.Check):
 
     Sends a certain message to the configured port and passes if the response
     is an expected one.
+
+    Connecting is bounded by `connect_timeout` and sending the query plus
+    receiving the response line by `read_timeout`, so an unresponsive service
+    fails the check rather than hanging it.
     """
 
     name = "tcp"
@@ -26,6 +36,10 @@ class TCPCheck(check.Check):
         self.query = None
         self.expected_response = None
 
+        self.connect_timeout = None
+        self.read_timeout = None
+        self.max_response_size = None
+
     @classmethod
     def validate_dependencies(cls):
         """
@@ -46,10 +60,25 @@ class TCPCheck(check.Check):
     def apply_check_config(self, config):
         """
         Takes the `query` and `response` fields from a validated config
-        dictionary and sets the proper instance attributes.
+        dictionary and sets the proper instance attributes, along with the
+        optional timeouts and max response size.
+
+        The query and response are kept as bytes.
         """
-        self.query = config.get("query")
-        self.expected_response = config.get("response")
+        self.query = to_bytes(config.get("query"))
+        self.expected_response = to_bytes(config.get("response"))
+
+        self.connect_timeout = float(
+            config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        )
+        self.read_timeout = float(
+            config.get("read_timeout", DEFAULT_READ_TIMEOUT)
+        )
+        self.max_response_size = int(
+            config.get(
+                "max_response_size", sockutils.DEFAULT_MAX_RESPONSE_SIZE
+            )
+        )
 
     def perform(self):
         """
@@ -58,37 +87,58 @@ class TCPCheck(check.Check):
         Sends the TCP `query` to the proper host and port, and loops over the
         socket, gathering response chunks until a full line is acquired.
 
-        If the response line matches the expected value, the check passes. If
-        not, the check fails.  The check will also fail if there's an error
-        during any step of the send/receive process.
+        If the response line (minus any trailing carriage return) matches the
+        expected value, the check passes. If not, the check fails.  The check
+        will also fail if there's an error or timeout during any step of the
+        send/receive process.
         """
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
-        sock.connect((self.host, self.port))
-
-        # if no query/response is defined, a successful connection is a pass
-        if not self.query:
-            sock.close()
-            return True
-
         try:
-            sock.sendall(self.query)
-        except Exception:
-            logger.exception("Error sending TCP query message.")
+            sock.settimeout(self.connect_timeout)
+            sock.connect((self.host, self.port))
+
+            # if no query/response is defined, a successful connection is a
+            # pass
+            if not self.query:
+                return True
+
+            deadline = time.time() + self.read_timeout
+            sock.settimeout(self.read_timeout)
+
+            try:
+                sock.sendall(self.query)
+            except Exception:
+                logger.exception("Error sending TCP query message.")
+                return False
+
+            response, extra = sockutils.get_response(
+                sock, buffer_size=SOCKET_BUFFER_SIZE,
+                deadline=deadline, max_size=self.max_response_size
+            )
+        finally:
             sock.close()
-            return False
 
-        response, extra = sockutils.get_response(sock)
+        logger.debug("response: %r (extra: %r)", response, extra)
 
-        logger.debug("response: %s (extra: %s)", response, extra)
+        if response.endswith(b"\r"):
+            response = response[:-1]
 
         if response != self.expected_response:
             logger.warn(
-                "Response does not match expected value: %s (expected %s)",
+                "Response does not match expected value: %r (expected %r)",
                 response, self.expected_response
             )
-            sock.close()
             return False
 
-        sock.close()
         return True
+
+
+def to_bytes(value):
+    """
+    Encodes the given value to UTF-8 bytes if it's a text string.
+    """
+    if isinstance(value, six.text_type):
+        return value.encode("utf-8")
+
+    return value
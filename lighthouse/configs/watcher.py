@@ -4,6 +4,7 @@ import threading
 from concurrent import futures
 
 from .monitor import ConfigFileMonitor
+from lighthouse import metrics
 from lighthouse.events import wait_on_event
 
 
@@ -45,8 +46,20 @@ class ConfigWatcher(object):
         self.work_pool = futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
         self.thread_pool = {}
 
+        metrics.Gauge(
+            "lighthouse_work_pool_queue_depth",
+            "Number of jobs waiting for a free work pool thread.",
+            self.work_pool_queue_depth
+        )
+
         self.shutdown = threading.Event()
 
+    def work_pool_queue_depth(self):
+        """
+        Returns the number of jobs queued up in the work pool.
+        """
+        return self.work_pool._work_queue.qsize()
+
     def start(self):
         """
         Iterates over the `watched_configurabes` attribute and starts a
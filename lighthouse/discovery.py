@@ -1,6 +1,6 @@
 import logging
-import threading
 
+from .events import Event
 from .pluggable import Pluggable
 
 
@@ -27,7 +27,7 @@ class Discovery(Pluggable):
     entry_point = "lighthouse.discovery"
 
     def __init__(self):
-        self.shutdown = threading.Event()
+        self.shutdown = Event()
 
     def connect(self):
         """
@@ -43,7 +43,7 @@ class Discovery(Pluggable):
         """
         raise NotImplementedError
 
-    def start_watching(self, cluster, should_update):
+    def start_watching(self, cluster, callback):
         """
         Method called whenever a new cluster is defined and must be monitored
         for changes to nodes.
@@ -51,8 +51,9 @@ class Discovery(Pluggable):
         Once a cluster is being successfully watched that cluster *must* be
         added to the `self.watched_clusters` set!
 
-        Whenever a change is detected, the given `should_update` threading
-        event should be set.
+        Whenever a change is detected, the cluster's `nodes` attribute should
+        be updated and the given `callback` called with two arguments: the
+        list of nodes added and the list of nodes removed since the last call.
         """
         raise NotImplementedError
 
@@ -80,6 +81,20 @@ class Discovery(Pluggable):
         """
         raise NotImplementedError
 
+    def report_batch(self, service, up_ports, down_ports):
+        """
+        Reports the given service's present node as up on each of the
+        `up_ports` and as down on each of the `down_ports`.
+
+        By default this calls `report_up()` and `report_down()` for each
+        port, subclasses that can make several changes at once should
+        override it.
+        """
+        for port in up_ports:
+            self.report_up(service, port)
+        for port in down_ports:
+            self.report_down(service, port)
+
     def stop(self):
         """
         Simple method that sets the `shutdown` event and calls the subclass's
@@ -0,0 +1,219 @@
+import asyncio
+import collections
+import logging
+import threading
+
+from concurrent import futures
+
+from .scheduler import get_next_deadline, get_splay
+
+
+# max number of blocking (i.e. non-coroutine) check `perform()` calls
+# allowed to run at once
+DEFAULT_SYNC_WORKERS = 32
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCheckEngine(object):
+    """
+    Check engine that runs all service checks on a single asyncio event loop.
+
+    Rather than a thread per service, each service gets a task on the event
+    loop that runs all of the service's checks concurrently, waits out the
+    rest of the check interval and repeats.
+
+    Checks with a coroutine `perform()` method are awaited directly, so a
+    single thread can have thousands of them in flight.  Checks with a
+    regular blocking `perform()` are run in a thread pool executor of up to
+    `sync_workers` threads.  Either way each check is given `check.timeout`
+    seconds (or the service's check interval if no timeout is configured)
+    before being counted as failed.
+
+    Two callables are needed: `prepare` is called with a service right before
+    its checks are run and should return False if the checks should be
+    skipped, `report` is called with the service and the sets of ports that
+    came up and went down whenever there is a change.  Both are called on
+    the event loop thread so they must not block.
+    """
+
+    def __init__(self, prepare, report, sync_workers=DEFAULT_SYNC_WORKERS):
+        self.prepare = prepare
+        self.report = report
+
+        self.loop = asyncio.new_event_loop()
+        self.executor = futures.ThreadPoolExecutor(max_workers=sync_workers)
+        self.loop.set_default_executor(self.executor)
+
+        self.tasks = {}
+        self.missed = collections.defaultdict(int)
+        self.thread = None
+
+    def start(self):
+        """
+        Starts the thread running the event loop.
+        """
+        self.thread = threading.Thread(target=self.run_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run_loop(self):
+        """
+        Runs the event loop until `stop()` is called, then lets any cancelled
+        service tasks finish up before closing the loop.
+        """
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self.loop.run_forever()
+
+            pending = list(self.tasks.values())
+            if pending:
+                self.loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+        finally:
+            self.loop.close()
+
+    def add_service(self, service):
+        """
+        Starts running the checks of the given service on the event loop,
+        replacing any task already running for a service of the same name.
+
+        Safe to call from any thread.
+        """
+        self.loop.call_soon_threadsafe(self.start_task, service)
+
+    def remove_service(self, name):
+        """
+        Stops running the checks of the service with the given name.
+
+        Safe to call from any thread.
+        """
+        self.loop.call_soon_threadsafe(self.cancel_task, name)
+
+    def start_task(self, service):
+        """
+        Creates the check loop task for the given service, must be called on
+        the event loop thread.
+        """
+        self.cancel_task(service.name)
+
+        logger.info("Starting check loop for service '%s'", service.name)
+        self.tasks[service.name] = self.loop.create_task(
+            self.check_loop(service)
+        )
+
+    def cancel_task(self, name):
+        """
+        Cancels the check loop task for the service with the given name, must
+        be called on the event loop thread.
+        """
+        task = self.tasks.pop(name, None)
+        if task:
+            task.cancel()
+        self.missed.pop(name, None)
+
+    async def check_loop(self, service):
+        """
+        Runs the service's checks at fixed-rate deadlines `check_interval`
+        seconds apart until the task is cancelled.
+
+        The first run is delayed by a random splay of up to the service's
+        `check_splay` seconds.  Deadlines that pass while the checks are
+        still running are skipped, logged and counted in `missed`.
+        """
+        await asyncio.sleep(get_splay(service.check_splay))
+
+        deadline = self.loop.time()
+        while True:
+            try:
+                await self.run_checks(service)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error checking service '%s'", service.name)
+
+            deadline, missed = get_next_deadline(
+                deadline, service.check_interval, self.loop.time()
+            )
+            if missed:
+                self.missed[service.name] += missed
+                logger.warning(
+                    "Missed %d deadline(s) for '%s'", missed, service.name
+                )
+
+            await asyncio.sleep(deadline - self.loop.time())
+
+    async def run_checks(self, service):
+        """
+        Runs all of the service's checks concurrently and reports any ports
+        that came up or went down as a result.
+        """
+        if not self.prepare(service):
+            return
+
+        logger.debug("Running checks. (%s)", service.name)
+
+        await asyncio.gather(*[
+            self.run_check(check, service.check_interval)
+            for port in service.ports
+            for check in list(service.checks[port].values())
+        ])
+
+        came_up, went_down = service.update_status()
+        if came_up or went_down:
+            self.report(service, came_up, went_down)
+
+    async def run_check(self, check, default_timeout):
+        """
+        Performs a single check and records the result on the check.
+
+        Errors and timeouts count as a failed check.
+        """
+        timeout = check.timeout or default_timeout
+
+        if asyncio.iscoroutinefunction(check.perform):
+            pending = check.perform()
+        else:
+            pending = self.loop.run_in_executor(None, check.perform)
+
+        start = self.loop.time()
+        try:
+            result = await asyncio.wait_for(pending, timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(
+                "%s check timed out after %s seconds", check.name, timeout
+            )
+            result = False
+        except Exception:
+            logger.exception("Error while performing %s check", check.name)
+            result = False
+
+        check.record_duration(self.loop.time() - start)
+        check.record_result(result)
+
+    def stop(self):
+        """
+        Cancels all service tasks, stops the event loop and waits for the loop
+        thread to finish.
+        """
+        if not self.thread:
+            return
+
+        self.loop.call_soon_threadsafe(self.shutdown_loop)
+        self.thread.join()
+        self.executor.shutdown(wait=False)
+
+    def shutdown_loop(self):
+        """
+        Cancels all service tasks and stops the event loop, must be called on
+        the event loop thread.
+        """
+        for task in self.tasks.values():
+            task.cancel()
+
+        self.loop.stop()
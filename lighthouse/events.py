@@ -8,39 +8,148 @@ import six
 logger = logging.getLogger(__name__)
 
 
-def wait_on_any(*events, **kwargs):
+class Event(object):
     """
-    Helper method for waiting for any of the given threading events to be
-    set.
+    Drop-in replacement for `threading.Event` that can be waited on as part
+    of a `CompositeEvent`.
 
-    The standard threading lib doesn't include any mechanism for waiting on
-    more than one event at a time so we have to monkey patch the events
-    so that their `set()` and `clear()` methods fire a callback we can use
-    to determine how a composite event should react.
+    Composite events waiting on this event register themselves via
+    `add_composite()` for the duration of the wait and are notified whenever
+    the event is set, so the cost of a `set()` only depends on the number of
+    waits currently in progress.
     """
-    timeout = kwargs.get("timeout")
-    composite_event = threading.Event()
 
-    if any([event.is_set() for event in events]):
-        return
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.flag = False
+        self.composites = set()
+
+    def is_set(self):
+        """
+        Returns True if the internal flag is set.
+        """
+        return self.flag
+
+    isSet = is_set
+
+    def set(self):
+        """
+        Sets the internal flag and wakes up any threads waiting on this event
+        or on a composite event that includes it.
+        """
+        with self.condition:
+            self.flag = True
+            self.condition.notify_all()
+            composites = list(self.composites)
+
+        for composite in composites:
+            composite.notify()
+
+    def clear(self):
+        """
+        Resets the internal flag.
+        """
+        with self.condition:
+            self.flag = False
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the internal flag is set or the optional timeout passes.
+
+        Returns the state of the flag on exit.
+        """
+        with self.condition:
+            if not self.flag:
+                self.condition.wait(timeout)
+            return self.flag
+
+    def add_composite(self, composite):
+        """
+        Registers the given composite event to be notified when this event is
+        set.
+        """
+        with self.condition:
+            self.composites.add(composite)
+
+    def remove_composite(self, composite):
+        """
+        Deregisters the given composite event.
+        """
+        with self.condition:
+            self.composites.discard(composite)
+
+
+class CompositeEvent(object):
+    """
+    Event-like object that is considered set whenever *any* of the given
+    events are set.
+
+    The underlying events must be `Event` instances from this module.  The
+    composite only registers with them while a `wait()` is in progress, so
+    waiting over and over on the same events doesn't leave anything behind.
+    """
+
+    def __init__(self, *events):
+        for event in events:
+            if not hasattr(event, "add_composite"):
+                raise TypeError(
+                    "Can't wait on %r, must be a lighthouse Event" % event
+                )
+
+        self.events = events
+        self.condition = threading.Condition(threading.Lock())
+
+    def is_set(self):
+        """
+        Returns True if any of the underlying events are set.
+        """
+        return any([event.is_set() for event in self.events])
+
+    isSet = is_set
 
-    def on_change():
-        if any([event.is_set() for event in events]):
-            composite_event.set()
-        else:
-            composite_event.clear()
+    def notify(self):
+        """
+        Wakes up any threads waiting on the composite.
 
-    def patch(original):
+        Called by the underlying events when they are set.
+        """
+        with self.condition:
+            self.condition.notify_all()
 
-        def patched():
-            original()
-            on_change()
+    def wait(self, timeout=None):
+        """
+        Blocks until any of the underlying events are set or the optional
+        timeout passes.
 
-        return patched
+        Returns True if any of the underlying events are set on exit.
+        """
+        for event in self.events:
+            event.add_composite(self)
 
-    for event in events:
-        event.set = patch(event.set)
-        event.clear = patch(event.clear)
+        try:
+            with self.condition:
+                if not self.is_set():
+                    self.condition.wait(timeout)
+        finally:
+            for event in self.events:
+                event.remove_composite(self)
+
+        return self.is_set()
+
+
+def wait_on_any(*events, **kwargs):
+    """
+    Helper method for waiting for any of the given events to be set.
+
+    The standard threading lib doesn't include any mechanism for waiting on
+    more than one event at a time, so the events must be instances of this
+    module's `Event` class and are waited on via a `CompositeEvent`.
+    """
+    timeout = kwargs.get("timeout")
+    composite_event = CompositeEvent(*events)
+
+    if composite_event.is_set():
+        return
 
     wait_on_event(composite_event, timeout=timeout)
 
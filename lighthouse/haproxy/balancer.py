@@ -1,20 +1,27 @@
 import collections
+import errno
 import logging
+import os
+import tempfile
 import threading
 import time
 
 import six
 
+from lighthouse import metrics
 from lighthouse.balancer import Balancer
 
-from .config import HAProxyConfig
+from .config import HAProxyConfig, content_hash
 from .control import HAProxyControl
+from .slots import SlotPool
 from .stanzas.stanza import Stanza
 from .stanzas.proxy import ProxyStanza
 from .stanzas.stats import StatsStanza
 
 
 MIN_TIME_BETWEEN_RESTARTS = 2  # seconds
+MIN_SERVER_TEMPLATE_VERSION = (1, 8, 0)
+DEFAULT_CONFIG_FILE_MODE = 0o644
 
 logger = logging.getLogger(__name__)
 
@@ -40,8 +47,12 @@ class HAProxy(Balancer):
 
         self.haproxy_config_path = None
         self.config_file = None
+        self.config_hash = None
         self.control = None
 
+        self.spare_slots = None
+        self.slot_pools = {}
+
     @classmethod
     def validate_dependencies(cls):
         """
@@ -64,6 +75,9 @@ class HAProxy(Balancer):
             raise ValueError("No PID file path given")
         if "stats" in config and "port" not in config["stats"]:
             raise ValueError("Stats interface defined, but no port given")
+        if "spare_server_slots" in config:
+            if int(config["spare_server_slots"]) < 1:
+                raise ValueError("Spare server slots must be positive")
         if "proxies" in config:
             cls.validate_proxies_config(config["proxies"])
 
@@ -101,9 +115,18 @@ class HAProxy(Balancer):
         contents of the config.
 
         This is mostly a matter of constructing the configuration stanzas.
+        The hash of the written config content is forgotten if the config file
+        path changed, so that the new file gets written.
         """
+        if config["config_file"] != self.haproxy_config_path:
+            self.config_hash = None
         self.haproxy_config_path = config["config_file"]
 
+        spare_slots = config.get("spare_server_slots")
+        if spare_slots != self.spare_slots:
+            self.slot_pools = {}
+        self.spare_slots = spare_slots
+
         global_stanza = Stanza("global")
         global_stanza.add_lines(config.get("global", []))
         global_stanza.add_lines([
@@ -146,30 +169,122 @@ class HAProxy(Balancer):
 
         self.control = HAProxyControl(
             config["config_file"], config["socket_file"], config["pid_file"],
+            interactive=config.get("interactive_socket", False),
+            command_timeout=config.get("socket_timeout")
         )
 
     def sync_file(self, clusters):
         """
         Generates new HAProxy config file content and writes it to the
-        file at `haproxy_config_path`.
+        file at `haproxy_config_path` if the content changed.
 
         If a restart is not necessary the nodes configured in HAProxy will
         be synced on the fly.  If a restart *is* necessary, one will be
         triggered.
         """
         logger.info("Updating HAProxy config file.")
-        if not self.restart_required:
+
+        version = self.control.version
+
+        slot_pools = None
+        if self.use_slots(version):
+            self.sync_slots(clusters)
+            slot_pools = self.slot_pools
+        elif not self.restart_required:
             self.sync_nodes(clusters)
 
-        version = self.control.get_version()
+        with metrics.config_generation_duration.time():
+            content = self.config_file.generate(
+                clusters, version=version, slot_pools=slot_pools
+            )
 
-        with open(self.haproxy_config_path, "w") as f:
-            f.write(self.config_file.generate(clusters, version=version))
+        self.write_config(content)
 
         if self.restart_required:
             with self.restart_lock:
                 self.restart()
 
+    def use_slots(self, version):
+        """
+        Returns True if backend server slot pools are configured and the
+        given HAProxy version supports the "server-template" directive.
+        """
+        if not self.spare_slots:
+            return False
+
+        if not version or version < MIN_SERVER_TEMPLATE_VERSION:
+            logger.warning(
+                "Server slots require HAProxy %s or newer, not using them.",
+                ".".join(map(str, MIN_SERVER_TEMPLATE_VERSION))
+            )
+            return False
+
+        return True
+
+    def write_config(self, content):
+        """
+        Writes the given content to the file at `haproxy_config_path`,
+        returning True if the file was written.
+
+        If the content is the same as what's already in the file (ignoring
+        the timestamp in the header) nothing is written.  Otherwise the
+        content is written to a temporary file in the same directory which
+        is then renamed over the config file, so HAProxy never reads a
+        partially-written config.
+        """
+        new_hash = content_hash(content)
+        if self.config_hash is None:
+            self.config_hash = self.get_existing_config_hash()
+
+        if new_hash == self.config_hash:
+            logger.debug("HAProxy config content unchanged, skipping write.")
+            return False
+
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.haproxy_config_path)),
+            prefix=".lighthouse-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.chmod(temp_path, self.get_config_file_mode())
+            os.rename(temp_path, self.haproxy_config_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self.config_hash = new_hash
+
+        return True
+
+    def get_existing_config_hash(self):
+        """
+        Returns the content hash of the config file currently on disk, or
+        None if there is no such file.
+        """
+        try:
+            with open(self.haproxy_config_path) as f:
+                return content_hash(f.read())
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def get_config_file_mode(self):
+        """
+        Returns the permission bits of the existing config file so they can
+        be preserved, falling back to `DEFAULT_CONFIG_FILE_MODE`.
+        """
+        try:
+            return os.stat(self.haproxy_config_path).st_mode & 0o777
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        return DEFAULT_CONFIG_FILE_MODE
+
     def restart(self):
         """
         Tells the HAProxy control object to restart the process.
@@ -201,42 +316,115 @@ class HAProxy(Balancer):
 
         current_nodes, enabled_nodes = self.get_current_nodes(clusters)
 
+        to_enable = []
+        to_disable = []
         for cluster_name, nodes in six.iteritems(current_nodes):
-            for node in nodes:
-                if node["svname"] in enabled_nodes[cluster_name]:
-                    command = self.control.enable_node
+            for node_name in nodes:
+                if node_name in enabled_nodes[cluster_name]:
+                    to_enable.append((cluster_name, node_name))
                 else:
-                    command = self.control.disable_node
+                    to_disable.append((cluster_name, node_name))
+
+        try:
+            errors = self.control.update_nodes(to_enable, to_disable)
+        except Exception:
+            logger.exception("Error when enabling/disabling nodes")
+            self.restart_required = True
+            return
+
+        if errors:
+            logger.error(
+                "Socket commands for enabling/disabling nodes failed: %s",
+                "; ".join(errors)
+            )
+            self.restart_required = True
+            return
 
-                try:
-                    response = command(cluster_name, node["svname"])
-                except Exception:
-                    logger.exception("Error when enabling/disabling node")
-                    self.restart_required = True
+        logger.info("HAProxy nodes/servers synced.")
+
+    def sync_slots(self, clusters):
+        """
+        Syncs the clusters' nodes with the slot pool of each cluster.
+
+        New nodes are placed into free slots and the slots of removed nodes
+        are put in maintenance mode, all via runtime commands so that no
+        restart is needed.  If a cluster is new or its slot pool is out of
+        free slots, a new pool is created for it and a restart is required.
+        """
+        logger.info("Syncing HAProxy backend slots.")
+
+        filled_slots = []
+        freed_slots = []
+
+        slot_pools = {}
+        for cluster in clusters:
+            pool = self.slot_pools.get(cluster.name)
+            changes = None
+            if pool is not None:
+                changes = pool.update(cluster.nodes)
+
+            if changes is None:
+                if pool is not None:
+                    logger.info(
+                        "Slots for cluster '%s' used up, restart required.",
+                        cluster.name
+                    )
                 else:
-                    if response:
-                        logger.error(
-                            "Socket command for %s node %s failed: %s",
-                            cluster_name, node["svname"], response
-                        )
-                        self.restart_required = True
-                        return
+                    logger.debug(
+                        "New cluster '%s' added, restart required.",
+                        cluster.name
+                    )
+                pool = SlotPool.for_nodes(cluster.nodes, self.spare_slots)
+                self.restart_required = True
+            else:
+                added, removed = changes
+                filled_slots.extend([
+                    (cluster.name, pool.slot_name(number), node.ip, node.port)
+                    for number, node in added
+                ])
+                freed_slots.extend([
+                    (cluster.name, pool.slot_name(number))
+                    for number in removed
+                ])
 
-        logger.info("HAProxy nodes/servers synced.")
+            slot_pools[cluster.name] = pool
+
+        self.slot_pools = slot_pools
+
+        if self.restart_required:
+            return
+
+        try:
+            errors = self.control.update_slots(filled_slots, freed_slots)
+        except Exception:
+            logger.exception("Error when updating server slots")
+            self.restart_required = True
+            return
+
+        if errors:
+            logger.error(
+                "Socket commands for updating server slots failed: %s",
+                "; ".join(errors)
+            )
+            self.restart_required = True
+            return
+
+        logger.info("HAProxy server slots synced.")
 
     def get_current_nodes(self, clusters):
         """
         Returns two dictionaries, the current nodes and the enabled nodes.
 
         The current_nodes dictionary is keyed off of the cluster name and
-        values are a list of nodes known to HAProxy.
+        values are dictionaries keyed off of the names of the nodes known to
+        HAProxy.
 
         The enabled_nodes dictionary is also keyed off of the cluster name
-        and values are list of *enabled* nodes, i.e. the same values as
-        current_nodes but limited to servers currently taking traffic.
+        and values are sets of the names of *enabled* nodes, i.e. the nodes
+        that should be taking traffic.
         """
-        current_nodes = self.control.get_active_nodes()
-        enabled_nodes = collections.defaultdict(list)
+        current_nodes = self.control.get_active_nodes(columns=())
+        enabled_nodes = collections.defaultdict(set)
 
         for cluster in clusters:
             if not cluster.nodes:
@@ -249,17 +437,15 @@ class HAProxy(Balancer):
                 )
                 self.restart_required = True
 
+            known_nodes = current_nodes.get(cluster.name, {})
             for node in cluster.nodes:
-                if node.name not in [
-                        current_node["svname"]
-                        for current_node in current_nodes.get(cluster.name, [])
-                ]:
+                if node.name not in known_nodes:
                     logger.debug(
                         "New node added to cluster '%s', restart required.",
                         cluster.name
                     )
                     self.restart_required = True
 
-                enabled_nodes[cluster.name].append(node.name)
+                enabled_nodes[cluster.name].add(node.name)
 
         return current_nodes, enabled_nodes
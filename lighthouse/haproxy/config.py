@@ -1,5 +1,7 @@
 import collections
 import datetime
+import hashlib
+import json
 import logging
 
 import six
@@ -11,6 +13,9 @@ from .stanzas.backend import BackendStanza
 from .stanzas.peers import PeersStanza
 
 
+HEADER_HEADING = "Auto-generated by Lighthouse"
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +25,10 @@ class HAProxyConfig(object):
 
     Requires global and defaults stanzas to be passed, can optionally take
     a `stats_stanza` for enabling a stats portal.
+
+    The per-cluster frontend, backend and peers stanzas are cached between
+    calls to `generate()` and only rebuilt for clusters whose nodes or
+    haproxy config changed since the last call.
     """
 
     def __init__(
@@ -35,16 +44,21 @@ class HAProxyConfig(object):
         self.meta_clusters = meta_clusters or {}
         self.bind_address = bind_address
 
-    def generate(self, clusters, version=None):
+        self.stanza_cache = {}
+
+    def generate(self, clusters, version=None, slot_pools=None):
         """
         Generates HAProxy config file content based on a given list of
         clusters.
+
+        If a `slot_pools` dictionary of cluster name to SlotPool is given,
+        the backends of those clusters list their servers by slot.
         """
         now = datetime.datetime.now()
 
         sections = [
             Section(
-                "Auto-generated by Lighthouse (%s)" % now.strftime("%c"),
+                "%s (%s)" % (HEADER_HEADING, now.strftime("%c")),
                 self.global_stanza,
                 self.defaults_stanza
             )
@@ -59,17 +73,28 @@ class HAProxyConfig(object):
             for name, members
             in six.iteritems(self.get_meta_clusters(clusters))
         ]
-        frontend_stanzas = [
-            FrontendStanza(cluster, self.bind_address)
-            for cluster in clusters
-            if "port" in cluster.haproxy
-        ]
-        backend_stanzas = [BackendStanza(cluster) for cluster in clusters]
+        include_peers = bool(version and version >= (1, 5, 0))
+        slot_pools = slot_pools or {}
+
+        frontend_stanzas = []
+        backend_stanzas = []
+        peers_stanzas = []
+
+        stanza_cache = {}
+        for cluster in clusters:
+            fingerprint, stanzas = self.get_cluster_stanzas(
+                cluster, include_peers, slot_pools.get(cluster.name)
+            )
+            stanza_cache[cluster.name] = (fingerprint, stanzas)
 
-        if version and version >= (1, 5, 0):
-            peers_stanzas = [PeersStanza(cluster) for cluster in clusters]
-        else:
-            peers_stanzas = []
+            frontend, backend, peers = stanzas
+            if frontend is not None:
+                frontend_stanzas.append(frontend)
+            backend_stanzas.append(backend)
+            if peers is not None:
+                peers_stanzas.append(peers)
+
+        self.stanza_cache = stanza_cache
 
         sections.extend([
             Section("Frontend stanzas for ACL meta clusters", *meta_stanzas),
@@ -85,6 +110,40 @@ class HAProxyConfig(object):
 
         return "\n\n\n".join([str(section) for section in sections]) + "\n"
 
+    def get_cluster_stanzas(self, cluster, include_peers, slot_pool=None):
+        """
+        Returns a two-element tuple of the fingerprint of the given cluster
+        and a (frontend, backend, peers) tuple of the cluster's stanzas.
+
+        If the fingerprint matches the one cached from the previous
+        `generate()` call the cached stanzas are re-used, otherwise new ones
+        are created.  The frontend and peers stanzas are None if the cluster
+        has no port configured or peers aren't included, respectively.
+        """
+        fingerprint = (
+            cluster_fingerprint(cluster), include_peers,
+            slot_pool.fingerprint() if slot_pool is not None else None
+        )
+
+        if cluster.name in self.stanza_cache:
+            cached_fingerprint, stanzas = self.stanza_cache[cluster.name]
+            if cached_fingerprint == fingerprint:
+                return fingerprint, stanzas
+
+        logger.debug("Generating stanzas for cluster %s", cluster.name)
+
+        frontend = None
+        if "port" in cluster.haproxy:
+            frontend = FrontendStanza(cluster, self.bind_address)
+
+        backend = BackendStanza(cluster, slot_pool=slot_pool)
+
+        peers = None
+        if include_peers:
+            peers = PeersStanza(cluster)
+
+        return fingerprint, (frontend, backend, peers)
+
     def get_meta_clusters(self, clusters):
         """
         Returns a dictionary keyed off of meta cluster names, where the values
@@ -111,3 +170,38 @@ class HAProxyConfig(object):
             del meta_clusters[name]
 
         return meta_clusters
+
+
+def cluster_fingerprint(cluster):
+    """
+    Returns a hashable value that changes whenever anything used to generate
+    a cluster's stanzas changes, namely the cluster's haproxy config and the
+    ordered list of its nodes (including the nodes' peers).
+    """
+    return (
+        json.dumps(cluster.haproxy, sort_keys=True, default=str),
+        tuple(
+            (
+                node.name, node.ip, node.port,
+                (node.peer.name, node.peer.ip, node.peer.port)
+                if node.peer else None
+            )
+            for node in cluster.nodes
+        )
+    )
+
+
+def content_hash(content):
+    """
+    Returns a hash digest of the given generated config file content.
+
+    The auto-generated header line includes a timestamp so it is left out
+    of the hash, that way two generations of the same config hash the same.
+    """
+    header_line = "# " + HEADER_HEADING
+    lines = [
+        line for line in content.split("\n")
+        if not line.startswith(header_line)
+    ]
+
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
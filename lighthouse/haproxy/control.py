@@ -1,15 +1,26 @@
-import collections
+import csv
 import errno
 import logging
 import os
 import re
 import socket
 import subprocess
+import threading
 
+from lighthouse import metrics
 from lighthouse.peer import Peer
 
 
+HAPROXY_BINARY = "haproxy"
+
 SOCKET_BUFFER_SIZE = 8192
+MAX_COMMAND_LINE_LENGTH = 4096
+
+# the string HAProxy sends after each command's output in interactive mode
+PROMPT = b"\n> "
+
+# "show stat" columns included in node stats unless asked for otherwise
+DEFAULT_STAT_COLUMNS = ("status", "weight", "addr", "check_status")
 
 version_re = re.compile('.*(?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+).*')
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
@@ -28,23 +39,41 @@ class HAProxyControl(object):
     or disabling nodes on the fly.
 
     Also allows for sending commands to the HAProxy control socket itself.
+
+    If `interactive` is set, a single connection to the socket is kept open
+    in HAProxy's interactive ("prompt") mode and re-used for each command,
+    reconnecting as needed.  The optional `command_timeout` is the number of
+    seconds to wait on the socket before giving up on a command.
     """
 
-    def __init__(self, config_file_path, socket_file_path, pid_file_path):
+    def __init__(
+            self, config_file_path, socket_file_path, pid_file_path,
+            interactive=False, command_timeout=None
+    ):
         self.config_file_path = config_file_path
         self.socket_file_path = socket_file_path
         self.pid_file_path = pid_file_path
 
+        self.interactive = interactive
+        self.command_timeout = command_timeout
+
+        self.session = None
+        self.session_lock = threading.RLock()
+
+        self.version_lock = threading.Lock()
+        self.version_key = None
+        self.cached_version = None
+
         self.peer = Peer.current()
 
     def restart(self):
         """
         Performs a soft reload of the HAProxy process.
         """
-        version = self.get_version()
+        version = self.version
 
         command = [
-            "haproxy",
+            HAPROXY_BINARY,
             "-f", self.config_file_path, "-p", self.pid_file_path
         ]
         if version and version >= (1, 5, 0):
@@ -57,13 +86,40 @@ class HAProxyControl(object):
             output = subprocess.check_output(command)
         except subprocess.CalledProcessError as e:
             logger.error("Failed to restart HAProxy: %s", str(e))
+            metrics.restarts.inc(result="failure")
             return
 
+        metrics.restarts.inc(result="success")
+
         if output:
             logging.error("haproxy says: %s", output)
 
+        # the interactive session is with the old process, which is on its
+        # way out, so make sure further commands go to the new one
+        self.close_session()
+
         logger.info("Gracefully restarted HAProxy.")
 
+    @property
+    def version(self):
+        """
+        Property for the installed HAProxy version, as returned by
+        `get_version()`.
+
+        The version is cached and only probed again once the `haproxy` binary
+        found on the PATH changes (i.e. its path, inode or mtime changes), so
+        that the config generation and restart logic don't fork a process
+        each time they need it.
+        """
+        key = get_binary_key(HAPROXY_BINARY)
+
+        with self.version_lock:
+            if key is None or key != self.version_key:
+                self.cached_version = self.get_version()
+                self.version_key = key if self.cached_version else None
+
+            return self.cached_version
+
     def get_version(self):
         """
         Returns a tuple representing the installed HAProxy version.
@@ -71,9 +127,11 @@ class HAProxyControl(object):
         The value of the tuple is (<major>, <minor>, <patch>), e.g. if HAProxy
         version 1.5.3 is installed, this will return `(1, 5, 3)`.
         """
-        command = ["haproxy", "-v"]
+        command = [HAPROXY_BINARY, "-v"]
         try:
             output = subprocess.check_output(command)
+            if getattr(output, "decode", None):
+                output = output.decode()
             version_line = output.split("\n")[0]
         except subprocess.CalledProcessError as e:
             logger.error("Could not get HAProxy version: %s", str(e))
@@ -118,36 +176,21 @@ class HAProxyControl(object):
             ]
         )
 
-    def get_active_nodes(self):
+    def get_active_nodes(self, columns=DEFAULT_STAT_COLUMNS):
         """
-        Returns a dictionary of lists, where the key is the name of a service
-        and the list includes all active nodes associated with that service.
+        Returns a dictionary of dictionaries, where the key is the name of a
+        service and the value maps the name of each active node associated
+        with that service to a dictionary of the node's stats.
+
+        Only the given "show stat" columns are included in each node's stats.
         """
         # the -1 4 -1 args are the filters <proxy_id> <type> <server_id>,
         # -1 for all proxies, 4 for servers only, -1 for all servers
         stats_response = self.send_command("show stat -1 4 -1")
         if not stats_response:
-            return []
-
-        lines = stats_response.split("\n")
-        fields = lines.pop(0).split(",")
-        # the first field is the service name, which we key off of so
-        # it's not included in individual node records
-        fields.pop(0)
-
-        active_nodes = collections.defaultdict(list)
-
-        for line in lines:
-            values = line.split(",")
-            service_name = values.pop(0)
-            active_nodes[service_name].append(
-                dict(
-                    (fields[i], values[i])
-                    for i in range(len(fields))
-                )
-            )
+            return {}
 
-        return active_nodes
+        return parse_stats(stats_response, columns)
 
     def enable_node(self, service_name, node_name):
         """
@@ -169,6 +212,82 @@ class HAProxyControl(object):
             "disable server %s/%s" % (service_name, node_name)
         )
 
+    def update_nodes(self, enabled_nodes, disabled_nodes):
+        """
+        Enables and disables the given nodes, each given as a list of
+        (<service name>, <node name>) tuples.
+
+        The "enable server" and "disable server" commands are sent together in
+        batches via `send_commands()`.  Returns the list of non-empty (i.e.
+        error) responses.
+        """
+        commands = []
+        for service_name, node_name in enabled_nodes:
+            logger.info("Enabling server %s/%s", service_name, node_name)
+            commands.append(
+                "enable server %s/%s" % (service_name, node_name)
+            )
+        for service_name, node_name in disabled_nodes:
+            logger.info("Disabling server %s/%s", service_name, node_name)
+            commands.append(
+                "disable server %s/%s" % (service_name, node_name)
+            )
+
+        return self.send_commands(commands)
+
+    def update_slots(self, filled_slots, freed_slots):
+        """
+        Puts freed-up server slots in maintenance mode and points slots at
+        new nodes.
+
+        The `filled_slots` are given as a list of (<service name>,
+        <slot name>, <ip>, <port>) tuples, the `freed_slots` as a list of
+        (<service name>, <slot name>) tuples.  Returns the list of non-empty
+        (i.e. error) responses.
+        """
+        commands = []
+        for service_name, slot_name in freed_slots:
+            logger.info("Freeing server slot %s/%s", service_name, slot_name)
+            commands.append(
+                "set server %s/%s state maint" % (service_name, slot_name)
+            )
+
+        for service_name, slot_name, ip, port in filled_slots:
+            logger.info(
+                "Setting server %s/%s to %s:%s",
+                service_name, slot_name, ip, port
+            )
+            commands.extend([
+                "set server %s/%s addr %s port %s" % (
+                    service_name, slot_name, ip, port
+                ),
+                "set server %s/%s state ready" % (service_name, slot_name),
+            ])
+        return self.send_commands(commands)
+
+    def send_commands(self, commands):
+        """
+        Sends the given list of commands to the HAProxy control socket in as
+        few round trips as possible.
+
+        Commands are joined with semicolons into lines no longer than
+        `MAX_COMMAND_LINE_LENGTH`.  Returns a list of the non-empty responses,
+        one per command in interactive mode and one per line otherwise.
+        """
+        responses = []
+
+        for batch in batch_commands(commands):
+            if self.interactive:
+                batch_responses = self.send_interactive_commands(batch) or []
+            else:
+                batch_responses = [self.send_command(";".join(batch))]
+
+            responses.extend([
+                response for response in batch_responses if response
+            ])
+
+        return responses
+
     def send_command(self, command):
         """
         Sends a given command to the HAProxy control socket.
@@ -178,34 +297,192 @@ class HAProxyControl(object):
         If a known error response (e.g. "Permission denied.") is given then
         the appropriate exception is raised.
         """
+        if self.interactive:
+            responses = self.send_interactive_commands([command])
+            if responses is None:
+                return None
+            return responses[0]
+
+        with metrics.socket_command_duration.time():
+            response = self.exchange(command)
+
+        if response is None:
+            return
+
+        return self.process_command_response(command, response)
+
+    def exchange(self, command):
+        """
+        Sends the given command over a new connection to the control socket
+        and reads the raw response until HAProxy closes the connection.
+
+        Returns None if the socket couldn't be connected to.
+        """
+        sock = self.connect()
+        if not sock:
+            return None
+
+        try:
+            sock.sendall((command + "\n").encode())
+
+            response = bytearray()
+            while True:
+                try:
+                    chunk = sock.recv(SOCKET_BUFFER_SIZE)
+                    if chunk:
+                        response.extend(chunk)
+                    else:
+                        break
+                except IOError as e:
+                    if e.errno not in (errno.EAGAIN, errno.EINTR):
+                        raise
+        finally:
+            sock.close()
+
+        return bytes(response)
+
+    def send_interactive_commands(self, commands):
+        """
+        Sends the given commands as a single semicolon-joined line over the
+        persistent interactive session and returns a list of the responses,
+        one for each command.
+
+        If the session was closed on HAProxy's end (e.g. because it was idle
+        for longer than the "stats timeout") a new session is established and
+        the commands are sent once more.  Returns None if no session could be
+        established.
+        """
+        with self.session_lock:
+            with metrics.socket_command_duration.time():
+                responses = self.converse_with_retry(commands)
+
+        if responses is None:
+            return None
+
+        return [
+            self.process_command_response(command, response)
+            for command, response in zip(commands, responses)
+        ]
+
+    def converse_with_retry(self, commands):
+        """
+        Does the conversing for `send_interactive_commands()`, opening a
+        session first if needed and retrying once on a new session if the
+        current one was closed.  Must be called with `session_lock` held.
+
+        Returns the list of raw responses, or None.
+        """
+        for attempt in range(2):
+            if not self.session and not self.open_session():
+                return None
+
+            try:
+                responses = self.converse(commands)
+            except IOError as e:
+                self.close_session()
+                if attempt or e.errno not in (
+                        errno.EPIPE, errno.ECONNRESET
+                ):
+                    raise
+                responses = None
+
+            if responses is not None:
+                return responses
+
+            logger.info("HAProxy socket session closed, reconnecting.")
+            self.close_session()
+
+        return None
+
+    def open_session(self):
+        """
+        Connects to the control socket and switches the connection to
+        HAProxy's interactive mode via the "prompt" command.
+
+        Returns True if the session was established, False otherwise.
+        """
+        sock = self.connect()
+        if not sock:
+            return False
+
+        self.session = sock
+        try:
+            established = self.converse(["prompt"]) is not None
+        except IOError:
+            self.close_session()
+            raise
+
+        if not established:
+            logger.error("HAProxy closed socket before prompt was given.")
+            self.close_session()
+
+        return established
+
+    def close_session(self):
+        """
+        Closes the persistent interactive session, if any.
+        """
+        with self.session_lock:
+            if not self.session:
+                return
+
+            logger.debug("Closing HAProxy socket session.")
+            try:
+                self.session.close()
+            finally:
+                self.session = None
+
+    def converse(self, commands):
+        """
+        Sends the given commands over the interactive session and reads until
+        a prompt has been given for each of them.
+
+        Returns the list of raw responses, or None if the connection was
+        closed before all of the responses were read.
+        """
+        self.session.sendall((";".join(commands) + "\n").encode())
+
+        response = bytearray()
+        while not (
+                response.endswith(PROMPT) and
+                response.count(PROMPT) >= len(commands)
+        ):
+            try:
+                chunk = self.session.recv(SOCKET_BUFFER_SIZE)
+            except IOError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    continue
+                raise
+
+            if not chunk:
+                return None
+
+            response.extend(chunk)
+
+        return bytes(response).split(PROMPT)[:len(commands)]
+
+    def connect(self):
+        """
+        Returns a new socket connected to the HAProxy control socket file, or
+        None if the connection was refused.
+
+        The `command_timeout` (if any) is applied to the socket.
+        """
         logger.debug("Connecting to socket %s", self.socket_file_path)
         sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.command_timeout:
+            sock.settimeout(self.command_timeout)
         try:
             sock.connect(self.socket_file_path)
         except IOError as e:
+            sock.close()
             if e.errno == errno.ECONNREFUSED:
                 logger.error("Connection refused.  Is HAProxy running?")
                 return
             else:
                 raise
 
-        sock.sendall((command + "\n").encode())
-
-        response = b""
-        while True:
-            try:
-                chunk = sock.recv(SOCKET_BUFFER_SIZE)
-                if chunk:
-                    response += chunk
-                else:
-                    break
-            except IOError as e:
-                if e.errno not in (errno.EAGAIN, errno.EINTR):
-                    raise
-
-        sock.close()
-
-        return self.process_command_response(command, response)
+        return sock
 
     def process_command_response(self, command, response):
         """
@@ -223,6 +500,84 @@ class HAProxyControl(object):
         return response.rstrip("\n")
 
 
+def get_binary_key(name):
+    """
+    Returns a (<path>, <inode>, <mtime>) tuple identifying the executable with
+    the given name found on the PATH, or None if there is no such executable.
+    """
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        if os.access(path, os.X_OK):
+            return (path, stat.st_ino, stat.st_mtime)
+
+
+def parse_stats(stats_response, columns):
+    """
+    Parses the CSV output of a "show stat" command, returning a dictionary
+    mapping each service (i.e. proxy) name to a dictionary mapping the names
+    of the service's servers to a dictionary of the given columns.
+
+    The header line is prefixed with "# " and rows end with a trailing
+    comma, blank lines are skipped.  Rows are read one at a time and only
+    the given columns are pulled out of each, so the cost of the output's
+    many other columns is limited to splitting them.
+    """
+    rows = csv.reader(stats_response.splitlines())
+
+    header = next(rows, [])
+    if header:
+        header[0] = header[0].lstrip("# ")
+    if "pxname" not in header or "svname" not in header:
+        return {}
+
+    service_index = header.index("pxname")
+    server_index = header.index("svname")
+    wanted = [
+        (column, header.index(column))
+        for column in columns if column in header
+    ]
+
+    stats = {}
+    for row in rows:
+        if len(row) <= max(service_index, server_index):
+            continue
+
+        stats.setdefault(row[service_index], {})[row[server_index]] = dict(
+            (column, row[index])
+            for column, index in wanted if index < len(row)
+        )
+
+    return stats
+
+
+def batch_commands(commands):
+    """
+    Generator that groups the given commands into lists whose semicolon-joined
+    length stays under `MAX_COMMAND_LINE_LENGTH`.
+
+    A single command longer than the max is given a batch of its own.
+    """
+    batch = []
+    length = 0
+
+    for command in commands:
+        if batch and length + len(command) + 1 > MAX_COMMAND_LINE_LENGTH:
+            yield batch
+            batch = []
+            length = 0
+
+        batch.append(command)
+        length += len(command) + 1
+
+    if batch:
+        yield batch
+
+
 class HAProxyControlError(Exception):
     """
     Base exception for HAProxyControl-related actions.
@@ -0,0 +1,126 @@
+import logging
+
+
+SLOT_PREFIX = "slot"
+
+# address used for the placeholder servers of unfilled slots, these servers
+# are in maintenance mode so the address is never actually used
+PLACEHOLDER_ADDRESS = "127.0.0.1:1"
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlotPool(object):
+    """
+    Class tracking the fixed pool of server "slots" in a cluster's backend.
+
+    Rather than listing a server per node, a backend using a slot pool has a
+    set number of servers named "slot1", "slot2", etc.  Nodes are placed in
+    free slots at runtime via the HAProxy control socket, so that nodes
+    coming and going doesn't require a reload unless the pool runs out of
+    free slots.
+
+    The `nodes` attribute is a dictionary mapping slot number to the node
+    occupying that slot.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.nodes = {}
+
+    @classmethod
+    def for_nodes(cls, nodes, spare_slots):
+        """
+        Returns a new SlotPool with the given nodes placed in the first slots
+        and `spare_slots` free slots left over.
+        """
+        pool = cls(len(nodes) + spare_slots)
+        pool.update(nodes)
+
+        return pool
+
+    @staticmethod
+    def slot_name(number):
+        """
+        Returns the HAProxy server name for the slot with the given number.
+        """
+        return SLOT_PREFIX + str(number)
+
+    def update(self, nodes):
+        """
+        Updates the pool to hold exactly the given nodes.
+
+        Returns a two-element tuple: a list of (<slot number>, <node>) tuples
+        for the newly placed nodes and a list of slot numbers that were freed
+        up.  If there are not enough free slots for the new nodes the pool is
+        left untouched and None is returned.
+
+        Nodes are matched up by name and IP, a node whose IP changed is
+        considered a removed node plus an added one.  Slots freed up by this
+        update are only re-used if no other slots are free.
+        """
+        wanted = dict(((node.name, node.ip), node) for node in nodes)
+        current = dict(
+            ((node.name, node.ip), number)
+            for number, node in self.nodes.items()
+        )
+
+        removed = sorted([
+            number for key, number in current.items() if key not in wanted
+        ])
+        new_nodes = sorted(
+            [node for key, node in wanted.items() if key not in current],
+            key=lambda node: node.name
+        )
+
+        if len(new_nodes) > self.size - len(self.nodes) + len(removed):
+            return None
+
+        for number in removed:
+            del self.nodes[number]
+        for key, number in current.items():
+            if key in wanted:
+                self.nodes[number] = wanted[key]
+
+        free_slots = [
+            number for number in range(1, self.size + 1)
+            if number not in self.nodes and number not in removed
+        ] + removed
+
+        added = []
+        for number, node in zip(free_slots, new_nodes):
+            self.nodes[number] = node
+            added.append((number, node))
+
+        return added, removed
+
+    def free_ranges(self):
+        """
+        Returns a list of (<first>, <last>) tuples, one for each contiguous
+        range of free slot numbers.
+        """
+        ranges = []
+
+        for number in range(1, self.size + 1):
+            if number in self.nodes:
+                continue
+            if ranges and ranges[-1][1] == number - 1:
+                ranges[-1] = (ranges[-1][0], number)
+            else:
+                ranges.append((number, number))
+
+        return ranges
+
+    def fingerprint(self):
+        """
+        Returns a hashable value that changes whenever the size of the pool
+        or which node fills which slot changes.
+        """
+        return (
+            self.size,
+            tuple(sorted(
+                (number, node.name, node.ip, node.port)
+                for number, node in self.nodes.items()
+            ))
+        )
@@ -1,5 +1,6 @@
 import logging
 
+from ..slots import SlotPool, SLOT_PREFIX, PLACEHOLDER_ADDRESS
 from .stanza import Stanza
 
 
@@ -15,9 +16,13 @@ class BackendStanza(Stanza):
 
     A given cluster can define custom directives via a list of lines in their
     haproxy config with the key "backend".
+
+    If a `slot_pool` is given the servers are named after their slots rather
+    than their nodes, and the free slots are listed via "server-template"
+    lines as disabled placeholder servers.
     """
 
-    def __init__(self, cluster):
+    def __init__(self, cluster, slot_pool=None):
         super(BackendStanza, self).__init__("backend")
         self.header = "backend %s" % cluster.name
 
@@ -29,6 +34,19 @@ class BackendStanza(Stanza):
 
         backend_lines = cluster.haproxy.get("backend", [])
         self.add_lines(backend_lines)
+
+        if slot_pool is not None:
+            if "mode http" in backend_lines and not uses_dynamic_cookies(
+                    backend_lines
+            ):
+                logger.warning(
+                    "Cluster %s uses server slots in http mode, which don't"
+                    " get per-server cookies.  Use dynamic cookies for"
+                    " cookie-based persistence.", cluster.name
+                )
+            self.add_slot_lines(cluster, slot_pool)
+            return
+
         for node in cluster.nodes:
             http_mode = bool("mode http" in backend_lines)
             self.add_line(
@@ -40,3 +58,44 @@ class BackendStanza(Stanza):
                     "options": cluster.haproxy.get("server_options", "")
                 }
             )
+
+    def add_slot_lines(self, cluster, slot_pool):
+        """
+        Adds a server line for each filled slot in the given pool and a
+        "server-template" line for each range of free slots.
+        """
+        options = cluster.haproxy.get("server_options", "")
+
+        for number, node in sorted(slot_pool.nodes.items()):
+            self.add_line(
+                "server %(name)s %(host)s:%(port)s %(options)s" % {
+                    "name": SlotPool.slot_name(number),
+                    "host": node.ip,
+                    "port": node.port,
+                    "options": options
+                }
+            )
+
+        for first, last in slot_pool.free_ranges():
+            self.add_line(
+                "server-template %(prefix)s %(first)d-%(last)d %(address)s"
+                " disabled %(options)s" % {
+                    "prefix": SLOT_PREFIX,
+                    "first": first,
+                    "last": last,
+                    "address": PLACEHOLDER_ADDRESS,
+                    "options": options
+                }
+            )
+
+
+def uses_dynamic_cookies(backend_lines):
+    """
+    Returns True if the given backend lines set up HAProxy's dynamic cookies
+    (e.g. "cookie SRV insert dynamic"), which are generated from each
+    server's address rather than set per server line.
+    """
+    return any(
+        line.split()[:1] == ["cookie"] and "dynamic" in line.split()
+        for line in backend_lines
+    )
@@ -0,0 +1,92 @@
+import logging
+import socket
+import threading
+import time
+
+
+DEFAULT_TTL = 300  # seconds
+FAILED_LOOKUP_RETRY_INTERVAL = 10  # seconds
+
+
+logger = logging.getLogger(__name__)
+
+
+class Identity(object):
+    """
+    The name and IP address of the host lighthouse is running on.
+
+    Looking these up means DNS queries, which can be slow, so the results
+    are cached for `ttl` seconds and shared by everything in the process.
+    The cache can be cleared early with `refresh()`, and either value can be
+    set explicitly via `configure()` so that it's never looked up at all.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.name_override = None
+        self.ip_override = None
+
+        self.lock = threading.Lock()
+        self.cached = None
+        self.expires_at = 0
+
+    def configure(self, name=None, ip=None, ttl=None):
+        """
+        Sets the name and/or IP to use instead of looking them up, and
+        optionally a new TTL for the cache.
+        """
+        with self.lock:
+            self.name_override = name
+            self.ip_override = ip
+            if ttl is not None:
+                self.ttl = ttl
+            self.cached = None
+
+    def refresh(self):
+        """
+        Clears the cache so that the next `get()` looks up the name and IP
+        again, e.g. after the host's network configuration changed.
+        """
+        with self.lock:
+            self.cached = None
+
+    def get(self):
+        """
+        Returns the (<name>, <ip>) of the current host, looking them up only
+        if the cached values have expired.
+
+        If a lookup fails while there are cached values the stale values are
+        used (and the lookup retried a little later) rather than raising.
+        """
+        with self.lock:
+            now = time.time()
+            if self.cached is not None and now < self.expires_at:
+                return self.cached
+
+            try:
+                self.cached = self.look_up()
+            except socket.error:
+                if self.cached is None:
+                    raise
+                logger.warning(
+                    "Error looking up host name/IP, using %s", self.cached,
+                    exc_info=True
+                )
+                self.expires_at = now + FAILED_LOOKUP_RETRY_INTERVAL
+                return self.cached
+
+            self.expires_at = now + self.ttl
+            return self.cached
+
+    def look_up(self):
+        """
+        Looks up the fully qualified name and IP address of the current host,
+        unless they're overridden.
+        """
+        name = self.name_override or socket.getfqdn()
+        ip = self.ip_override or socket.gethostbyname(name)
+
+        return name, ip
+
+
+local = Identity()
@@ -0,0 +1,353 @@
+import bisect
+import contextlib
+import logging
+import threading
+import time
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+
+
+# default histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_ADDRESS = "127.0.0.1"
+
+
+logger = logging.getLogger(__name__)
+
+
+class Registry(object):
+    """
+    Collection of metrics that can be rendered in the Prometheus text
+    exposition format.
+
+    Metrics are keyed by name, registering a metric with the same name as an
+    existing one replaces it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, metric):
+        """
+        Adds the given metric to the registry and returns it.
+        """
+        with self.lock:
+            self.metrics[metric.name] = metric
+
+        return metric
+
+    def render(self):
+        """
+        Returns the text exposition of all of the registered metrics.
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+
+        lines = []
+        for metric in metrics:
+            lines.append("# HELP %s %s" % (metric.name, metric.help_text))
+            lines.append("# TYPE %s %s" % (metric.name, metric.metric_type))
+            for name, labels, value in metric.samples():
+                lines.append("%s%s %s" % (
+                    name, format_labels(labels), format_value(value)
+                ))
+
+        return "\n".join(lines) + "\n"
+
+
+# the registry metrics are added to unless told otherwise
+default_registry = Registry()
+
+
+class Metric(object):
+    """
+    Base class for metrics.
+
+    Each metric has a `name`, `help_text` and a set of values keyed on label
+    values.  Labels are passed as keyword arguments when recording.
+    """
+
+    metric_type = None
+
+    def __init__(self, name, help_text, registry=None):
+        self.name = name
+        self.help_text = help_text
+
+        self.lock = threading.Lock()
+        self.values = {}
+
+        (registry or default_registry).register(self)
+
+    def samples(self):
+        """
+        Returns a list of (<sample name>, <labels>, <value>) tuples.
+
+        Subclasses must define this.
+        """
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    A value that only ever goes up, e.g. the number of restarts.
+    """
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increments the counter for the given labels by the given amount.
+        """
+        key = label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        """
+        Returns one sample per set of labels.
+        """
+        with self.lock:
+            return [
+                (self.name, key, value)
+                for key, value in sorted(self.values.items())
+            ]
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down, read from the given function whenever
+    the metrics are rendered (e.g. a queue's size).
+    """
+
+    metric_type = "gauge"
+
+    def __init__(self, name, help_text, fn, registry=None):
+        self.fn = fn
+        super(Gauge, self).__init__(name, help_text, registry=registry)
+
+    def samples(self):
+        """
+        Returns the single sample given by the gauge's function, or no
+        samples if the function fails.
+        """
+        try:
+            return [(self.name, (), float(self.fn()))]
+        except Exception:
+            logger.debug("Could not read gauge %s", self.name, exc_info=True)
+            return []
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (e.g. durations in seconds) counted in
+    cumulative buckets, along with their sum and count.
+    """
+
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS,
+                 registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, help_text, registry=registry)
+
+    def observe(self, value, **labels):
+        """
+        Records the given value for the given labels.
+        """
+        key = label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self.lock:
+            if key not in self.values:
+                self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            self.values[key][0][index] += 1
+            self.values[key][1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """
+        Context manager that observes how long its block took to run.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+    def samples(self):
+        """
+        Returns the cumulative bucket, sum and count samples for each set of
+        labels.
+        """
+        samples = []
+
+        with self.lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self.values.items()
+            )
+
+        for key, (counts, total) in values:
+            cumulative = 0
+            bounds = [format_value(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                samples.append((
+                    self.name + "_bucket", key + (("le", bound),), cumulative
+                ))
+            samples.append((self.name + "_sum", key, total))
+            samples.append((self.name + "_count", key, cumulative))
+
+        return samples
+
+
+def label_key(labels):
+    """
+    Returns a hashable, ordered key for the given labels dictionary.
+    """
+    return tuple(sorted((k, str(v)) for k, v in six.iteritems(labels)))
+
+
+def format_labels(labels):
+    """
+    Formats the given (<name>, <value>) label pairs for the exposition format.
+    """
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"' % (
+            name,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace(
+                '"', '\\"'
+            )
+        )
+        for name, value in labels
+    )
+
+
+def format_value(value):
+    """
+    Formats a sample value, using integer notation for whole numbers.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Request handler serving the server's registry at `/metrics`.
+    """
+
+    def do_GET(self):
+        """
+        Responds with the rendered metrics, or a 404 for any other path.
+        """
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Sends request logs to the debug log rather than stderr.
+        """
+        logger.debug("Metrics request: " + format, *args)
+
+
+class HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Threaded HTTP server with a `registry` to serve.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, registry):
+        BaseHTTPServer.HTTPServer.__init__(self, address, MetricsHandler)
+        self.registry = registry
+
+
+class MetricsServer(object):
+    """
+    Serves a metrics registry over HTTP on a background thread.
+    """
+
+    def __init__(self, port, address=DEFAULT_ADDRESS, registry=None):
+        self.port = port
+        self.address = address
+        self.registry = registry or default_registry
+
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """
+        Binds the HTTP server and starts serving requests.
+        """
+        self.server = HTTPServer((self.address, self.port), self.registry)
+        self.port = self.server.server_address[1]
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        logger.info(
+            "Serving metrics on http://%s:%d/metrics", self.address, self.port
+        )
+
+    def stop(self):
+        """
+        Stops serving requests and closes the server's socket.
+        """
+        if not self.server:
+            return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+sync_duration = Histogram(
+    "lighthouse_sync_duration_seconds",
+    "Time taken to sync all of the balancer config files."
+)
+config_generation_duration = Histogram(
+    "lighthouse_config_generation_seconds",
+    "Time taken to generate a balancer's config file content."
+)
+restarts = Counter(
+    "lighthouse_haproxy_restarts_total",
+    "Number of attempted HAProxy restarts, by result."
+)
+socket_command_duration = Histogram(
+    "lighthouse_socket_command_seconds",
+    "Round trip time of (batches of) commands sent to the HAProxy socket."
+)
+zookeeper_fetch_duration = Histogram(
+    "lighthouse_zookeeper_fetch_seconds",
+    "Time taken to fetch a cluster's nodes from ZooKeeper."
+)
+check_duration = Histogram(
+    "lighthouse_check_duration_seconds",
+    "Time taken to perform a health check, by service and check."
+)
+check_results = Counter(
+    "lighthouse_check_results_total",
+    "Number of health check results, by service, check and result."
+)
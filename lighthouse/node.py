@@ -1,12 +1,26 @@
 import json
 import logging
-import socket
 
-from .peer import Peer
+import six
+
+from . import identity
+from .peer import Peer, DEFAULT_PEER_PORT
+
+
+# versions of the serialized node format, the legacy one has no "v" key
+LEGACY_FORMAT = 1
+COMPACT_FORMAT = 2
+FORMATS = {"legacy": LEGACY_FORMAT, "compact": COMPACT_FORMAT}
+
+MAX_SHARED_METADATA = 1024
 
 
 logger = logging.getLogger(__name__)
 
+# parsed metadata dicts keyed by their serialized form (or for already parsed
+# metadata, their sorted items), see `parse_metadata()`
+shared_metadata = {}
+
 
 class Node(object):
     """
@@ -15,8 +29,14 @@ class Node(object):
     Consists of a `port`, a `host` and a `peer`, plus methods for serializing
     and deserializing themselves so that they can be transmitted back and
     forth via discovery methods.
+
+    Writers can hold a great many nodes, so nodes are slotted and the peers
+    and metadata of deserialized nodes are shared with other nodes; treat
+    them as read-only.
     """
 
+    __slots__ = ("port", "host", "ip", "peer", "metadata")
+
     def __init__(self, host, ip, port, peer=None, metadata=None):
         self.port = port
         self.host = host
@@ -36,21 +56,30 @@ class Node(object):
         """
         Returns a Node instance representing the current service node.
 
-        Collects the host and IP information for the current machine and
-        the port information from the given service.
+        Takes the host and IP information for the current machine from the
+        cached local identity and the port information from the given service.
         """
-        host = socket.getfqdn()
+        host, ip = identity.local.get()
         return cls(
             host=host,
-            ip=socket.gethostbyname(host),
+            ip=ip,
             port=port,
             metadata=service.metadata
         )
 
-    def serialize(self):
+    def serialize(self, version=LEGACY_FORMAT):
         """
-        Serializes the node data as a JSON map string.
+        Serializes the node data as a JSON map string, in the given format.
+
+        The legacy format nests the peer and metadata as JSON strings within
+        the map, the compact one is a single level map with short keys that
+        leaves out the peer's name and IP when they're the same as the node's.
         """
+        if version == COMPACT_FORMAT:
+            return self.serialize_compact()
+        if version != LEGACY_FORMAT:
+            raise ValueError("Unknown node format version: %r" % version)
+
         return json.dumps({
             "port": self.port,
             "ip": self.ip,
@@ -59,15 +88,42 @@ class Node(object):
             "metadata": json.dumps(self.metadata or {}, sort_keys=True),
         }, sort_keys=True)
 
+    def serialize_compact(self):
+        """
+        Serializes the node data in the compact format, e.g.::
+
+          {"h":"app01","i":"10.0.0.1","m":{"role":"web"},"p":8000,"v":2}
+
+        The peer's name ("pn"), IP ("pi") and port ("pp") are only included
+        if they differ from the node's host, the node's IP and the default
+        peer port, respectively.  Empty metadata is left out.
+        """
+        data = {
+            "v": COMPACT_FORMAT,
+            "h": self.host,
+            "i": self.ip,
+            "p": self.port,
+        }
+        if self.peer:
+            if self.peer.name != self.host:
+                data["pn"] = self.peer.name
+            if self.peer.ip != self.ip:
+                data["pi"] = self.peer.ip
+            if self.peer.port != DEFAULT_PEER_PORT:
+                data["pp"] = self.peer.port
+        if self.metadata:
+            data["m"] = self.metadata
+
+        return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
     @classmethod
     def deserialize(cls, value):
         """
-        Creates a new Node instance via a JSON map string.
+        Creates a new Node instance via a JSON map string in either format.
 
-        Note that `port` and `ip` and are required keys for the JSON map,
-        `peer` and `host` are optional.  If `peer` is not present, the new Node
-        instance will use the current peer.  If `host` is not present, the
-        hostname of the given `ip` is looked up.
+        Payloads with a "v" key are in the versioned (i.e. compact) format,
+        ones without are in the legacy format.  Unknown versions raise a
+        ValueError.
         """
         if getattr(value, "decode", None):
             value = value.decode()
@@ -75,25 +131,138 @@ class Node(object):
         logger.debug("Deserializing node data: '%s'", value)
         parsed = json.loads(value)
 
+        version = parsed.get("v", LEGACY_FORMAT)
+        if version == COMPACT_FORMAT:
+            return cls.from_compact(parsed)
+        if version != LEGACY_FORMAT:
+            raise ValueError("Unknown node format version: %r" % version)
+
+        return cls.from_legacy(parsed)
+
+    @classmethod
+    def from_legacy(cls, parsed):
+        """
+        Creates a new Node instance from a parsed legacy format JSON map.
+
+        Note that `port` and `ip` and are required keys for the JSON map,
+        `peer` and `host` are optional.  If `peer` is not present, the new Node
+        instance will use the current peer.  If `host` is not present, the
+        IP is used as the host (and so in the node's name).
+
+        The host isn't looked up via reverse DNS: lookups block the watch
+        callbacks, and a name that depends on when (or whether) a lookup
+        finished would differ between writers and change over time, while the
+        node's name is used as its HAProxy server name and cookie.
+        """
         if "port" not in parsed:
             raise ValueError("No port defined for node.")
         if "ip" not in parsed:
             raise ValueError("No IP address defined for node.")
         if "host" not in parsed:
-            host, aliases, ip_list = socket.gethostbyaddr(parsed["ip"])
-            parsed["host"] = socket.get_fqdn(host)
-        if "peer" in parsed:
+            parsed["host"] = parsed["ip"]
+        if parsed.get("peer"):
             peer = Peer.deserialize(parsed["peer"])
         else:
             peer = None
 
         return cls(
-            parsed["host"], parsed["ip"], parsed["port"],
-            peer=peer, metadata=parsed.get("metadata")
+            intern_string(parsed["host"]), intern_string(parsed["ip"]),
+            parsed["port"],
+            peer=peer, metadata=parse_metadata(parsed.get("metadata"))
+        )
+
+    @classmethod
+    def from_compact(cls, parsed):
+        """
+        Creates a new Node instance from a parsed compact format JSON map.
+
+        The "p" (port) and "i" (IP) keys are required.  As with the legacy
+        format the IP is used as the host if "h" is missing.
+        """
+        if "p" not in parsed:
+            raise ValueError("No port defined for node.")
+        if "i" not in parsed:
+            raise ValueError("No IP address defined for node.")
+
+        ip = intern_string(parsed["i"])
+        host = intern_string(parsed.get("h") or ip)
+        peer_name = parsed.get("pn")
+        peer_ip = parsed.get("pi")
+        peer = Peer.intern(
+            intern_string(peer_name) if peer_name else host,
+            intern_string(peer_ip) if peer_ip else ip,
+            parsed.get("pp")
+        )
+
+        return cls(
+            host, ip, parsed["p"],
+            peer=peer, metadata=parse_metadata(parsed.get("m"))
         )
 
+    def __hash__(self):
+        """
+        Hash method used to store nodes in sets, consistent with `__eq__()`.
+        """
+        return hash((self.ip, self.port))
+
     def __eq__(self, other):
         """
         Nodes are considered equal if their IPs and ports both match.
         """
+        if not isinstance(other, Node):
+            return NotImplemented
+
         return bool(self.ip == other.ip and self.port == other.port)
+
+    def __ne__(self, other):
+        """
+        Inverse of `__eq__()`, needed on python 2.
+        """
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+
+def intern_string(value):
+    """
+    Interns the given host name or IP string, as the same hosts show up in
+    many clusters.  Non-`str` values (i.e. unicode on python 2) are returned
+    as-is.
+    """
+    if type(value) is not str:
+        return value
+
+    return six.moves.intern(value)
+
+
+def parse_metadata(value):
+    """
+    Returns the metadata dictionary for the given serialized (legacy format)
+    or already parsed (compact format) metadata.
+
+    Nodes of the same service generally have the same metadata, so the
+    dictionaries are shared between all nodes with the same metadata (up to
+    `MAX_SHARED_METADATA` different ones).  Parsed metadata is matched up by
+    its items in the order they were serialized in (writers sort them), and
+    isn't shared if it has unhashable values.
+    """
+    if isinstance(value, six.string_types):
+        key = value
+    elif isinstance(value, dict):
+        key = tuple(value.items())
+    else:
+        return value
+
+    try:
+        metadata = shared_metadata.get(key)
+    except TypeError:
+        return value
+    if metadata is None:
+        metadata = json.loads(value) if key is value else value
+        if len(shared_metadata) >= MAX_SHARED_METADATA:
+            shared_metadata.clear()
+        shared_metadata[key] = metadata
+
+    return metadata
@@ -1,5 +1,8 @@
 import json
-import socket
+import threading
+import weakref
+
+from . import identity
 
 
 DEFAULT_PEER_PORT = 1024
@@ -15,8 +18,20 @@ class Peer(object):
 
     This is helpful for HAProxy as a way to generate "peers" config stanzas
     so instances of HAProxy in a given cluster can share stick-table data.
+
+    Every node reported by a host carries that host's peer, so peers are
+    interned: `current()` and `deserialize()` hand out a single shared
+    instance per IP and port (as long as it's in use), which must not be
+    modified.
     """
 
+    __slots__ = ("name", "ip", "port", "__weakref__")
+
+    # shared instances keyed by (<ip>, <port>), and by serialized form
+    interned = weakref.WeakValueDictionary()
+    interned_serialized = weakref.WeakValueDictionary()
+    intern_lock = threading.Lock()
+
     def __init__(self, name, ip, port=None):
         self.name = name
         self.ip = ip
@@ -26,12 +41,30 @@ class Peer(object):
     def current(cls):
         """
         Helper method for getting the current peer of whichever host we're
-        running on.
+        running on, via the cached local identity.
+        """
+        name, ip = identity.local.get()
+
+        return cls.intern(name, ip)
+
+    @classmethod
+    def intern(cls, name, ip, port=None):
+        """
+        Returns the shared Peer instance with the given name, IP and port,
+        creating it if there isn't one.
+
+        If the shared instance for the IP and port has a different name it is
+        replaced with a new one.
         """
-        name = socket.getfqdn()
-        ip = socket.gethostbyname(name)
+        port = port or DEFAULT_PEER_PORT
 
-        return cls(name, ip)
+        with cls.intern_lock:
+            peer = cls.interned.get((ip, port))
+            if peer is None or peer.name != name:
+                peer = cls(name, ip, port)
+                cls.interned[(ip, port)] = peer
+
+        return peer
 
     def serialize(self):
         """
@@ -51,7 +84,14 @@ class Peer(object):
 
         The `name` and `ip` keys are required to be present in the JSON map,
         if the `port` key is not present the default is used.
+
+        The returned Peer is the shared, interned instance.  Values seen
+        before map straight to their instance without being parsed again.
         """
+        peer = cls.interned_serialized.get(value)
+        if peer is not None:
+            return peer
+
         parsed = json.loads(value)
 
         if "name" not in parsed:
@@ -61,18 +101,34 @@ class Peer(object):
         if "port" not in parsed:
             parsed["port"] = DEFAULT_PEER_PORT
 
-        return cls(parsed["name"], parsed["ip"], parsed["port"])
+        peer = cls.intern(parsed["name"], parsed["ip"], parsed["port"])
+        cls.interned_serialized[value] = peer
+
+        return peer
 
     def __hash__(self):
         """
         Hash method used to store peers in sets.
 
-        Simply hashes the string <ip address>:<port>.
+        Simply hashes the (<ip address>, <port>) tuple.
         """
-        return hash(self.ip + ":" + str(self.port))
+        return hash((self.ip, self.port))
 
     def __eq__(self, other):
         """
         Peers are considered equal if their IP and port match.
         """
+        if not isinstance(other, Peer):
+            return NotImplemented
+
         return self.ip == other.ip and self.port == other.port
+
+    def __ne__(self, other):
+        """
+        Inverse of `__eq__()`, needed on python 2.
+        """
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
@@ -27,8 +27,14 @@ class RedisCheck(TCPCheck):
 
     def apply_check_config(self, config):
         """
-        This method doesn't actually use any configuration data, as the query
-        and response for redis are already established.
+        This method doesn't use any check-specific configuration data, as the
+        query and response for redis are already established.  The base TCP
+        check's timeout settings still apply.
+
+        Redis replies to an inline "PING" command with the "+PONG" status
+        reply.
         """
-        self.query = "PING"
-        self.expected_response = "PONG"
+        super(RedisCheck, self).apply_check_config(config)
+
+        self.query = b"PING\r\n"
+        self.expected_response = b"+PONG"
@@ -1,10 +1,24 @@
 import logging
+import threading
+
+from concurrent import futures
 
 from .configs.watcher import ConfigWatcher
 from .log.config import Logging
 from .discovery import Discovery
 from .service import Service
-from .events import wait_on_event
+from .scheduler import CheckScheduler
+
+
+# max number of checks run at once across all services by the threaded engine
+MAX_CHECK_WORKERS = 16
+
+# seconds port changes are held back for, so that the changes of ports whose
+# checks finish around the same time are reported to discovery in one batch
+REPORT_BATCH_WINDOW = .5
+
+THREADED_ENGINE = "threads"
+ASYNCIO_ENGINE = "asyncio"
 
 
 logger = logging.getLogger(__name__)
@@ -15,13 +29,38 @@ class Reporter(ConfigWatcher):
     The service node reporting class.
 
     This config watcher manages Discovery and Service configurable items.  For
-    every service configured, a thread is created that periodically runs the
-    service's checks and reports the current node as up or down to the
-    service's chosen discovery method.
+    every service configured, a job is scheduled with a `CheckScheduler` that
+    periodically runs the service's checks in the work pool and reports the
+    current node as up or down to the service's chosen discovery method.
+
+    With the "asyncio" check engine the checks of all services are instead
+    run on a single event loop via an `AsyncCheckEngine`, which requires
+    python 3.5 or higher.
     """
 
     watched_configurables = (Logging, Discovery, Service)
 
+    def __init__(self, config_dir, check_engine=THREADED_ENGINE):
+        super(Reporter, self).__init__(config_dir)
+
+        self.check_pool = futures.ThreadPoolExecutor(
+            max_workers=MAX_CHECK_WORKERS
+        )
+
+        self.scheduler = CheckScheduler()
+        self.in_flight = {}
+
+        self.check_engine = None
+        if check_engine == ASYNCIO_ENGINE:
+            # imported here as the engine module is python 3.5+ only
+            from .engine import AsyncCheckEngine
+            self.check_engine = AsyncCheckEngine(
+                self.prepare_checks, self.submit_report
+            )
+            self.check_engine.start()
+        elif check_engine != THREADED_ENGINE:
+            raise ValueError("Unknown check engine '%s'" % check_engine)
+
     def on_discovery_add(self, discovery):
         """
         Added discovery method hook. Calls the `connect()` method on the new
@@ -32,8 +71,8 @@ class Reporter(ConfigWatcher):
     def on_discovery_update(self, name, new_config):
         """
         Once a Discovery is updated we update each associated Service to reset
-        its up/down status so that the next iteration of the `check_loop`
-        loop does the proper reporting again.
+        its up/down status so that the next run of the service's checks does
+        the proper reporting again.
         """
         for service in self.configurables[Service].values():
             if service.discovery == name:
@@ -48,63 +87,76 @@ class Reporter(ConfigWatcher):
 
     def on_service_add(self, service):
         """
-        When a new service is added, a worker thread is launched to
-        periodically run the checks for that service.
+        When a new service is added, a job is scheduled to periodically run
+        the checks for that service (or the service is handed to the asyncio
+        check engine if used).
+        """
+        if self.check_engine:
+            self.check_engine.add_service(service)
+            return
+
+        self.scheduler.add(
+            service.name, lambda: self.check_service(service),
+            service.check_interval, splay=service.check_splay
+        )
+
+    def on_service_update(self, name, new_config):
+        """
+        When a service is updated its checks are rescheduled in case the
+        check interval or splay changed.
         """
-        self.launch_thread(service.name, self.check_loop, service)
+        self.on_service_add(self.configurables[Service][name])
 
     def on_service_remove(self, name):
         """
-        If a service is removed, the associated check loop thread is killed.
+        If a service is removed, the associated check job is unscheduled (or
+        the check engine stops checking the service).
         """
-        self.kill_thread(name)
+        if self.check_engine:
+            self.check_engine.remove_service(name)
+            return
 
-    def check_loop(self, service):
+        self.scheduler.remove(name)
+        self.in_flight.pop(name, None)
+
+    def check_service(self, service):
         """
-        While the reporter is not shutting down and the service being checked
-        is present in the reporter's configuration, this method will launch a
-        job to run all of the service's checks and then pause for the
-        configured interval.
+        Scheduled job that submits a run of the service's checks to the work
+        pool.
+
+        If the previous run is still going, this run is skipped and counted
+        as a missed deadline.
         """
-        logger.info("Starting check loop for service '%s'", service.name)
+        previous = self.in_flight.get(service.name)
+        if previous and not previous.done():
+            logger.warning(
+                "Checks for service '%s' still running, skipping this run.",
+                service.name
+            )
+            self.scheduler.missed[service.name] += 1
+            return
 
         def handle_checks_result(f):
             try:
-                came_up, went_down = f.result()
+                f.result()
             except Exception:
                 logger.exception("Error checking service '%s'", service.name)
-                return
-
-            if not came_up and not went_down:
-                return
-
-            discovery = self.configurables[Discovery][service.discovery]
-
-            for port in came_up:
-                logger.debug("Reporting %s, port %d up", service.name, port)
-                discovery.report_up(service, port)
-            for port in went_down:
-                logger.debug("Reporting %s, port %d down", service.name, port)
-                discovery.report_down(service, port)
-
-        while (
-                service in self.configurables[Service].values() and
-                not self.shutdown.is_set()
-        ):
-            self.work_pool.submit(
-                self.run_checks, service
-            ).add_done_callback(
-                handle_checks_result
-            )
 
-            logger.debug("sleeping for %s seconds", service.check_interval)
-            wait_on_event(self.shutdown, timeout=service.check_interval)
+        f = self.work_pool.submit(self.run_checks, service)
+        self.in_flight[service.name] = f
+        f.add_done_callback(handle_checks_result)
 
     def run_checks(self, service):
         """
         Runs each check for the service and reports to the service's discovery
         method based on the results.
 
+        The checks are run concurrently on the `check_pool` executor and the
+        checks have until the service's check interval is up to finish.  The
+        ports' changes are collected in a `PortChangeBatch`, so that they're
+        reported together once the checks are done, or `REPORT_BATCH_WINDOW`
+        seconds after the first change if other ports' checks take longer.
+
         If all checks pass and the service's present node was previously
         reported as down, the present node is reported as up.  Conversely, if
         any of the checks fail and the service's present node was previously
@@ -112,26 +164,148 @@ class Reporter(ConfigWatcher):
         """
         logger.debug("Running checks. (%s)", service.name)
 
+        if not self.prepare_checks(service):
+            return
+
+        batch = PortChangeBatch(
+            service.name,
+            lambda came_up, went_down: self.report_results(
+                service, came_up, went_down
+            ),
+            REPORT_BATCH_WINDOW
+        )
+        try:
+            came_up, went_down = service.run_checks(
+                executor=self.check_pool,
+                timeout=service.check_interval,
+                callback=batch.add
+            )
+            batch.add(came_up, went_down)
+        finally:
+            batch.flush()
+
+    def prepare_checks(self, service):
+        """
+        Makes sure the service's checks should be run and updates its ports.
+
+        Returns False if the service's discovery method is unknown or
+        unavailable, True otherwise.
+        """
         if service.discovery not in self.configurables[Discovery]:
             logger.warn(
                 "Service %s is using Unknown/unavailable discovery '%s'.",
                 service.name, service.discovery
             )
-            return set(), set()
+            return False
 
         service.update_ports()
 
-        came_up, went_down = service.run_checks()
+        return True
 
-        return came_up, went_down
+    def submit_report(self, service, came_up, went_down):
+        """
+        Submits a job to the work pool reporting the given port changes, used
+        by the asyncio check engine so that the (blocking) discovery calls
+        happen off of the event loop.
+        """
+        def handle_report_result(f):
+            try:
+                f.result()
+            except Exception:
+                logger.exception(
+                    "Error reporting service '%s'", service.name
+                )
 
-    def wind_down(self):
+        self.work_pool.submit(
+            self.report_results, service, came_up, went_down
+        ).add_done_callback(
+            handle_report_result
+        )
+
+    def report_results(self, service, came_up, went_down):
         """
-        Winds down the reporter by stopping any discovery method instances and
-        joining any running threads.
+        Reports the service's present node as up to the service's discovery
+        method for each port in `came_up`, and as down for each port in
+        `went_down`, all in one batch.
+        """
+        if not came_up and not went_down:
+            return
+
+        discovery = self.configurables[Discovery][service.discovery]
 
-        The base ConfigWatcher's `stop()` method sets the shutdown event so
-        each check loop thread should eventually stop cleanly.
+        logger.debug(
+            "Reporting %s up on ports %s and down on ports %s",
+            service.name, sorted(came_up), sorted(went_down)
+        )
+        discovery.report_batch(service, sorted(came_up), sorted(went_down))
+
+    def wind_down(self):
         """
+        Winds down the reporter by stopping the check scheduler or engine and
+        any discovery method instances.
+        """
+        self.scheduler.stop()
+
+        if self.check_engine:
+            self.check_engine.stop()
+
+        self.check_pool.shutdown(wait=False)
+
         for discovery in self.configurables[Discovery].values():
             discovery.stop()
+
+
+class PortChangeBatch(object):
+    """
+    Collects the ports of the named service that came up or went down during
+    a round of its checks, so that they're handed to the `report` function
+    together.
+
+    Changes are reported `window` seconds after the first change of a batch
+    comes in or whenever `flush()` is called (i.e. at the end of the round),
+    whichever comes first.  Reports are made one at a time.
+    """
+
+    def __init__(self, name, report, window):
+        self.name = name
+        self.report = report
+        self.window = window
+
+        self.lock = threading.Lock()
+        self.came_up = set()
+        self.went_down = set()
+        self.timer = None
+
+    def add(self, came_up, went_down):
+        """
+        Adds the given sets of ports that came up and went down to the batch,
+        starting the window's timer if need be.
+        """
+        with self.lock:
+            self.came_up.update(came_up)
+            self.went_down.update(went_down)
+
+            if self.timer is None and (self.came_up or self.went_down):
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """
+        Reports the changes collected so far, if any.  Errors are logged
+        rather than raised since this may run on the timer's thread.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            came_up, self.came_up = self.came_up, set()
+            went_down, self.went_down = self.went_down, set()
+            if not came_up and not went_down:
+                return
+
+            try:
+                self.report(came_up, went_down)
+            except Exception:
+                logger.exception("Error reporting service '%s'", self.name)
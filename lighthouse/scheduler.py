@@ -0,0 +1,180 @@
+import collections
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+
+# monotonic clock where available so that wall clock jumps don't cause
+# bursts of checks or missed deadlines
+now = getattr(time, "monotonic", time.time)
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_next_deadline(deadline, interval, current_time):
+    """
+    Returns the deadline following the given one at a fixed rate of one per
+    `interval` seconds, along with the number of deadlines missed.
+
+    If `current_time` is already past one or more of the following deadlines
+    those are skipped (and counted as missed) rather than fired in a burst.
+    """
+    next_deadline = deadline + interval
+    if next_deadline > current_time:
+        return next_deadline, 0
+
+    missed = int((current_time - deadline) // interval)
+
+    return deadline + (missed + 1) * interval, missed
+
+
+def get_splay(splay):
+    """
+    Returns a random offset between zero and the given `splay` seconds.
+    """
+    if not splay:
+        return 0
+
+    return random.uniform(0, splay)
+
+
+class CheckScheduler(object):
+    """
+    Heap-based scheduler firing named jobs at fixed-rate deadlines.
+
+    Rather than each job sleeping for its interval after running (and so
+    drifting by however long the run takes), each job's deadlines are set
+    `interval` seconds apart from the first one.  The first deadline is
+    offset by a random "splay" so that jobs added at the same time with the
+    same interval don't all fire in lockstep.
+
+    Jobs are run on the scheduler's single thread so they should be quick,
+    e.g. submitting the actual work to a pool.  Deadlines that pass while the
+    scheduler is busy are skipped, logged and counted in the `missed`
+    dictionary.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.heap = []
+        self.entries = {}
+        self.tokens = itertools.count()
+        self.missed = collections.defaultdict(int)
+
+        self.thread = None
+        self.stopped = False
+
+    def add(self, name, fn, interval, splay=0):
+        """
+        Schedules the given function to be called every `interval` seconds,
+        with the first call delayed by a random amount of up to `splay`
+        seconds.
+
+        Any job already scheduled under the same name is replaced.  The
+        scheduler thread is started on the first call.
+        """
+        with self.condition:
+            token = next(self.tokens)
+            self.entries[name] = (token, fn, interval)
+            heapq.heappush(
+                self.heap, (now() + get_splay(splay), token, name)
+            )
+            self.condition.notify()
+
+            if self.thread is None and not self.stopped:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def remove(self, name):
+        """
+        Unschedules the job with the given name.
+
+        The job's entry in the heap is left to be discarded once it comes up.
+        """
+        with self.condition:
+            self.entries.pop(name, None)
+            self.missed.pop(name, None)
+
+    def run(self):
+        """
+        Loops over the due jobs and calls them until stopped.
+        """
+        while True:
+            with self.condition:
+                due = self.wait_for_due()
+
+            if due is None:
+                return
+
+            name, fn = due
+            try:
+                fn()
+            except Exception:
+                logger.exception("Error running scheduled job '%s'", name)
+
+    def wait_for_due(self):
+        """
+        Blocks until a job is due and returns its (<name>, <function>), or
+        None if the scheduler is stopped.  Must be called with the
+        `condition` held.
+        """
+        while not self.stopped:
+            due, timeout = self.pop_due(now())
+            if due:
+                return due
+
+            self.condition.wait(timeout)
+
+        return None
+
+    def pop_due(self, current_time):
+        """
+        Pops the next due job off of the heap and reschedules it.  Must be
+        called with the `condition` held.
+
+        Returns a two-element tuple: the (<name>, <function>) of the due job
+        (or None if no job is due yet) and the number of seconds until the
+        next deadline (or None if no jobs are scheduled).
+        """
+        while self.heap:
+            deadline, token, name = self.heap[0]
+
+            entry = self.entries.get(name)
+            if not entry or entry[0] != token:
+                heapq.heappop(self.heap)
+                continue
+
+            if deadline > current_time:
+                return None, deadline - current_time
+
+            _, fn, interval = entry
+            next_deadline, missed = get_next_deadline(
+                deadline, interval, current_time
+            )
+            if missed:
+                self.missed[name] += missed
+                logger.warning(
+                    "Missed %d deadline(s) for '%s'", missed, name
+                )
+
+            heapq.heapreplace(self.heap, (next_deadline, token, name))
+
+            return (name, fn), None
+
+        return None, None
+
+    def stop(self):
+        """
+        Stops the scheduler thread and waits for it to finish.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+        if self.thread:
+            self.thread.join()
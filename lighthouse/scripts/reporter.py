@@ -1,6 +1,6 @@
 import argparse
 
-from lighthouse import log, reporter
+from lighthouse import identity, log, metrics, reporter
 
 
 parser = argparse.ArgumentParser(
@@ -11,6 +11,33 @@ parser.add_argument(
     "config_dir", type=str,
     help="The directory where config files are stored."
 )
+parser.add_argument(
+    "--check-engine", type=str, default=reporter.THREADED_ENGINE,
+    choices=(reporter.THREADED_ENGINE, reporter.ASYNCIO_ENGINE),
+    help="How to run health checks, the asyncio engine needs python 3.5+."
+)
+
+parser.add_argument(
+    "--metrics-port", type=int, default=None,
+    help="Port to serve metrics on at /metrics, disabled if not given."
+)
+parser.add_argument(
+    "--metrics-address", type=str, default=metrics.DEFAULT_ADDRESS,
+    help="Address to bind the metrics server to."
+)
+
+parser.add_argument(
+    "--hostname", type=str, default=None,
+    help="Name of this host to report, looked up if not given."
+)
+parser.add_argument(
+    "--ip", type=str, default=None,
+    help="IP address of this host to report, looked up if not given."
+)
+parser.add_argument(
+    "--identity-ttl", type=float, default=identity.DEFAULT_TTL,
+    help="Seconds to cache the looked up host name and IP address for."
+)
 
 
 def run():
@@ -18,9 +45,23 @@ def run():
 
     log.setup("REPORTER")
 
-    r = reporter.Reporter(args.config_dir)
+    identity.local.configure(
+        name=args.hostname, ip=args.ip, ttl=args.identity_ttl
+    )
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = metrics.MetricsServer(
+            args.metrics_port, address=args.metrics_address
+        )
+        metrics_server.start()
+
+    r = reporter.Reporter(args.config_dir, check_engine=args.check_engine)
 
     try:
         r.start()
     except KeyboardInterrupt:
         r.stop()
+    finally:
+        if metrics_server:
+            metrics_server.stop()
@@ -1,6 +1,6 @@
 import argparse
 
-from lighthouse import log, writer
+from lighthouse import identity, log, metrics, writer, sync
 
 
 parser = argparse.ArgumentParser(
@@ -11,6 +11,36 @@ parser.add_argument(
     "config_dir", type=str,
     help="The directory where config files are stored."
 )
+parser.add_argument(
+    "--sync-quiet-period", type=float, default=sync.DEFAULT_QUIET_PERIOD,
+    help="Seconds without cluster changes to wait for before syncing."
+)
+parser.add_argument(
+    "--sync-max-delay", type=float, default=sync.DEFAULT_MAX_DELAY,
+    help="Maximum seconds a sync can be delayed by a burst of changes."
+)
+
+parser.add_argument(
+    "--metrics-port", type=int, default=None,
+    help="Port to serve metrics on at /metrics, disabled if not given."
+)
+parser.add_argument(
+    "--metrics-address", type=str, default=metrics.DEFAULT_ADDRESS,
+    help="Address to bind the metrics server to."
+)
+
+parser.add_argument(
+    "--hostname", type=str, default=None,
+    help="Name of this host to report, looked up if not given."
+)
+parser.add_argument(
+    "--ip", type=str, default=None,
+    help="IP address of this host to report, looked up if not given."
+)
+parser.add_argument(
+    "--identity-ttl", type=float, default=identity.DEFAULT_TTL,
+    help="Seconds to cache the looked up host name and IP address for."
+)
 
 
 def run():
@@ -18,9 +48,27 @@ def run():
 
     log.setup("WRITER")
 
-    w = writer.Writer(args.config_dir)
+    identity.local.configure(
+        name=args.hostname, ip=args.ip, ttl=args.identity_ttl
+    )
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = metrics.MetricsServer(
+            args.metrics_port, address=args.metrics_address
+        )
+        metrics_server.start()
+
+    w = writer.Writer(
+        args.config_dir,
+        sync_quiet_period=args.sync_quiet_period,
+        sync_max_delay=args.sync_max_delay
+    )
 
     try:
         w.start()
     except KeyboardInterrupt:
         w.stop()
+    finally:
+        if metrics_server:
+            metrics_server.stop()
@@ -2,11 +2,16 @@ import collections
 import logging
 
 import six
+from concurrent import futures
 
 from .configurable import Configurable
 from .check import Check
 
 
+# entries under "checks" that are settings rather than check definitions
+CHECK_SETTINGS = ("interval", "splay")
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,9 +35,13 @@ class Service(Configurable):
 
         self.checks = collections.defaultdict(dict)
         self.check_interval = None
+        self.check_splay = 0
 
         self.is_up = collections.defaultdict(lambda: None)
 
+        # maps Check instances to the future of their in-flight run
+        self.running = {}
+
         self.metadata = {}
 
     @classmethod
@@ -64,7 +73,7 @@ class Service(Configurable):
             raise ValueError("No check interval defined.")
 
         for check_name, check_config in six.iteritems(config["checks"]):
-            if check_name == "interval":
+            if check_name in CHECK_SETTINGS:
                 continue
 
             Check.from_config(check_name, check_config)
@@ -90,6 +99,7 @@ class Service(Configurable):
         self.update_ports()
 
         self.check_interval = config["checks"]["interval"]
+        self.check_splay = config["checks"].get("splay", 0)
 
         self.update_checks(config["checks"])
 
@@ -129,12 +139,13 @@ class Service(Configurable):
         is left to the `run_checks` method.
         """
         for check_name, check_config in six.iteritems(check_configs):
-            if check_name == "interval":
+            if check_name in CHECK_SETTINGS:
                 continue
 
             for port in self.ports:
                 try:
                     check = Check.from_config(check_name, check_config)
+                    check.service_name = self.name
                     check.host = self.host
                     check.port = port
                     self.checks[port][check_name] = check
@@ -145,7 +156,7 @@ class Service(Configurable):
                     )
                     continue
 
-    def run_checks(self):
+    def run_checks(self, executor=None, timeout=None, callback=None):
         """
         Iterates over the configured ports and runs the checks on each one.
 
@@ -153,33 +164,181 @@ class Service(Configurable):
         transitioned from down to up, the second is the set of ports that
         transitioned from up to down.
 
-        Also handles the case where a check for a since-removed port is run,
-        marking the port as down regardless of the check's result and removing
-        the check(s) for the port.
+        If an `executor` is given the checks of all ports are run on it
+        concurrently rather than one after the other, see
+        `run_checks_concurrently()`.
+        """
+        if executor is not None:
+            return self.run_checks_concurrently(executor, timeout, callback)
+
+        for port in self.ports:
+            for check in self.checks[port].values():
+                check.run()
+
+        return self.update_status()
+
+    def run_checks_concurrently(self, executor, timeout=None, callback=None):
+        """
+        Submits each check of each port to the given executor and updates the
+        status of each port as soon as all of its checks are done.
+
+        If a `callback` is given it is called with the (<came up>, <went
+        down>) sets for each port that changed as soon as that port's checks
+        finish, and only changes not passed to the callback are returned.
+
+        Checks still running once `timeout` seconds have passed count as
+        failed for this round (see `record_overdue_checks()`).  A check whose
+        previous run is still going isn't submitted again, the new round
+        waits on the existing run instead.
         """
         came_up = set()
         went_down = set()
 
-        for port in self.ports:
-            checks = self.checks[port].values()
+        def port_done(port, checks_pass):
+            up, down = self.update_port_status(port, checks_pass)
+            if callback and (up or down):
+                callback(up, down)
+            elif not callback:
+                came_up.update(up)
+                went_down.update(down)
+
+        pending, remaining = self.submit_checks(executor)
+
+        for port in [p for p, count in remaining.items() if not count]:
+            port_done(port, self.checks_pass(port))
+
+        try:
+            for f in futures.as_completed(pending, timeout=timeout):
+                port, check = pending[f]
+                self.check_done(check, f)
+                remaining[port] -= 1
+                if not remaining[port]:
+                    port_done(port, self.checks_pass(port))
+        except futures.TimeoutError:
+            self.record_overdue_checks(pending, timeout)
+            for port in [p for p, count in remaining.items() if count]:
+                port_done(port, self.checks_pass(port))
+
+        went_down.update(self.remove_unused_ports())
 
-            if not checks:
-                logger.warn("No checks defined for self: %s", self.name)
+        return came_up, went_down
 
+    def submit_checks(self, executor):
+        """
+        Submits the checks of each port to the given executor.
+
+        Returns a dictionary mapping each resulting future to a (<port>,
+        <check>) tuple and a dictionary mapping each port to the number of
+        checks it has running.
+        """
+        pending = {}
+        remaining = {}
+
+        for port in self.ports:
+            checks = list(self.checks[port].values())
+            remaining[port] = len(checks)
             for check in checks:
-                check.run()
+                pending[self.submit_check(executor, check)] = (port, check)
+
+        return pending, remaining
+
+    def submit_check(self, executor, check):
+        """
+        Submits the given check's `run()` method to the executor and returns
+        the resulting future, unless a previous run is still in flight in
+        which case that run's future is returned.
+        """
+        f = self.running.get(check)
+        if f is None or f.done():
+            f = self.running[check] = executor.submit(check.run)
 
-            checks_pass = all([check.passing for check in checks])
+        return f
 
-            if self.is_up[port] in (False, None) and checks_pass:
-                came_up.add(port)
-                self.is_up[port] = True
-            elif self.is_up[port] in (True, None) and not checks_pass:
-                went_down.add(port)
-                self.is_up[port] = False
+    def record_overdue_checks(self, pending, timeout):
+        """
+        Records a failed result for each of the given checks whose run is
+        still going after `timeout` seconds, so that the check's rise and
+        fall counts decide whether its port is still up.
 
-        for unused_port in set(self.checks.keys()) - self.ports:
-            went_down.add(unused_port)
-            del self.checks[unused_port]
+        The overdue run isn't cancelled, the next round waits on it and its
+        own result is recorded once it's done.
+        """
+        for f, (port, check) in pending.items():
+            if f.done():
+                continue
+
+            logger.warn(
+                "%s check for %s port %d still running after %s seconds.",
+                check.name, self.name, port, timeout
+            )
+            check.record_result(False)
+
+    def check_done(self, check, f):
+        """
+        Forgets about the given finished run of the given check, unless a
+        newer run has been submitted since.
+        """
+        if self.running.get(check) is f:
+            del self.running[check]
+
+    def checks_pass(self, port):
+        """
+        Returns True if all of the given port's checks are passing.
+        """
+        checks = self.checks[port].values()
+
+        if not checks:
+            logger.warn("No checks defined for self: %s", self.name)
+
+        return all([check.passing for check in checks])
+
+    def update_port_status(self, port, checks_pass):
+        """
+        Updates the up/down status of the given port.
+
+        Returns a (<came up>, <went down>) tuple of sets, either holding the
+        port or empty.
+        """
+        if self.is_up[port] in (False, None) and checks_pass:
+            self.is_up[port] = True
+            return set([port]), set()
+        elif self.is_up[port] in (True, None) and not checks_pass:
+            self.is_up[port] = False
+            return set(), set([port])
+
+        return set(), set()
+
+    def update_status(self):
+        """
+        Updates the up/down status of each port based on the `passing` flags
+        of its checks.
+
+        Returns the same two-element tuple of (<came up>, <went down>) port
+        sets as `run_checks()`.
+        """
+        came_up = set()
+        went_down = set()
+
+        for port in self.ports:
+            up, down = self.update_port_status(port, self.checks_pass(port))
+            came_up.update(up)
+            went_down.update(down)
+
+        went_down.update(self.remove_unused_ports())
 
         return came_up, went_down
+
+    def remove_unused_ports(self):
+        """
+        Handles the case where checks for a since-removed port are present,
+        removing the check(s) for the port.
+
+        Returns the set of such ports, which are to be marked as down
+        regardless of their checks' results.
+        """
+        unused_ports = set(self.checks.keys()) - self.ports
+
+        for unused_port in unused_ports:
+            del self.checks[unused_port]
+
+        return unused_ports
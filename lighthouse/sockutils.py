@@ -1,31 +1,55 @@
 import errno
 import socket
+import time
 
 
-def get_response(sock, buffer_size=4096):
+DEFAULT_MAX_RESPONSE_SIZE = 64 * 1024  # bytes
+
+
+def get_response(sock, buffer_size=4096, deadline=None,
+                 max_size=DEFAULT_MAX_RESPONSE_SIZE):
     """
     Helper method for retrieving a response from a given socket.
 
     Returns two values in a tuple, the first is the reponse line and the second
-    is any extra data after the newline.
+    is any extra data after the newline.  Both are bytes.  If the other end
+    closes the connection before sending a newline, whatever was received is
+    returned as the response line.
+
+    If a `deadline` (a `time.time()` value) is given the socket's timeout is
+    set to the time remaining before each read and `socket.timeout` is raised
+    once the deadline passes.  A ValueError is raised if more than `max_size`
+    bytes come in without a newline.
     """
-    response = ""
-    extra = ""
+    response = bytearray()
 
     while True:
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise socket.timeout("Timed out waiting on a response line.")
+            sock.settimeout(remaining)
+
         try:
             chunk = sock.recv(buffer_size)
-            if chunk:
-                response += chunk
         except socket.error as e:
             if e.errno not in [errno.EAGAIN, errno.EINTR]:
                 raise
+            continue
 
-        if not response:
+        if not chunk:
             break
 
-        if "\n" in response:
-            response, extra = response.split("\n", 1)
-            break
+        # only the new chunk needs to be scanned for the newline
+        response.extend(chunk)
+        newline = response.find(b"\n", len(response) - len(chunk))
+
+        if newline != -1:
+            return bytes(response[:newline]), bytes(response[newline + 1:])
+
+        if len(response) > max_size:
+            raise ValueError(
+                "No newline within %d bytes of response." % max_size
+            )
 
-    return response, extra
+    return bytes(response), b""
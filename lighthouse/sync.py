@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+
+
+DEFAULT_QUIET_PERIOD = 0.5  # seconds
+DEFAULT_MAX_DELAY = 5  # seconds
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncScheduler(object):
+    """
+    Class that coalesces bursts of sync requests into as few syncs as possible.
+
+    Each call to `request()` notes that a sync is wanted.  Rather than running
+    a sync for each request, the scheduler waits until no new requests have
+    come in for `quiet_period` seconds (or until `max_delay` seconds have
+    passed since the first request of the burst) and then submits a single
+    job to the given work pool.
+
+    At most one sync job is ever in flight.  Requests that come in while a
+    sync is running are collapsed into a single pending sync that is
+    scheduled once the running one finishes.
+
+    A `quiet_period` of zero means syncs are submitted as soon as no other
+    sync is in flight, a `max_delay` of zero means there is no upper bound
+    on how long a steady stream of requests can delay a sync.
+    """
+
+    def __init__(self, work_pool, fn, quiet_period=0, max_delay=0):
+        self.work_pool = work_pool
+        self.fn = fn
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending = False
+        self.in_flight = False
+        self.first_request = None
+        self.last_request = None
+
+        self.stopped = False
+
+    def request(self):
+        """
+        Notes that a sync is wanted and schedules one if there isn't one
+        already scheduled or running.
+        """
+        with self.lock:
+            if self.stopped:
+                return
+
+            now = time.time()
+            if not self.pending:
+                self.first_request = now
+            self.pending = True
+            self.last_request = now
+
+            should_fire = self.schedule()
+
+        if should_fire:
+            self.fire()
+
+    def schedule(self):
+        """
+        Helper method for scheduling the pending sync, must be called with
+        the `lock` held.
+
+        If the sync is already due, no timer is started and True is returned
+        so that the caller can fire the sync once the lock is released.
+        """
+        if self.in_flight or self.timer or not self.pending:
+            return False
+
+        delay = self.get_delay()
+        if delay <= 0:
+            return True
+
+        self.timer = threading.Timer(delay, self.fire)
+        self.timer.daemon = True
+        self.timer.start()
+
+        return False
+
+    def get_delay(self):
+        """
+        Returns the number of seconds to wait until the pending sync is due.
+
+        The sync is due once the quiet period since the latest request has
+        passed, or once `max_delay` seconds have passed since the first
+        request, whichever comes first.
+        """
+        deadline = self.last_request + self.quiet_period
+        if self.max_delay:
+            deadline = min(deadline, self.first_request + self.max_delay)
+
+        return deadline - time.time()
+
+    def fire(self):
+        """
+        Submits the sync function to the work pool if the pending sync is due.
+
+        If more requests came in while waiting the timer is restarted for
+        the remaining delay instead.
+        """
+        with self.lock:
+            self.timer = None
+            if self.stopped or self.in_flight or not self.pending:
+                return
+
+            if self.get_delay() > 0:
+                self.schedule()
+                return
+
+            self.pending = False
+            self.in_flight = True
+
+        logger.debug("Submitting coalesced sync job.")
+        self.work_pool.submit(self.fn).add_done_callback(self.on_done)
+
+    def on_done(self, f):
+        """
+        Callback fired when a sync job finishes.
+
+        Logs any errors raised by the sync and schedules the next sync if
+        any requests came in while this one was running.
+        """
+        try:
+            f.result()
+        except Exception:
+            logger.exception("Error when running sync job")
+
+        with self.lock:
+            self.in_flight = False
+            should_fire = self.schedule()
+
+        if should_fire:
+            self.fire()
+
+    def stop(self):
+        """
+        Cancels any scheduled sync and ignores any further requests.
+        """
+        with self.lock:
+            self.stopped = True
+            self.pending = False
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
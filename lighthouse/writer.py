@@ -1,10 +1,12 @@
 import logging
 
+from . import metrics
 from .configs.watcher import ConfigWatcher
 from .log.config import Logging
 from .balancer import Balancer
 from .cluster import Cluster
 from .discovery import Discovery
+from .sync import SyncScheduler
 
 
 logger = logging.getLogger(__name__)
@@ -21,22 +23,53 @@ class Writer(ConfigWatcher):
     proper discovery methods are watching the proper clusters.  Whenever a
     change takes place the Balancer instances are notified and syncs their
     config file contents with the updated clusters.
+
+    Syncs are funneled through a `SyncScheduler` so that bursts of changes
+    (e.g. a large cluster being deployed) result in a single sync rather
+    than one per change.
     """
 
     watched_configurables = (Logging, Balancer, Discovery, Cluster)
 
-    def sync_balancer_files(self):
+    def __init__(self, config_dir, sync_quiet_period=0, sync_max_delay=0):
+        super(Writer, self).__init__(config_dir)
+
+        self.sync_scheduler = SyncScheduler(
+            self.work_pool, self.sync_balancers,
+            quiet_period=sync_quiet_period, max_delay=sync_max_delay
+        )
+
+    def sync_balancer_files(self, added=None, removed=None):
         """
-        Syncs the config files for each present Balancer instance.
+        Requests a sync of the config files for each present Balancer.
+
+        When called by a discovery method the `added` and `removed` lists of
+        nodes are given, if both are empty nothing actually changed and no
+        sync is requested.
 
-        Submits the work to sync each file as a work pool job.
+        The sync scheduler coalesces these requests so that only one sync
+        job is ever running in the work pool, with at most one more queued.
         """
+        if added is not None and removed is not None:
+            if not added and not removed:
+                logger.debug("Discovery update with no node changes.")
+                return
+            logger.debug(
+                "Discovery update: %d node(s) added, %d node(s) removed",
+                len(added), len(removed)
+            )
 
-        def sync():
-            for balancer in self.configurables[Balancer].values():
-                balancer.sync_file(self.configurables[Cluster].values())
+        self.sync_scheduler.request()
 
-        self.work_pool.submit(sync)
+    def sync_balancers(self):
+        """
+        Syncs the config files for each present Balancer instance.
+        """
+        with metrics.sync_duration.time():
+            for balancer in list(self.configurables[Balancer].values()):
+                balancer.sync_file(
+                    list(self.configurables[Cluster].values())
+                )
 
     def on_balancer_add(self, balancer):
         """
@@ -170,7 +203,9 @@ class Writer(ConfigWatcher):
     def wind_down(self):
         """
         Winding down a writer ConfigWatcher is merely a matter of stopping
-        the present discovery methods.
+        the present discovery methods and any scheduled balancer syncs.
         """
+        self.sync_scheduler.stop()
+
         for discovery in self.configurables[Discovery].values():
             discovery.stop()
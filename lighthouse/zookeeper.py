@@ -1,14 +1,18 @@
+import collections
 import logging
 import threading
 
 from kazoo import client, exceptions
+from kazoo.protocol.states import EventType
 
+from lighthouse import metrics
 from lighthouse.discovery import Discovery
-from lighthouse.node import Node
-from lighthouse.events import wait_on_any
+from lighthouse.node import Node, FORMATS, LEGACY_FORMAT
+from lighthouse.events import Event, wait_on_any
 
 
 NO_NODE_INTERVAL = 2  # seconds
+MAX_CONCURRENT_FETCHES = 64
 
 
 logger = logging.getLogger(__name__)
@@ -38,11 +42,20 @@ class ZookeeperDiscovery(Discovery):
 
         self.hosts = []
         self.base_path = None
+        self.watch_node_data = False
+        self.node_format = LEGACY_FORMAT
 
         self.client = None
-        self.connected = threading.Event()
+        self.connected = Event()
 
         self.stop_events = {}
+        self.node_caches = {}
+        # child versions ("cversion") of the watched znodes when last seen
+        self.child_versions = {}
+
+        # owner session ids of the znodes reported on, None if known absent
+        self.znode_owners = {}
+        self.ensured_paths = set()
 
     @classmethod
     def validate_dependencies(cls):
@@ -55,17 +68,24 @@ class ZookeeperDiscovery(Discovery):
     @classmethod
     def validate_config(cls, config):
         """
-        Validates that a list of hosts and a base path to watch are configured.
+        Validates that a list of hosts and a base path to watch are configured
+        and that the node format, if given, is a known one.
         """
         if "hosts" not in config:
             raise ValueError("Missing discovery option 'hosts'")
         if "path" not in config:
             raise ValueError("Missing discovery option 'path'")
+        if config.get("node_format", "legacy") not in FORMATS:
+            raise ValueError(
+                "Invalid node_format '%s', must be one of: %s" % (
+                    config["node_format"], ", ".join(sorted(FORMATS))
+                )
+            )
 
     def apply_config(self, config):
         """
-        Takes the given config dictionary and sets the hosts and base_path
-        attributes.
+        Takes the given config dictionary and sets the hosts, base_path,
+        watch_node_data and node_format attributes.
 
         If the kazoo client connection is established, its hosts list is
         updated to the newly configured value.
@@ -73,6 +93,8 @@ class ZookeeperDiscovery(Discovery):
         self.hosts = config["hosts"]
         old_base_path = self.base_path
         self.base_path = config["path"]
+        self.watch_node_data = config.get("watch_node_data", False)
+        self.node_format = FORMATS[config.get("node_format", "legacy")]
         if not self.connected.is_set():
             return
 
@@ -113,11 +135,15 @@ class ZookeeperDiscovery(Discovery):
         If the connection becomes lost or suspended, the `connected` Event
         is cleared.  Other given states imply that the connection is
         established so `connected` is set.
+
+        Losing the session also loses its ephemeral znodes, so the known
+        owners of reported znodes are forgotten.
         """
         if state == client.KazooState.LOST:
             if not self.shutdown.is_set():
                 logger.info("Zookeeper session lost!")
             self.connected.clear()
+            self.znode_owners.clear()
         elif state == client.KazooState.SUSPENDED:
             logger.info("Zookeeper connection suspended!")
             self.connected.clear()
@@ -129,13 +155,21 @@ class ZookeeperDiscovery(Discovery):
         """
         Initiates the "watching" of a cluster's associated znode.
 
-        This is done via kazoo's ChildrenWatch object.  When a cluster's
-        znode's child nodes are updated, a callback is fired and we update
-        the cluster's `nodes` attribute based on the existing child znodes
-        and fire a passed-in callback with no arguments once done.
+        This is done via a `ChildrenStatWatch`.  When a cluster's znode's
+        child nodes are updated, a callback is fired and we update the
+        cluster's `nodes` attribute based on the existing child znodes and
+        fire the passed-in callback with the lists of added and removed nodes
+        once done.
+
+        The nodes are kept in a per-cluster cache keyed on child znode name
+        so that only newly added children need to be fetched.
+
+        If `watch_node_data` is set, a data watch is placed on each child
+        znode as it's fetched so that changes to a node's data (e.g. updated
+        metadata) are picked up without waiting on a membership change.
 
         If the cluster's znode does not exist we wait for `NO_NODE_INTERVAL`
-        seconds before trying again as long as no ChildrenWatch exists for
+        seconds before trying again as long as no watch exists for
         the given cluster yet and we are not in the process of shutting down.
         """
         logger.debug("starting to watch cluster %s", cluster.name)
@@ -143,7 +177,7 @@ class ZookeeperDiscovery(Discovery):
         logger.debug("done waiting on (connected, shutdown)")
         znode_path = "/".join([self.base_path, cluster.name])
 
-        self.stop_events[znode_path] = threading.Event()
+        self.stop_events[znode_path] = Event()
 
         def should_stop():
             return (
@@ -152,41 +186,222 @@ class ZookeeperDiscovery(Discovery):
                 self.shutdown.is_set()
             )
 
+        self.wait_for_znode(znode_path, should_stop)
+        if should_stop():
+            return
+
+        logger.debug("setting up children watch for %s", znode_path)
+
+        self.node_caches[znode_path] = {}
+        self.child_versions.pop(znode_path, None)
+
+        # defined ahead of the children watch, which runs right away
+        def data_changed(event):
+            if should_stop():
+                return
+            if event.type not in (EventType.CHANGED, EventType.DELETED):
+                return
+
+            logger.debug("znode data changed! (%s)", event.path)
+
+            self.refresh_node(
+                znode_path, event.path.split("/")[-1], cluster, callback,
+                watch=data_changed
+            )
+
+        def watch(children, stat):
+            if should_stop():
+                return False
+
+            logger.debug("znode children changed! (%s)", znode_path)
+
+            added, removed = self.update_node_cache(
+                znode_path, children, stat.cversion,
+                watch=data_changed if self.watch_node_data else None
+            )
+
+            cache = self.node_caches[znode_path]
+            cluster.nodes = [
+                cache[child][1] for child in children
+                if child in cache and cache[child][1]
+            ]
+
+            callback(added, removed)
+
+        ChildrenStatWatch(self.client, znode_path, watch)
+
+    def wait_for_znode(self, znode_path, should_stop):
+        """
+        Waits until the given znode exists, checking every `NO_NODE_INTERVAL`
+        seconds, or until `should_stop()` is true or the connection closes.
+        """
         while not should_stop():
             try:
                 if self.client.exists(znode_path):
-                    break
+                    return
             except exceptions.ConnectionClosedError:
-                break
+                return
 
             wait_on_any(
                 self.stop_events[znode_path], self.shutdown,
                 timeout=NO_NODE_INTERVAL
             )
 
-        logger.debug("setting up ChildrenWatch for %s", znode_path)
+    def refresh_node(self, znode_path, child, cluster, callback, watch=None):
+        """
+        Re-fetches the node on the given child znode after its data changed
+        or it was deleted and swaps it in for the cached one in both the
+        cache and the cluster's `nodes` list.  If the znode is gone the
+        cached node is dropped, if it was not modified nothing changes.
+
+        The callback is fired with the new node (if any) as added and the old
+        one as removed, the `watch` function (if given) is re-set on the
+        znode, i.e. also on a znode that was deleted and re-created.
+        """
+        cache = self.node_caches.get(znode_path, {})
+        if child not in cache:
+            return
 
-        @self.client.ChildrenWatch(znode_path)
-        def watch(children):
-            if should_stop():
-                return False
+        fetched = self.fetch_nodes(znode_path, [child], watch=watch)
+        if child not in cache:
+            return
 
-            logger.debug("znode children changed! (%s)", znode_path)
+        if child in fetched:
+            if fetched[child][0] == cache[child][0]:
+                return
+            _, old_node = cache[child]
+            _, new_node = cache[child] = fetched[child]
+        else:
+            _, old_node = cache.pop(child)
+            new_node = None
+
+        nodes = [node for node in cluster.nodes if node is not old_node]
+        if new_node:
+            nodes.append(new_node)
+        cluster.nodes = nodes
+
+        callback(
+            [new_node] if new_node else [], [old_node] if old_node else []
+        )
 
-            new_nodes = []
-            for child in children:
-                child_path = "/".join([znode_path, child])
-                try:
-                    new_nodes.append(
-                        Node.deserialize(self.client.get(child_path)[0])
-                    )
-                except ValueError:
-                    logger.exception("Invalid node at path '%s'", child)
+    def update_node_cache(self, znode_path, children, child_version=None,
+                          watch=None):
+        """
+        Brings the node cache for the given znode path in line with the given
+        list of child znode names.
+
+        Normally only children that are not in the cache already are fetched
+        and cached children that are no longer present are dropped.  If the
+        `child_version` of the znode (as read along with the children) went
+        up by more than the number of children added and removed, or isn't
+        known, some children were deleted and re-created in between, e.g. by
+        a reporter re-creating its node under its own session, so every
+        child is re-fetched and those whose znodes were modified are swapped
+        out.
+
+        Returns a tuple of the list of added Node instances and the list of
+        removed ones.  The optional `watch` function is set as a data watch
+        on each of the fetched children.
+        """
+        cache = self.node_caches.setdefault(znode_path, {})
+
+        present = set(children)
+        removed = [
+            cache.pop(child) for child in list(cache)
+            if child not in present
+        ]
+        new_children = [child for child in children if child not in cache]
+
+        previous_version = self.child_versions.get(znode_path)
+        self.child_versions[znode_path] = child_version
+        if child_version is None or previous_version is None or (
+                child_version !=
+                previous_version + len(removed) + len(new_children)
+        ):
+            new_children = children
+
+        fetched = self.fetch_nodes(znode_path, new_children, watch=watch)
+        added, replaced = self.merge_fetched_nodes(cache, fetched)
+        removed.extend(replaced)
+
+        return added, [node for _, node in removed if node]
+
+    def merge_fetched_nodes(self, cache, fetched):
+        """
+        Stores the given fetched (<zxid>, <node>) tuples in the given cache,
+        skipping the ones that were not modified since they were cached.
+
+        Returns a tuple of the list of newly cached Node instances and the
+        list of cache entries they replaced.
+        """
+        added = []
+        replaced = []
+
+        for child, (zxid, node) in fetched.items():
+            if child in cache:
+                if cache[child][0] == zxid:
                     continue
+                replaced.append(cache[child])
+
+            cache[child] = (zxid, node)
+            if node:
+                added.append(node)
+
+        return added, replaced
+
+    def fetch_nodes(self, znode_path, children, watch=None):
+        """
+        Fetches and deserializes the nodes stored on the given children of the
+        given znode path.
+
+        The fetches are done with kazoo's `get_async()` so that many requests
+        are in flight at once, but no more than `MAX_CONCURRENT_FETCHES` at a
+        time.  If a `watch` function is given it is set as a data watch on
+        each child znode.
+
+        Returns a dictionary mapping child name to a (<zxid>, <node>) tuple,
+        where the zxid is that of the last modification of the child znode
+        (including its creation).  Children with invalid data map to a None
+        node so that they aren't re-fetched over and over, children that
+        disappeared in the meantime are left out.
+        """
+        with metrics.zookeeper_fetch_duration.time():
+            return self.fetch_node_data(znode_path, children, watch)
 
-            cluster.nodes = new_nodes
+    def fetch_node_data(self, znode_path, children, watch):
+        """
+        Does the actual fetching for `fetch_nodes()`.
+        """
+        results = {}
+        pending = collections.deque()
 
-            callback()
+        def collect(child, result):
+            try:
+                data, stat = result.get()
+            except exceptions.NoNodeError:
+                logger.debug("Node at path '%s' went away", child)
+                return
+            try:
+                results[child] = (stat.mzxid, Node.deserialize(data))
+            except ValueError:
+                logger.exception("Invalid node at path '%s'", child)
+                results[child] = (stat.mzxid, None)
+
+        for child in children:
+            if len(pending) >= MAX_CONCURRENT_FETCHES:
+                collect(*pending.popleft())
+
+            path = "/".join([znode_path, child])
+            if watch:
+                result = self.client.get_async(path, watch=watch)
+            else:
+                result = self.client.get_async(path)
+            pending.append((child, result))
+
+        while pending:
+            collect(*pending.popleft())
+
+        return results
 
     def stop_watching(self, cluster):
         """
@@ -196,6 +411,8 @@ class ZookeeperDiscovery(Discovery):
         znode_path = "/".join([self.base_path, cluster.name])
         if znode_path in self.stop_events:
             self.stop_events[znode_path].set()
+        self.node_caches.pop(znode_path, None)
+        self.child_versions.pop(znode_path, None)
 
     def report_up(self, service, port):
         """
@@ -210,7 +427,8 @@ class ZookeeperDiscovery(Discovery):
         node = Node.current(service, port)
 
         path = self.path_of(service, node)
-        data = node.serialize().encode()
+        data = node.serialize(self.node_format).encode()
+        self.znode_owners.pop(path, None)
 
         znode = self.client.exists(path)
 
@@ -240,15 +458,205 @@ class ZookeeperDiscovery(Discovery):
         node = Node.current(service, port)
 
         path = self.path_of(service, node)
+        self.znode_owners.pop(path, None)
         try:
             logger.debug("Deleting znode at %s", path)
             self.client.delete(path)
         except exceptions.NoNodeError:
             pass
 
+    def report_batch(self, service, up_ports, down_ports):
+        """
+        Reports the given service's present node as up on each of the
+        `up_ports` and as down on each of the `down_ports` with a single
+        multi-op transaction.
+
+        The owners of the znodes reported on are remembered, so only znodes
+        not seen before need to be looked up (concurrently) before the
+        transaction is sent.  If the transaction fails, e.g. because a znode
+        was changed by someone else in the meantime, the remembered owners
+        are dropped and each port is reported on its own instead.
+        """
+        wait_on_any(self.connected, self.shutdown)
+
+        up_znodes = []
+        for port in up_ports:
+            node = Node.current(service, port)
+            up_znodes.append((
+                self.path_of(service, node),
+                node.serialize(self.node_format).encode()
+            ))
+        up_paths = [path for path, _ in up_znodes]
+        down_paths = [
+            self.path_of(service, Node.current(service, port))
+            for port in down_ports
+        ]
+        paths = up_paths + down_paths
+
+        service_path = "/".join([self.base_path, service.name])
+        if up_znodes and service_path not in self.ensured_paths:
+            self.client.ensure_path(service_path)
+            self.ensured_paths.add(service_path)
+        self.look_up_owners(paths)
+
+        txn = self.batch_transaction(up_znodes, down_paths)
+        if not txn.operations:
+            return
+
+        logger.debug(
+            "Reporting %s up on %s and down on %s in one transaction.",
+            service.name, list(up_ports), list(down_ports)
+        )
+        results = txn.commit()
+
+        if any(isinstance(result, Exception) for result in results):
+            logger.warning(
+                "Batch report transaction for %s failed, reporting each" +
+                " port separately: %s",
+                service.name, [
+                    result for result in results
+                    if not isinstance(result, exceptions.RolledBackError)
+                ]
+            )
+            for path in paths:
+                self.znode_owners.pop(path, None)
+            self.ensured_paths.discard(service_path)
+            super(ZookeeperDiscovery, self).report_batch(
+                service, up_ports, down_ports
+            )
+            return
+
+        for path in up_paths:
+            self.znode_owners[path] = self.client.client_id[0]
+        for path in down_paths:
+            self.znode_owners[path] = None
+
+    def batch_transaction(self, up_znodes, down_paths):
+        """
+        Returns a transaction that sets the data of the given up znodes (a
+        list of (<path>, <data>) tuples) and deletes the given down znodes,
+        based on their known owners.
+
+        Znodes of ours have their data set, znodes of other sessions are
+        deleted and recreated as ours and missing znodes are created.  Down
+        znodes that are missing are left out.
+        """
+        session_id = self.client.client_id[0]
+        txn = self.client.transaction()
+
+        for path, data in up_znodes:
+            owner = self.znode_owners[path]
+            if owner == session_id:
+                txn.set_data(path, data)
+                continue
+            if owner is not None:
+                txn.delete(path)
+            txn.create(path, value=data, ephemeral=True)
+
+        for path in down_paths:
+            if self.znode_owners[path] is not None:
+                txn.delete(path)
+
+        return txn
+
+    def look_up_owners(self, paths):
+        """
+        Fetches the owner session ids of the znodes at the given paths whose
+        owners aren't already known, with all of the requests in flight at
+        once.
+        """
+        unknown = [path for path in paths if path not in self.znode_owners]
+        results = [
+            (path, self.client.exists_async(path)) for path in unknown
+        ]
+
+        for path, result in results:
+            znode = result.get()
+            self.znode_owners[path] = znode.owner_session_id if znode else None
+
     def path_of(self, service, node):
         """
         Helper method for determining the Zookeeper path for a given cluster
         member node.
         """
         return "/".join([self.base_path, service.name, node.name])
+
+
+class ChildrenStatWatch(object):
+    """
+    Calls a function with the list of children of a znode and the znode's
+    stat, and again every time the children change.
+
+    Works like kazoo's ChildrenWatch recipe, except that the children and
+    the stat come from a single `get_children()` read so that the child
+    version ("cversion") in the stat is exactly the one of the children
+    list, with no extra round trip to look it up.
+
+    The watch stops once the function returns False or the znode is gone.
+    If the connection is suspended or the session lost, the children are
+    read again (re-setting the watch) once the connection is back.
+    """
+
+    def __init__(self, client, path, func):
+        self.client = client
+        self.path = path
+        self.func = func
+
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.watch_established = False
+
+        self.client.add_listener(self.handle_connection_change)
+        self.get_children()
+
+    def get_children(self, event=None):
+        """
+        Reads the children and stat of the znode, setting the watch, and
+        hands them to the function.  Only runs one read at a time.
+        """
+        with self.lock:
+            if self.stopped:
+                return
+
+            try:
+                children, stat = self.client.get_children(
+                    self.path, watch=self.handle_event, include_data=True
+                )
+            except exceptions.NoNodeError:
+                self.stop()
+                return
+            except (exceptions.ConnectionLoss,
+                    exceptions.SessionExpiredError):
+                logger.debug("Couldn't read children of %s", self.path)
+                return
+
+            self.watch_established = True
+
+            if self.func(children, stat) is False:
+                self.stop()
+
+    def handle_event(self, event):
+        """
+        Watch callback, re-reads the children unless the event is merely
+        about the connection state.
+        """
+        if event.type != EventType.NONE:
+            self.get_children(event)
+
+    def handle_connection_change(self, state):
+        """
+        Connection state listener.  Watches don't fire while the connection
+        is down so once it's back the children are read again, in a separate
+        greenlet/thread as listeners must not block.
+        """
+        if state in (client.KazooState.LOST, client.KazooState.SUSPENDED):
+            self.watch_established = False
+        elif not self.watch_established and not self.stopped:
+            self.client.handler.spawn(self.get_children)
+
+    def stop(self):
+        """
+        Stops the watch, the function won't be called again.
+        """
+        self.stopped = True
+        self.client.remove_listener(self.handle_connection_change)
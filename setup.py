@@ -17,7 +17,9 @@ setup(
     url="http://github.com/wglass/lighthouse",
     license="Apache",
     classifiers=classifiers,
-    packages=find_packages(exclude=["tests", "tests.*"]),
+    packages=find_packages(
+        exclude=["tests", "tests.*", "benchmarks", "benchmarks.*"]
+    ),
     include_package_data=True,
     package_data={
         "lighthouse": ["haproxy/*.json"],
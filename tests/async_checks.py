@@ -0,0 +1,19 @@
+import asyncio
+
+from mock import Mock
+
+
+class FakeAsyncCheck(object):
+
+    name = "fake"
+
+    def __init__(self, result=True, delay=0, timeout=None):
+        self.result = result
+        self.delay = delay
+        self.timeout = timeout
+        self.record_result = Mock()
+        self.record_duration = Mock()
+
+    async def perform(self):
+        await asyncio.sleep(self.delay)
+        return self.result
@@ -0,0 +1,59 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch
+
+from lighthouse.haproxy.control import HAProxyControl
+
+from benchmarks import config, fixtures
+
+
+@patch("lighthouse.haproxy.control.Peer")
+class ConfigBenchmarksTests(unittest.TestCase):
+
+    def test_benchmarks_run(self, Peer):
+        benchmarks = config.get_benchmarks(2, 3)
+
+        self.assertEqual(
+            [benchmark.key for benchmark in benchmarks],
+            [
+                "generate[clusters=2,nodes=3]",
+                "generate_cached[clusters=2,nodes=3]",
+                "render_backends[clusters=2,nodes=3]",
+                "parse_stats[clusters=2,nodes=3]",
+                "get_current_nodes[clusters=2,nodes=3]",
+                "sync_nodes[clusters=2,nodes=3]",
+            ]
+        )
+        for benchmark in benchmarks:
+            benchmark.fn()
+
+    def test_stats_response_lists_every_node(self, Peer):
+        clusters = fixtures.make_clusters(2, 3)
+
+        control = config.CannedStatsControl(
+            fixtures.make_stats_response(clusters)
+        )
+        active_nodes = control.get_active_nodes()
+
+        self.assertEqual(sorted(active_nodes.keys()), ["cluster0", "cluster1"])
+        for cluster in clusters:
+            self.assertEqual(
+                sorted(active_nodes[cluster.name]),
+                sorted(node.name for node in cluster.nodes)
+            )
+        first, second = clusters[0].nodes[:2]
+        self.assertEqual(
+            active_nodes["cluster0"][first.name]["status"], "MAINT"
+        )
+        self.assertEqual(
+            active_nodes["cluster0"][second.name]["status"], "UP"
+        )
+
+    def test_canned_control_is_a_control(self, Peer):
+        control = config.CannedStatsControl("")
+
+        self.assertTrue(isinstance(control, HAProxyControl))
+        self.assertEqual(control.update_nodes([], []), [])
@@ -0,0 +1,73 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch
+
+from benchmarks import discovery
+
+
+@patch.object(discovery, "DEFAULT_LATENCY", 0)
+class DiscoveryBenchmarksTests(unittest.TestCase):
+
+    def test_writer_sees_every_reporter(self):
+        scenario = discovery.ChurnScenario(2, 5, latency=0)
+
+        for cluster in scenario.clusters:
+            self.assertEqual(len(cluster.nodes), 5)
+
+    def test_flap_and_expire(self):
+        scenario = discovery.ChurnScenario(2, 20, latency=0)
+        churners = scenario.churners()
+
+        self.assertEqual(len(churners), 4)
+
+        scenario.flap(churners)
+
+        self.assertEqual(
+            sorted(len(cluster.nodes) for cluster in scenario.clusters),
+            [18, 18]
+        )
+
+        scenario.flap(churners)
+        scenario.expire(churners)
+
+        self.assertEqual(
+            sorted(len(cluster.nodes) for cluster in scenario.clusters),
+            [20, 20]
+        )
+
+    def test_multi_port_reporter(self):
+        reporter = discovery.MultiPortReporter(5, latency=0)
+
+        for batched in (False, True):
+            reporter.flip(batched)
+            self.assertEqual(reporter.reported_ports(), 5)
+
+            reporter.flip(batched)
+            self.assertEqual(reporter.reported_ports(), 0)
+
+    def test_batch_report_is_one_transaction(self):
+        reporter = discovery.MultiPortReporter(5, latency=0)
+        reporter.flip(batched=True)
+        reporter.flip(batched=True)
+
+        with patch.object(reporter.server, "run") as run:
+            reporter.flip(batched=True)
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(len(run.call_args[0][0]), 5)
+
+    def test_benchmarks_run(self):
+        benchmarks = discovery.get_benchmarks(1, 3)
+
+        self.assertEqual(
+            [benchmark.name for benchmark in benchmarks],
+            [
+                "propagate_one", "propagate_churn", "session_expiry",
+                "report_each", "report_batch",
+            ]
+        )
+        for benchmark in benchmarks:
+            benchmark.fn()
@@ -0,0 +1,143 @@
+import os
+import shutil
+import socket
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch
+
+from lighthouse.haproxy.control import HAProxyControl, UnknownCommandError
+
+from benchmarks import control, fixtures
+from benchmarks.fakehaproxy import FakeHAProxy
+
+
+@patch("lighthouse.haproxy.control.Peer")
+class FakeHAProxyTests(unittest.TestCase):
+
+    def setUp(self):
+        super(FakeHAProxyTests, self).setUp()
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        self.haproxy = FakeHAProxy(os.path.join(directory, "haproxy.sock"))
+        self.haproxy.add_backend("web", [
+            ("app1:8000", "10.0.0.1", 8000),
+            ("app2:8000", "10.0.0.2", 8000),
+        ])
+        self.haproxy.start()
+        self.addCleanup(self.haproxy.stop)
+
+    def get_control(self, interactive=False):
+        control = HAProxyControl(
+            "/dev/null", self.haproxy.socket_path, "/dev/null",
+            interactive=interactive, command_timeout=5
+        )
+        self.addCleanup(control.close_session)
+        return control
+
+    def test_show_info(self, Peer):
+        info = self.get_control().get_info()
+
+        self.assertEqual(info["name"], "HAProxy")
+        self.assertEqual(info["version"], "1.8.0")
+
+    def test_show_stat(self, Peer):
+        for interactive in (False, True):
+            nodes = self.get_control(interactive).get_active_nodes()
+
+            self.assertEqual(list(nodes.keys()), ["web"])
+            self.assertEqual(
+                sorted(
+                    (name, stats["status"])
+                    for name, stats in nodes["web"].items()
+                ),
+                [("app1:8000", "UP"), ("app2:8000", "UP")]
+            )
+
+    def test_enable_and_disable(self, Peer):
+        for interactive in (False, True):
+            control = self.get_control(interactive)
+
+            errors = control.update_nodes(
+                [("web", "app1:8000")],
+                [("web", "app2:8000"), ("web", "app3:8000")]
+            )
+
+            self.assertEqual(errors, ["No such server."])
+            self.assertEqual(
+                sorted(
+                    (name, stats["status"])
+                    for name, stats
+                    in control.get_active_nodes()["web"].items()
+                ),
+                [("app1:8000", "UP"), ("app2:8000", "MAINT")]
+            )
+
+    def test_set_server(self, Peer):
+        control = self.get_control(interactive=True)
+
+        control.update_slots([("web", "app1:8000", "10.0.0.9", 9000)], [])
+
+        server = self.haproxy.backends["web"]["app1:8000"]
+        self.assertEqual((server.ip, server.port), ("10.0.0.9", 9000))
+
+        control.update_slots([], [("web", "app1:8000")])
+
+        self.assertEqual(server.status, "MAINT")
+
+    def test_interactive_session_reused(self, Peer):
+        control = self.get_control(interactive=True)
+
+        control.get_info()
+        control.get_info()
+
+        self.assertEqual(self.haproxy.counts["connections"], 1)
+        self.assertEqual(self.haproxy.counts["commands"], 2)
+
+    def test_unknown_command(self, Peer):
+        self.assertRaises(
+            UnknownCommandError, self.get_control().send_command, "bogus"
+        )
+
+    def test_stop_removes_socket(self, Peer):
+        self.haproxy.stop()
+
+        self.assertFalse(os.path.exists(self.haproxy.socket_path))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(sock.close)
+        self.assertRaises(
+            socket.error, sock.connect, self.haproxy.socket_path
+        )
+
+
+@patch("lighthouse.haproxy.control.Peer")
+class ControlBenchmarksTests(unittest.TestCase):
+
+    @patch.object(control, "DEFAULT_LATENCY", 0)
+    def test_benchmarks_run(self, Peer):
+        benchmarks = control.get_benchmarks(2, 3)
+
+        self.assertEqual(
+            [benchmark.name for benchmark in benchmarks],
+            ["show_stat", "sync_nodes", "update_slots"] * 2
+        )
+        for benchmark in benchmarks:
+            benchmark.fn()
+
+    def test_stat_rows_match_fixture_fields(self, Peer):
+        haproxy = FakeHAProxy("/dev/null", row_padding=3)
+        haproxy.add_clusters(fixtures.make_clusters(1, 1))
+
+        header, row = haproxy.show_stat().strip().split("\n")
+
+        self.assertEqual(
+            len(header.split(",")), len(fixtures.STATS_FIELDS) + 1
+        )
+        self.assertEqual(len(row.split(",")), len(header.split(",")))
+        self.assertIn("passed...", row)
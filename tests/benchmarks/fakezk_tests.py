@@ -0,0 +1,192 @@
+import threading
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from kazoo import exceptions
+from kazoo.client import KazooState
+from kazoo.protocol.states import EventType
+from mock import Mock
+
+from benchmarks.fakezk import FakeZookeeper, FakeKazooClient
+from lighthouse.zookeeper import ChildrenStatWatch
+
+
+class FakeZookeeperTests(unittest.TestCase):
+
+    def setUp(self):
+        super(FakeZookeeperTests, self).setUp()
+
+        self.server = FakeZookeeper()
+        self.client = FakeKazooClient(self.server)
+        self.client.start()
+
+    def wait_for_watches(self, client=None):
+        done = threading.Event()
+        (client or self.client).deliver(lambda event: done.set(), None)
+        self.assertTrue(done.wait(5))
+
+    def test_create_get_and_set(self):
+        self.client.create("/foo/bar", value=b"1", makepath=True)
+
+        data, stat = self.client.get("/foo/bar")
+
+        self.assertEqual(data, b"1")
+        self.assertEqual(stat.version, 0)
+        self.assertEqual(stat.owner_session_id, None)
+
+        self.client.set("/foo/bar", b"2")
+
+        data, stat = self.client.get("/foo/bar")
+
+        self.assertEqual(data, b"2")
+        self.assertEqual(stat.version, 1)
+        self.assertEqual(self.client.get_children("/foo"), ["bar"])
+
+    def test_errors(self):
+        self.assertRaises(
+            exceptions.NoNodeError, self.client.create, "/foo/bar"
+        )
+
+        self.client.create("/foo", makepath=True)
+        self.client.create("/foo/bar")
+
+        self.assertRaises(
+            exceptions.NodeExistsError, self.client.create, "/foo"
+        )
+        self.assertRaises(
+            exceptions.NotEmptyError, self.client.delete, "/foo"
+        )
+        self.assertRaises(
+            exceptions.BadVersionError,
+            self.client.set, "/foo/bar", b"x", version=3
+        )
+        self.assertRaises(exceptions.NoNodeError, self.client.get, "/bazz")
+
+    def test_ephemerals_deleted_with_session(self):
+        other = FakeKazooClient(self.server)
+        other.start()
+        other.create("/foo/bar", ephemeral=True, makepath=True)
+
+        self.assertEqual(
+            self.client.exists("/foo/bar").owner_session_id,
+            other.client_id[0]
+        )
+
+        other.stop()
+
+        self.assertEqual(self.client.exists("/foo/bar"), None)
+        self.assertNotEqual(self.client.exists("/foo"), None)
+
+    def test_expired_session_tells_listeners(self):
+        listener = Mock()
+        self.client.add_listener(listener)
+        self.client.create("/foo", ephemeral=True)
+
+        self.server.expire_session(self.client.client_id[0])
+
+        listener.assert_called_once_with(KazooState.LOST)
+        self.assertRaises(
+            exceptions.ConnectionClosedError, self.client.exists, "/foo"
+        )
+
+    def test_watches_fire_once(self):
+        data_watch = Mock()
+        child_watch = Mock()
+        self.client.create("/foo/bar", makepath=True)
+
+        self.client.get("/foo/bar", watch=data_watch)
+        self.client.get_children("/foo", watch=child_watch)
+
+        self.client.set("/foo/bar", b"1")
+        self.client.set("/foo/bar", b"2")
+        self.client.create("/foo/bazz")
+        self.wait_for_watches()
+
+        self.assertEqual(data_watch.call_count, 1)
+        event = data_watch.call_args[0][0]
+        self.assertEqual(
+            (event.type, event.path), (EventType.CHANGED, "/foo/bar")
+        )
+        self.assertEqual(child_watch.call_count, 1)
+        event = child_watch.call_args[0][0]
+        self.assertEqual((event.type, event.path), (EventType.CHILD, "/foo"))
+
+    def test_get_children_include_data(self):
+        self.client.create("/foo/bar", makepath=True)
+        self.client.create("/foo/bazz")
+        self.client.delete("/foo/bazz")
+
+        children, stat = self.client.get_children(
+            "/foo", include_data=True
+        )
+
+        self.assertEqual(children, ["bar"])
+        self.assertEqual(stat.cversion, 3)
+
+    def test_children_stat_watch(self):
+        self.client.create("/foo", makepath=True)
+        calls = []
+        reread = threading.Event()
+
+        def watch(children, stat):
+            calls.append((sorted(children), stat.cversion))
+            if len(calls) == 3:
+                reread.set()
+            return len(calls) < 3
+
+        ChildrenStatWatch(self.client, "/foo", watch)
+
+        self.client.create("/foo/bar")
+        self.wait_for_watches()
+
+        # no watch fires for the session's lifetime, the children are read
+        # again once a new one is established
+        self.server.expire_session(self.client.client_id[0])
+        self.client.start()
+        self.assertTrue(reread.wait(5))
+
+        self.client.create("/foo/bazz")
+        self.wait_for_watches()
+
+        self.assertEqual(calls, [([], 0), (["bar"], 1), (["bar"], 1)])
+
+    def test_transaction_is_atomic(self):
+        watch = Mock()
+        self.client.create("/foo", value=b"1")
+        self.client.get_children("/", watch=watch)
+
+        txn = self.client.transaction()
+        txn.create("/bar", b"1")
+        txn.delete("/foo", version=5)
+        results = txn.commit()
+
+        self.assertTrue(isinstance(results[0], exceptions.RolledBackError))
+        self.assertTrue(isinstance(results[1], exceptions.BadVersionError))
+        self.assertEqual(self.client.exists("/bar"), None)
+        self.assertNotEqual(self.client.exists("/foo"), None)
+
+        txn = self.client.transaction()
+        txn.create("/bar", b"1", ephemeral=True)
+        txn.check("/foo", 0)
+        txn.set_data("/foo", b"2")
+        results = txn.commit()
+        self.wait_for_watches()
+
+        self.assertEqual(results[:2], ["/bar", True])
+        self.assertEqual(self.client.get("/foo")[0], b"2")
+        self.assertEqual(
+            self.client.exists("/bar").owner_session_id,
+            self.client.client_id[0]
+        )
+        self.assertEqual(watch.call_count, 1)
+
+    def test_async_get(self):
+        self.client.create("/foo", value=b"1")
+
+        self.assertEqual(self.client.get_async("/foo").get()[0], b"1")
+        self.assertRaises(
+            exceptions.NoNodeError, self.client.get_async("/bar").get
+        )
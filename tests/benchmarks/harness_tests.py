@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch, Mock
+
+from benchmarks import harness
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_key_includes_sorted_params(self):
+        benchmark = harness.Benchmark("generate", Mock(), nodes=10, clusters=2)
+
+        self.assertEqual(benchmark.key, "generate[clusters=2,nodes=10]")
+
+    def test_key_without_params(self):
+        benchmark = harness.Benchmark("generate", Mock())
+
+        self.assertEqual(benchmark.key, "generate[]")
+
+
+class RunBenchmarkTests(unittest.TestCase):
+
+    @patch("benchmarks.harness.timeit")
+    def test_timings_are_per_call(self, timeit):
+        timeit.Timer.return_value.repeat.return_value = [4.0, 2.0, 6.0, 8.0]
+        fn = Mock()
+
+        result = harness.run_benchmark(
+            harness.Benchmark("foo", fn, nodes=1), repeat=4, number=2
+        )
+
+        timeit.Timer.assert_called_once_with(fn)
+        timeit.Timer.return_value.repeat.assert_called_once_with(
+            repeat=4, number=2
+        )
+        self.assertEqual(
+            result,
+            {
+                "key": "foo[nodes=1]",
+                "name": "foo",
+                "params": {"nodes": 1},
+                "unit": "s",
+                "repeat": 4,
+                "number": 2,
+                "min": 1.0,
+                "mean": 2.5,
+                "median": 2.5,
+                "max": 4.0,
+            }
+        )
+
+    @unittest.skipIf(
+        harness.tracemalloc is None, "Measuring memory needs python 3.4+"
+    )
+    def test_memory_benchmark_measures_result(self):
+        result = harness.run_benchmark(
+            harness.MemoryBenchmark("foo", lambda: [object()] * 10000),
+            repeat=3, number=5
+        )
+
+        self.assertEqual(result["unit"], "bytes")
+        self.assertEqual(result["number"], 1)
+        self.assertTrue(result["min"] >= 80000)
+        self.assertTrue(result["max"] < 160000)
+
+    def test_format_value(self):
+        self.assertEqual(harness.format_value(0.25, "s"), "0.250000s")
+        self.assertEqual(harness.format_value(1024.0, "bytes"), "1024B")
+
+    def test_actually_calls_function(self):
+        fn = Mock()
+
+        result = harness.run_benchmark(
+            harness.Benchmark("foo", fn), repeat=3
+        )
+
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(result["median"], sorted([
+            result["min"], result["median"], result["max"]
+        ])[1])
+
+
+class ResultsFileTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ResultsFileTests, self).setUp()
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    @patch("benchmarks.harness.subprocess")
+    def test_write_and_load(self, subprocess):
+        subprocess.CalledProcessError = Exception
+        subprocess.check_output.return_value = b"abc123\n"
+        path = os.path.join(self.directory, "results.json")
+
+        harness.write_results(path, [{"key": "foo[]", "median": 1.0}])
+
+        with open(path) as fd:
+            contents = json.load(fd)
+
+        self.assertEqual(contents["environment"]["commit"], "abc123")
+        self.assertEqual(
+            contents["results"], [{"key": "foo[]", "median": 1.0}]
+        )
+        self.assertEqual(harness.load_results(path), contents)
+
+    @patch("benchmarks.harness.subprocess")
+    def test_commit_is_none_outside_of_git(self, subprocess):
+        subprocess.CalledProcessError = ValueError
+        subprocess.check_output.side_effect = OSError
+
+        self.assertEqual(harness.get_environment()["commit"], None)
+
+
+class CompareTests(unittest.TestCase):
+
+    def test_regressions_past_threshold(self):
+        baseline = {"results": [
+            {"key": "a[]", "median": 1.0},
+            {"key": "b[]", "median": 1.0},
+            {"key": "c[]", "median": 1.0},
+        ]}
+        results = [
+            {"key": "a[]", "median": 1.05},
+            {"key": "b[]", "median": 1.5},
+            {"key": "c[]", "median": .5},
+            {"key": "d[]", "median": 10.0},
+        ]
+
+        self.assertEqual(
+            harness.compare(baseline, results, threshold=.1),
+            [("b[]", 1.0, 1.5)]
+        )
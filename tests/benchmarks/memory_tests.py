@@ -0,0 +1,73 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from lighthouse.node import Node, COMPACT_FORMAT
+
+from benchmarks import harness, memory
+
+
+class MemoryBenchmarksTests(unittest.TestCase):
+
+    def test_payloads_share_hosts_across_clusters(self):
+        payloads = memory.make_payloads(2, 3)
+
+        nodes = [Node.deserialize(payload) for payload in payloads]
+
+        self.assertEqual(len(nodes), 6)
+        self.assertEqual(len(set(node.peer for node in nodes)), 3)
+        self.assertEqual(len(set(node.port for node in nodes)), 2)
+        self.assertTrue(nodes[0].peer is nodes[3].peer)
+
+    def test_payload_formats_match(self):
+        legacy = memory.make_payloads(2, 3)
+        compact = memory.make_payloads(2, 3, version=COMPACT_FORMAT)
+
+        self.assertTrue(
+            all(len(c) < len(l) for c, l in zip(compact, legacy))
+        )
+        for legacy_payload, compact_payload in zip(legacy, compact):
+            legacy_node = Node.deserialize(legacy_payload)
+            compact_node = Node.deserialize(compact_payload)
+
+            self.assertEqual(legacy_node, compact_node)
+            self.assertTrue(legacy_node.peer is compact_node.peer)
+            self.assertEqual(legacy_node.metadata, compact_node.metadata)
+
+    def test_benchmarks_run(self):
+        benchmarks = memory.get_benchmarks(2, 3)
+
+        self.assertEqual(
+            [
+                benchmark.key for benchmark in benchmarks
+                if benchmark.name == "deserialize"
+            ],
+            [
+                "deserialize[clusters=2,format=compact,nodes=3]",
+                "deserialize[clusters=2,format=legacy,nodes=3]",
+            ]
+        )
+        for benchmark in benchmarks:
+            self.assertEqual(len(benchmark.fn()), 6)
+
+    @unittest.skipIf(
+        harness.tracemalloc is None, "Measuring memory needs python 3.4+"
+    )
+    def test_memory_benchmarks_run(self):
+        benchmarks = memory.get_benchmarks(2, 3)
+
+        self.assertEqual(
+            [benchmark.key for benchmark in benchmarks],
+            [
+                "deserialize[clusters=2,format=compact,nodes=3]",
+                "node_memory[clusters=2,format=compact,nodes=3]",
+                "deserialize[clusters=2,format=legacy,nodes=3]",
+                "node_memory[clusters=2,format=legacy,nodes=3]",
+            ]
+        )
+
+        result = harness.run_benchmark(benchmarks[1], repeat=1)
+
+        self.assertEqual(result["unit"], "bytes")
+        self.assertTrue(result["median"] > 0)
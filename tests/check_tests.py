@@ -310,6 +310,55 @@ class BaseCheckTests(unittest.TestCase):
             [False, False]
         )
 
+    @patch.object(Check, "apply_check_config", Mock())
+    @patch.object(Check, "validate_config", Mock())
+    @patch("lighthouse.check.is_coroutine")
+    @patch.object(Check, "perform")
+    def test_coroutine_perform_fails_without_engine(self, perform,
+                                                    is_coroutine):
+        is_coroutine.side_effect = lambda obj: obj is perform.return_value
+
+        check = Check()
+        check.apply_config({"rise": 1, "fall": 1})
+
+        check.run()
+
+        perform.return_value.close.assert_called_once_with()
+        self.assertEqual(list(check.results), [False])
+
+    @patch("lighthouse.check.metrics")
+    @patch.object(Check, "apply_check_config", Mock())
+    @patch.object(Check, "validate_config", Mock())
+    @patch.object(Check, "perform")
+    def test_run_records_metrics(self, perform, metrics):
+        perform.return_value = True
+
+        check = Check()
+        check.name = "http"
+        check.service_name = "app"
+        check.apply_config({"rise": 1, "fall": 1})
+
+        check.run()
+
+        metrics.check_results.inc.assert_called_once_with(
+            service="app", check="http", result="pass"
+        )
+        self.assertEqual(metrics.check_duration.observe.call_count, 1)
+        _, kwargs = metrics.check_duration.observe.call_args
+        self.assertEqual(kwargs, {"service": "app", "check": "http"})
+
+    @patch.object(Check, "apply_check_config", Mock())
+    @patch.object(Check, "validate_config", Mock())
+    def test_timeout_config(self):
+        check = Check()
+        check.apply_config({"rise": 1, "fall": 1, "timeout": "2.5"})
+
+        self.assertEqual(check.timeout, 2.5)
+
+        check.apply_config({"rise": 1, "fall": 1})
+
+        self.assertEqual(check.timeout, None)
+
     @patch.object(Check, "apply_check_config", Mock())
     @patch.object(Check, "validate_config", Mock())
     @patch.object(Check, "get_installed_classes")
@@ -3,9 +3,13 @@ try:
 except ImportError:
     import unittest
 
-from mock import patch
+import socket
 
-from lighthouse.checks.http import HTTPCheck
+from mock import patch, Mock
+
+from six.moves import http_client
+
+from lighthouse.checks.http import HTTPCheck, HTTPSConnection
 
 
 @patch("lighthouse.checks.http.client")
@@ -35,7 +39,9 @@ class HTTPCheckTests(unittest.TestCase):
 
         check.perform()
 
-        client.HTTPConnection.assert_called_once_with("localhost", 9999)
+        client.HTTPConnection.assert_called_once_with(
+            "localhost", 9999, timeout=2
+        )
 
         connection = client.HTTPConnection.return_value
         connection.request.assert_called_once_with("GET", "/foo")
@@ -61,8 +67,10 @@ class HTTPCheckTests(unittest.TestCase):
 
         connection.request.assert_called_once_with("POST", "/foo")
 
-    def test_perform_with_https(self, client):
-        connection = client.HTTPSConnection.return_value
+    @patch("lighthouse.checks.http.ssl")
+    @patch("lighthouse.checks.http.HTTPSConnection")
+    def test_perform_with_https(self, HTTPSConnection, ssl, client):
+        connection = HTTPSConnection.return_value
         connection.getresponse.return_value.status = 200
 
         check = HTTPCheck()
@@ -78,7 +86,194 @@ class HTTPCheckTests(unittest.TestCase):
 
         check.perform()
 
-        client.HTTPSConnection.assert_called_once_with("localhost", 9999)
+        HTTPSConnection.assert_called_once_with(
+            "localhost", 9999, timeout=2,
+            context=ssl.create_default_context.return_value,
+            tls_session=None
+        )
+
+    @patch("lighthouse.checks.http.ssl", spec=[])
+    @patch("lighthouse.checks.http.HTTPSConnection")
+    def test_https_without_default_context(self, HTTPSConnection, ssl,
+                                           client):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.return_value.status = 200
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "https": True, "rise": 1, "fall": 1}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        self.assertEqual(check.perform(), True)
+
+        HTTPSConnection.assert_called_once_with(
+            "localhost", 9999, timeout=2
+        )
+        self.assertEqual(check.ssl_context, None)
+
+    @patch("lighthouse.checks.http.ssl")
+    @patch("lighthouse.checks.http.HTTPSConnection")
+    def test_https_reuses_context_and_tls_session(self, HTTPSConnection,
+                                                  ssl, client):
+        connection = HTTPSConnection.return_value
+        connection.getresponse.return_value.status = 200
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "https": True, "rise": 1, "fall": 1}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        check.perform()
+        check.perform()
+
+        self.assertEqual(ssl.create_default_context.call_count, 1)
+        HTTPSConnection.assert_called_with(
+            "localhost", 9999, timeout=2,
+            context=ssl.create_default_context.return_value,
+            tls_session=connection.sock.session
+        )
+
+    def test_https_connection_resumes_tls_session(self, client):
+        context = Mock()
+        session = Mock()
+
+        connection = HTTPSConnection("localhost", 443, tls_session=session)
+        connection._context = context
+        connection.host = "localhost"
+        connection.sock = Mock()
+        original_sock = connection.sock
+
+        connection.connect()
+
+        context.wrap_socket.assert_called_once_with(
+            original_sock, server_hostname="localhost", session=session
+        )
+        self.assertEqual(connection.sock, context.wrap_socket.return_value)
+
+    def test_timeouts_applied(self, client):
+        connection = client.HTTPConnection.return_value
+        connection.getresponse.return_value.status = 200
+
+        check = HTTPCheck()
+        check.apply_config({
+            "uri": "/foo", "rise": 1, "fall": 1,
+            "connect_timeout": 1, "read_timeout": "0.5"
+        })
+        check.host = "localhost"
+        check.port = 9999
+
+        check.perform()
+
+        client.HTTPConnection.assert_called_once_with(
+            "localhost", 9999, timeout=1.0
+        )
+        connection.connect.assert_called_once_with()
+        connection.sock.settimeout.assert_called_once_with(0.5)
+
+    def test_keep_alive_reuses_connection(self, client):
+        connection = client.HTTPConnection.return_value
+        response = connection.getresponse.return_value
+        response.status = 200
+        response.will_close = False
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "rise": 1, "fall": 1, "keep_alive": True}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        self.assertEqual(check.perform(), True)
+        self.assertEqual(check.perform(), True)
+
+        self.assertEqual(client.HTTPConnection.call_count, 1)
+        self.assertEqual(response.read.call_count, 2)
+        self.assertFalse(connection.close.called)
+
+    def test_keep_alive_closes_if_server_will_close(self, client):
+        connection = client.HTTPConnection.return_value
+        response = connection.getresponse.return_value
+        response.status = 200
+        response.will_close = True
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "rise": 1, "fall": 1, "keep_alive": True}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        check.perform()
+
+        connection.close.assert_called_once_with()
+        self.assertEqual(check.connection, None)
+
+    def test_keep_alive_reconnects_if_stale(self, client):
+        stale = Mock()
+        stale.getresponse.return_value.status = 200
+        stale.getresponse.return_value.will_close = False
+        fresh = Mock()
+        fresh.getresponse.return_value.status = 204
+        fresh.getresponse.return_value.will_close = False
+
+        client.HTTPConnection.side_effect = [stale, fresh]
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "rise": 1, "fall": 1, "keep_alive": True}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        check.perform()
+
+        stale.getresponse.side_effect = http_client.BadStatusLine("")
+
+        self.assertEqual(check.perform(), True)
+
+        stale.close.assert_called_once_with()
+        self.assertEqual(check.connection, fresh)
+
+    def test_timeout_on_kept_alive_connection_not_retried(self, client):
+        connection = client.HTTPConnection.return_value
+        connection.getresponse.return_value.status = 200
+        connection.getresponse.return_value.will_close = False
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "rise": 1, "fall": 1, "keep_alive": True}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        check.perform()
+
+        connection.getresponse.side_effect = socket.timeout
+
+        self.assertRaises(socket.timeout, check.perform)
+
+        self.assertEqual(client.HTTPConnection.call_count, 1)
+        self.assertEqual(check.connection, None)
+
+    def test_error_on_new_connection_not_retried(self, client):
+        connection = client.HTTPConnection.return_value
+        connection.getresponse.side_effect = socket.error
+
+        check = HTTPCheck()
+        check.apply_config(
+            {"uri": "/foo", "rise": 1, "fall": 1, "keep_alive": True}
+        )
+        check.host = "localhost"
+        check.port = 9999
+
+        self.assertRaises(socket.error, check.perform)
+
+        self.assertEqual(client.HTTPConnection.call_count, 1)
+        connection.close.assert_called_once_with()
 
     def test_perform_response_is_200(self, client):
         connection = client.HTTPConnection.return_value
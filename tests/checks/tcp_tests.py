@@ -4,10 +4,12 @@ except ImportError:
     import unittest
 import errno
 import socket
+import threading
 
 from mock import patch
 
 from lighthouse.checks.tcp import TCPCheck
+from lighthouse.redis.check import RedisCheck
 
 
 @patch("lighthouse.checks.tcp.socket")
@@ -44,8 +46,8 @@ class TCPCheckTests(unittest.TestCase):
 
         check.apply_check_config({"query": "ruok", "response": "imok"})
 
-        self.assertEqual(check.query, "ruok")
-        self.assertEqual(check.expected_response, "imok")
+        self.assertEqual(check.query, b"ruok")
+        self.assertEqual(check.expected_response, b"imok")
 
     def test_error_during_send(self, mock_socket):
         sock = mock_socket.socket.return_value
@@ -78,6 +80,79 @@ class TCPCheckTests(unittest.TestCase):
             check.perform
         )
 
+        sock.close.assert_called_once_with()
+
+    def test_timeouts_applied(self, mock_socket):
+        sock = mock_socket.socket.return_value
+        sock.recv.return_value = b"imok\n"
+
+        check = TCPCheck()
+        check.apply_config({
+            "query": "ruok", "response": "imok",
+            "connect_timeout": 1, "read_timeout": "3",
+            "rise": 1, "fall": 1
+        })
+
+        self.assertEqual(check.perform(), True)
+
+        self.assertEqual(sock.settimeout.call_args_list[0][0], (1.0,))
+        self.assertEqual(sock.settimeout.call_args_list[1][0], (3.0,))
+        for args, _ in sock.settimeout.call_args_list[2:]:
+            self.assertTrue(0 < args[0] <= 3)
+
+    def test_carriage_return_ignored(self, mock_socket):
+        sock = mock_socket.socket.return_value
+        sock.recv.return_value = b"+PONG\r\n"
+
+        check = RedisCheck()
+        check.apply_config({"rise": 1, "fall": 1})
+
+        self.assertEqual(check.perform(), True)
+
+        sock.sendall.assert_called_once_with(b"PING\r\n")
+
+    def test_response_too_large(self, mock_socket):
+        sock = mock_socket.socket.return_value
+        sock.recv.return_value = b"x" * 10
+
+        check = TCPCheck()
+        check.apply_config({
+            "query": "ruok", "response": "imok",
+            "max_response_size": 25,
+            "rise": 1, "fall": 1
+        })
+
+        self.assertRaises(ValueError, check.perform)
+
+        self.assertEqual(sock.recv.call_count, 3)
+        sock.close.assert_called_once_with()
+
+    @patch("lighthouse.sockutils.time")
+    @patch("lighthouse.checks.tcp.time")
+    def test_read_deadline(self, tcp_time, sockutils_time, mock_socket):
+        sock = mock_socket.socket.return_value
+        tcp_time.time.return_value = 100
+        clock = [100]
+
+        def recv(*args):
+            clock[0] += 2
+            return b"i"
+
+        sock.recv.side_effect = recv
+        sockutils_time.time.side_effect = lambda: clock[0]
+
+        check = TCPCheck()
+        check.apply_config({
+            "query": "ruok", "response": "imok",
+            "read_timeout": 5,
+            "rise": 1, "fall": 1
+        })
+
+        self.assertRaises(socket.timeout, check.perform)
+
+        self.assertEqual(sock.recv.call_count, 3)
+        sock.close.assert_called_once_with()
+
     def test_error_during_recv(self, mock_socket):
         sock = mock_socket.socket.return_value
         sock.recv.side_effect = Exception("oh no!")
@@ -96,7 +171,7 @@ class TCPCheckTests(unittest.TestCase):
 
     def test_mismatch_response(self, mock_socket):
         sock = mock_socket.socket.return_value
-        sock.recv.return_value = "notok\n"
+        sock.recv.return_value = b"notok\n"
 
         check = TCPCheck()
         check.apply_config({
@@ -107,13 +182,13 @@ class TCPCheckTests(unittest.TestCase):
 
         self.assertEqual(check.perform(), False)
 
-        sock.sendall.assert_called_once_with("ruok")
+        sock.sendall.assert_called_once_with(b"ruok")
 
         sock.close.assert_called_once_with()
 
     def test_matching_response(self, mock_socket):
         sock = mock_socket.socket.return_value
-        sock.recv.return_value = "imok\n"
+        sock.recv.return_value = b"imok\n"
 
         check = TCPCheck()
         check.apply_config({
@@ -124,14 +199,14 @@ class TCPCheckTests(unittest.TestCase):
 
         self.assertEqual(check.perform(), True)
 
-        sock.sendall.assert_called_once_with("ruok")
+        sock.sendall.assert_called_once_with(b"ruok")
 
         sock.close.assert_called_once_with()
 
     def test_chunked_response(self, mock_socket):
         sock = mock_socket.socket.return_value
 
-        chunks = ["im", "ok", "\n"]
+        chunks = [b"im", b"ok", b"\n"]
 
         def get_next_chunk(*args):
             chunk = chunks.pop(0)
@@ -166,7 +241,7 @@ class TCPCheckTests(unittest.TestCase):
 
         self.assertEqual(check.perform(), False)
 
-        sock.sendall.assert_called_once_with("ruok")
+        sock.sendall.assert_called_once_with(b"ruok")
 
         sock.close.assert_called_once_with()
 
@@ -177,7 +252,7 @@ class TCPCheckTests(unittest.TestCase):
         again = socket.error(errno.EAGAIN, "try again")
         interrupt = socket.error(errno.EINTR, "interrupted!")
 
-        chunks = ["im", interrupt, "ok", again, "\n"]
+        chunks = [b"im", interrupt, b"ok", again, b"\n"]
 
         def get_next_chunk(*args):
             chunk = chunks.pop(0)
@@ -206,7 +281,7 @@ class TCPCheckTests(unittest.TestCase):
         interrupt = socket.error(errno.EINTR, "interrupted!")
         network_down = socket.error(errno.ENETDOWN, "network's down :/")
 
-        chunks = ["im", interrupt, network_down, "ok", "\n"]
+        chunks = [b"im", interrupt, network_down, b"ok", b"\n"]
 
         def get_next_chunk(*args):
             chunk = chunks.pop(0)
@@ -231,7 +306,7 @@ class TCPCheckTests(unittest.TestCase):
 
     def test_connection_success_with_no_query(self, mock_socket):
         sock = mock_socket.socket.return_value
-        sock.recv.return_value = "notok\n"
+        sock.recv.return_value = b"notok\n"
 
         check = TCPCheck()
         check.apply_config({
@@ -245,3 +320,45 @@ class TCPCheckTests(unittest.TestCase):
         assert sock.recv.called is False
 
         sock.close.assert_called_once_with()
+
+
+class TCPCheckSocketTests(unittest.TestCase):
+
+    def setUp(self):
+        super(TCPCheckSocketTests, self).setUp()
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.addCleanup(self.server.close)
+
+        self.check = TCPCheck()
+        self.check.host, self.check.port = self.server.getsockname()
+
+    def test_silent_peer_times_out(self):
+        self.check.apply_config({
+            "query": "ruok", "response": "imok",
+            "read_timeout": 0.05,
+            "rise": 1, "fall": 1
+        })
+
+        self.assertRaises(socket.timeout, self.check.perform)
+
+    def test_peer_closing_without_newline(self):
+        self.check.apply_config({
+            "query": "ruok", "response": "imok",
+            "rise": 1, "fall": 1
+        })
+
+        def respond():
+            conn, _ = self.server.accept()
+            conn.recv(4)
+            conn.sendall(b"imok")
+            conn.close()
+
+        responder = threading.Thread(target=respond)
+        responder.start()
+
+        self.assertEqual(self.check.perform(), True)
+
+        responder.join()
@@ -4,7 +4,7 @@ try:
 except ImportError:
     import unittest
 
-from mock import patch, Mock
+from mock import patch, Mock, call
 
 from lighthouse.discovery import Discovery
 
@@ -75,6 +75,20 @@ class DiscoveryTests(unittest.TestCase):
             discovery.report_down, Mock(), 8000
         )
 
+    @patch.object(Discovery, "report_down")
+    @patch.object(Discovery, "report_up")
+    def test_report_batch_reports_each_port(self, report_up, report_down):
+        discovery = Discovery()
+        service = Mock()
+
+        discovery.report_batch(service, [8000, 8001], [9000])
+
+        self.assertEqual(
+            report_up.call_args_list,
+            [call(service, 8000), call(service, 8001)]
+        )
+        report_down.assert_called_once_with(service, 9000)
+
     def test_disconnect_required(self):
         discovery = Discovery()
 
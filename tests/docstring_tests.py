@@ -1,5 +1,6 @@
 import inspect
 import re
+import sys
 
 import lighthouse.balancer
 import lighthouse.check
@@ -13,6 +14,7 @@ import lighthouse.discovery
 import lighthouse.haproxy.balancer
 import lighthouse.haproxy.config
 import lighthouse.haproxy.control
+import lighthouse.haproxy.slots
 import lighthouse.haproxy.stanzas.section
 import lighthouse.haproxy.stanzas.stanza
 import lighthouse.haproxy.stanzas.meta
@@ -33,8 +35,12 @@ import lighthouse.service
 import lighthouse.writer
 import lighthouse.zookeeper
 import lighthouse.events
+import lighthouse.identity
 import lighthouse.redis.check
 import lighthouse.sockutils
+import lighthouse.sync
+import lighthouse.scheduler
+import lighthouse.metrics
 
 
 modules_to_test = (
@@ -50,6 +56,7 @@ modules_to_test = (
     lighthouse.haproxy.balancer,
     lighthouse.haproxy.config,
     lighthouse.haproxy.control,
+    lighthouse.haproxy.slots,
     lighthouse.haproxy.stanzas.section,
     lighthouse.haproxy.stanzas.stanza,
     lighthouse.haproxy.stanzas.meta,
@@ -70,10 +77,19 @@ modules_to_test = (
     lighthouse.writer,
     lighthouse.zookeeper,
     lighthouse.events,
+    lighthouse.identity,
     lighthouse.redis.check,
-    lighthouse.sockutils
+    lighthouse.sockutils,
+    lighthouse.sync,
+    lighthouse.scheduler,
+    lighthouse.metrics,
 )
 
+# the engine module uses python 3.5+ syntax
+if sys.version_info >= (3, 5):
+    import lighthouse.engine
+    modules_to_test += (lighthouse.engine,)
+
 
 def test_docstrings():
     for module in modules_to_test:
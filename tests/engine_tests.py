@@ -0,0 +1,138 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import sys
+import threading
+
+from mock import Mock
+
+# the engine and fake async check modules use python 3.5+ syntax
+if sys.version_info >= (3, 5):
+    from lighthouse.engine import AsyncCheckEngine
+    from tests.async_checks import FakeAsyncCheck
+
+
+@unittest.skipIf(
+    sys.version_info < (3, 5), "The asyncio check engine needs python 3.5+"
+)
+class AsyncCheckEngineTests(unittest.TestCase):
+
+    def setUp(self):
+        super(AsyncCheckEngineTests, self).setUp()
+
+        self.prepare = Mock(return_value=True)
+        self.report = Mock()
+
+        self.engine = AsyncCheckEngine(self.prepare, self.report)
+
+        self.addCleanup(self.engine.executor.shutdown)
+        self.addCleanup(self.engine.loop.close)
+
+    def run_until_complete(self, coroutine):
+        return self.engine.loop.run_until_complete(coroutine)
+
+    def make_service(self, *checks):
+        service = Mock()
+        service.name = "app"
+        service.check_interval = 0.01
+        service.check_splay = 0
+        service.ports = set([8888])
+        service.checks = {
+            8888: dict(("check%d" % i, c) for i, c in enumerate(checks))
+        }
+        service.update_status.return_value = (set(), set())
+
+        return service
+
+    def test_async_perform_is_awaited(self):
+        check = FakeAsyncCheck(result=True)
+
+        self.run_until_complete(self.engine.run_check(check, 1))
+
+        check.record_result.assert_called_once_with(True)
+        self.assertEqual(check.record_duration.call_count, 1)
+
+    def test_check_timeout_counts_as_failure(self):
+        check = FakeAsyncCheck(result=True, delay=5, timeout=0.01)
+
+        self.run_until_complete(self.engine.run_check(check, 10))
+
+        check.record_result.assert_called_once_with(False)
+
+    def test_default_timeout_is_used_if_check_has_none(self):
+        check = FakeAsyncCheck(result=True, delay=5)
+
+        self.run_until_complete(self.engine.run_check(check, 0.01))
+
+        check.record_result.assert_called_once_with(False)
+
+    def test_blocking_perform_run_in_executor(self):
+        caller_threads = []
+
+        check = Mock(timeout=None)
+        check.perform.side_effect = lambda: (
+            caller_threads.append(threading.current_thread()) or True
+        )
+
+        self.run_until_complete(self.engine.run_check(check, 1))
+
+        check.record_result.assert_called_once_with(True)
+        self.assertNotEqual(caller_threads, [threading.current_thread()])
+
+    def test_error_in_perform_counts_as_failure(self):
+        check = Mock(timeout=None)
+        check.name = "broken"
+        check.perform.side_effect = ValueError
+
+        self.run_until_complete(self.engine.run_check(check, 1))
+
+        check.record_result.assert_called_once_with(False)
+
+    def test_run_checks_runs_checks_concurrently(self):
+        checks = [FakeAsyncCheck(delay=0.2, timeout=1) for _ in range(20)]
+        service = self.make_service(*checks)
+
+        started = self.engine.loop.time()
+        self.run_until_complete(self.engine.run_checks(service))
+
+        self.assertLess(self.engine.loop.time() - started, 2)
+        for check in checks:
+            check.record_result.assert_called_once_with(True)
+
+    def test_run_checks_reports_changes(self):
+        service = self.make_service(FakeAsyncCheck())
+        service.update_status.return_value = (set([8888]), set())
+
+        self.run_until_complete(self.engine.run_checks(service))
+
+        self.report.assert_called_once_with(service, set([8888]), set())
+
+    def test_run_checks_skipped_if_not_prepared(self):
+        check = FakeAsyncCheck()
+        service = self.make_service(check)
+        self.prepare.return_value = False
+
+        self.run_until_complete(self.engine.run_checks(service))
+
+        self.assertFalse(check.record_result.called)
+        self.assertFalse(service.update_status.called)
+
+    def test_services_checked_until_removed_or_stopped(self):
+        reported = threading.Event()
+        self.report.side_effect = lambda *args: reported.set()
+
+        service = self.make_service(FakeAsyncCheck())
+        service.update_status.return_value = (set(), set([8888]))
+
+        self.engine.start()
+        self.engine.add_service(service)
+
+        self.assertTrue(reported.wait(5))
+
+        self.engine.remove_service("app")
+        self.engine.stop()
+
+        self.assertFalse(self.engine.thread.is_alive())
+        self.assertEqual(self.engine.tasks, {})
@@ -14,9 +14,9 @@ class EventsTests(unittest.TestCase):
 
     @patch.object(events, "wait_on_event")
     def test_any_sub_event_set_sets_composite_event(self, wait_on_event):
-        event1 = threading.Event()
-        event2 = threading.Event()
-        event3 = threading.Event()
+        event1 = events.Event()
+        event2 = events.Event()
+        event3 = events.Event()
 
         events.wait_on_any(event1, event2, event3)
 
@@ -31,9 +31,9 @@ class EventsTests(unittest.TestCase):
 
     @patch.object(events, "wait_on_event")
     def test_all_sub_events_clear_for_composite_to_clear(self, wait_on_event):
-        event1 = threading.Event()
-        event2 = threading.Event()
-        event3 = threading.Event()
+        event1 = events.Event()
+        event2 = events.Event()
+        event3 = events.Event()
 
         events.wait_on_any(event1, event2, event3)
 
@@ -55,6 +55,55 @@ class EventsTests(unittest.TestCase):
 
         self.assertEqual(composite.is_set(), False)
 
+    def test_wait_on_any_requires_lighthouse_events(self):
+        self.assertRaises(
+            TypeError,
+            events.wait_on_any, events.Event(), threading.Event()
+        )
+
+    def test_wait_on_any_woken_up_by_set_from_other_thread(self):
+        event1 = events.Event()
+        event2 = events.Event()
+
+        timer = threading.Timer(0.01, event2.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        events.wait_on_any(event1, event2, timeout=5)
+
+        self.assertEqual(event2.is_set(), True)
+
+    def test_composite_deregisters_after_wait(self):
+        event1 = events.Event()
+        event2 = events.Event()
+
+        for _ in range(3):
+            composite = events.CompositeEvent(event1, event2)
+
+            self.assertEqual(composite.wait(timeout=0), False)
+
+        self.assertEqual(event1.composites, set())
+        self.assertEqual(event2.composites, set())
+
+        event1.set()
+
+        self.assertEqual(composite.wait(timeout=0), True)
+        self.assertEqual(event1.composites, set())
+
+    def test_event_wait_and_clear(self):
+        event = events.Event()
+
+        self.assertEqual(event.wait(timeout=0), False)
+
+        event.set()
+
+        self.assertEqual(event.isSet(), True)
+        self.assertEqual(event.wait(), True)
+
+        event.clear()
+
+        self.assertEqual(event.is_set(), False)
+
     def test_wait_on_event_with_timeout(self):
         mock_event = Mock()
 
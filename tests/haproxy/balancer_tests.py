@@ -1,25 +1,30 @@
-import sys
+import os
+import shutil
+import stat
+import tempfile
 import time
 try:
     import unittest2 as unittest
 except ImportError:
     import unittest
 
-from mock import patch, Mock, mock_open, call
+from mock import patch, Mock
 
 from lighthouse.haproxy.balancer import HAProxy
 
 
-if sys.version_info[0] == 3:
-    builtin_module = "builtins"
-else:
-    builtin_module = "__builtin__"
-
-
 @patch("lighthouse.haproxy.balancer.HAProxyControl")
 @patch("lighthouse.haproxy.balancer.HAProxyConfig")
 class HAProxyBalancerTests(unittest.TestCase):
 
+    def setUp(self):
+        super(HAProxyBalancerTests, self).setUp()
+
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+
+        self.config_path = os.path.join(self.config_dir, "haproxy.cfg")
+
     def test_config_file_required(self, Config, Control):
         self.assertRaises(
             ValueError,
@@ -208,16 +213,17 @@ class HAProxyBalancerTests(unittest.TestCase):
 
     @patch.object(HAProxy, "restart")
     @patch.object(HAProxy, "sync_nodes")
-    @patch(builtin_module + ".open", mock_open())
     def test_sync_file_syncs_nodes_if_no_restart(self, sync_nodes, restart,
                                                  Config, Control):
         cluster1 = Mock()
         cluster2 = Mock()
 
+        Config.return_value.generate.return_value = "global\n"
+
         balancer = HAProxy()
         balancer.apply_config(
             {
-                "config_file": "/etc/haproxy/haproxy.conf",
+                "config_file": self.config_path,
                 "socket_file": "/var/run/haproxy.sock",
                 "pid_file": "/var/run/haproxy.pid",
             }
@@ -237,40 +243,154 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster1 = Mock()
         cluster2 = Mock()
 
+        Config.return_value.generate.return_value = "global\n\tdaemon\n"
+
         balancer = HAProxy()
         balancer.apply_config(
             {
-                "config_file": "/etc/haproxy/haproxy.conf",
+                "config_file": self.config_path,
                 "socket_file": "/var/run/haproxy.sock",
                 "pid_file": "/var/run/haproxy.pid",
             }
         )
 
-        fake_file = mock_open()
+        balancer.sync_file([cluster1, cluster2])
 
-        with patch(builtin_module + ".open", fake_file, create=True):
-            balancer.sync_file([cluster1, cluster2])
+        with open(self.config_path) as f:
+            self.assertEqual(f.read(), "global\n\tdaemon\n")
 
-        fake_file.return_value.write.assert_called_once_with(
-            Config.return_value.generate.return_value
-        )
+        self.assertEqual(os.listdir(self.config_dir), ["haproxy.cfg"])
         Config.return_value.generate.assert_called_once_with(
             [cluster1, cluster2],
-            version=Control.return_value.get_version.return_value
+            version=Control.return_value.version,
+            slot_pools=None
+        )
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
+    def test_sync_file_preserves_file_mode(self, sync_nodes, restart,
+                                           Config, Control):
+        with open(self.config_path, "w") as f:
+            f.write("old content\n")
+        os.chmod(self.config_path, 0o640)
+
+        Config.return_value.generate.return_value = "new content\n"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+            }
+        )
+
+        balancer.sync_file([])
+
+        with open(self.config_path) as f:
+            self.assertEqual(f.read(), "new content\n")
+        self.assertEqual(
+            stat.S_IMODE(os.stat(self.config_path).st_mode), 0o640
+        )
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
+    def test_sync_file_unchanged_content_not_written(self, sync_nodes,
+                                                     restart,
+                                                     Config, Control):
+        Config.return_value.generate.side_effect = [
+            "#\n# Auto-generated by Lighthouse (Mon Jan 1 00:00:00)\n#\n",
+            "#\n# Auto-generated by Lighthouse (Mon Jan 1 00:00:05)\n#\n",
+        ]
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+            }
+        )
+        balancer.restart_required = False
+
+        balancer.sync_file([])
+        os.utime(self.config_path, (0, 0))
+        balancer.sync_file([])
+
+        self.assertEqual(os.stat(self.config_path).st_mtime, 0)
+        self.assertEqual(os.listdir(self.config_dir), ["haproxy.cfg"])
+        self.assertEqual(restart.called, False)
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
+    def test_sync_file_writes_new_config_file_path(self, sync_nodes, restart,
+                                                   Config, Control):
+        Config.return_value.generate.return_value = "global\n"
+        new_config_path = os.path.join(self.config_dir, "other.cfg")
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+            }
+        )
+        balancer.sync_file([])
+
+        balancer.apply_config(
+            {
+                "config_file": new_config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+            }
+        )
+        balancer.sync_file([])
+
+        with open(new_config_path) as f:
+            self.assertEqual(f.read(), "global\n")
+        self.assertEqual(
+            sorted(os.listdir(self.config_dir)), ["haproxy.cfg", "other.cfg"]
         )
 
     @patch.object(HAProxy, "restart")
     @patch.object(HAProxy, "sync_nodes")
-    @patch(builtin_module + ".open", mock_open())
+    def test_sync_file_matching_existing_file_not_written(self, sync_nodes,
+                                                          restart,
+                                                          Config, Control):
+        with open(self.config_path, "w") as f:
+            f.write("global\n")
+        os.utime(self.config_path, (0, 0))
+
+        Config.return_value.generate.return_value = "global\n"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+            }
+        )
+
+        balancer.sync_file([])
+
+        self.assertEqual(os.stat(self.config_path).st_mtime, 0)
+        restart.assert_called_once_with()
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
     def test_sync_file_restarts_if_required(self, sync_nodes, restart,
                                             Config, Control):
         cluster1 = Mock()
         cluster2 = Mock()
 
+        Config.return_value.generate.return_value = "global\n"
+
         balancer = HAProxy()
         balancer.apply_config(
             {
-                "config_file": "/etc/haproxy/haproxy.conf",
+                "config_file": self.config_path,
                 "socket_file": "/var/run/haproxy.sock",
                 "pid_file": "/var/run/haproxy.pid",
             }
@@ -464,10 +584,10 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster2.name = "cluster2"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-                {"svname": "app02:8888"},
-            ]
+            "cluster1": {
+                "app01:8888": {},
+                "app02:8888": {},
+            }
         }
 
         balancer = HAProxy()
@@ -492,9 +612,9 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster1.name = "cluster1"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-            ]
+            "cluster1": {
+                "app01:8888": {},
+            }
         }
 
         balancer = HAProxy()
@@ -525,18 +645,17 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster2.name = "cluster2"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-                {"svname": "app04:8888"},
-            ],
-            "cluster2": [
-                {"svname": "app02:8888"},
-                {"svname": "app03:8888"},
-            ],
+            "cluster1": {
+                "app01:8888": {},
+                "app04:8888": {},
+            },
+            "cluster2": {
+                "app02:8888": {},
+                "app03:8888": {},
+            },
         }
 
-        control.enable_node.return_value = ""
-        control.disable_node.return_value = ""
+        control.update_nodes.return_value = []
 
         balancer = HAProxy()
         balancer.apply_config(
@@ -550,14 +669,15 @@ class HAProxyBalancerTests(unittest.TestCase):
 
         balancer.sync_nodes([cluster1, cluster2])
 
-        control.disable_node.assert_has_calls([
-            call("cluster2", "app02:8888"),
-            call("cluster2", "app03:8888"),
-        ], any_order=True)
-        control.enable_node.assert_has_calls([
-            call("cluster1", "app01:8888"),
-            call("cluster1", "app04:8888"),
-        ], any_order=True)
+        enabled, disabled = control.update_nodes.call_args[0]
+        self.assertEqual(
+            sorted(enabled),
+            [("cluster1", "app01:8888"), ("cluster1", "app04:8888")]
+        )
+        self.assertEqual(
+            sorted(disabled),
+            [("cluster2", "app02:8888"), ("cluster2", "app03:8888")]
+        )
         self.assertEqual(balancer.restart_required, False)
 
     def test_sync_nodes_enable_disable_nodes(self, Config, Control):
@@ -578,18 +698,17 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster2.name = "cluster2"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-                {"svname": "app04:8888"},
-            ],
-            "cluster2": [
-                {"svname": "app02:8888"},
-                {"svname": "app03:8888"},
-            ],
+            "cluster1": {
+                "app01:8888": {},
+                "app04:8888": {},
+            },
+            "cluster2": {
+                "app02:8888": {},
+                "app03:8888": {},
+            },
         }
 
-        control.enable_node.return_value = ""
-        control.disable_node.return_value = ""
+        control.update_nodes.return_value = []
 
         balancer = HAProxy()
         balancer.apply_config(
@@ -603,14 +722,15 @@ class HAProxyBalancerTests(unittest.TestCase):
 
         balancer.sync_nodes([cluster1, cluster2])
 
-        control.disable_node.assert_has_calls([
-            call("cluster2", "app03:8888"),
-        ], any_order=True)
-        control.enable_node.assert_has_calls([
-            call("cluster2", "app02:8888"),
-            call("cluster1", "app01:8888"),
-            call("cluster1", "app04:8888"),
-        ], any_order=True)
+        enabled, disabled = control.update_nodes.call_args[0]
+        self.assertEqual(
+            sorted(enabled),
+            [
+                ("cluster1", "app01:8888"), ("cluster1", "app04:8888"),
+                ("cluster2", "app02:8888"),
+            ]
+        )
+        self.assertEqual(disabled, [("cluster2", "app03:8888")])
         self.assertEqual(balancer.restart_required, True)
 
     def test_sync_nodes_error_with_command(self, Config, Control):
@@ -627,18 +747,17 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster2.name = "cluster2"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-                {"svname": "app04:8888"},
-            ],
-            "cluster2": [
-                {"svname": "app02:8888"},
-                {"svname": "app03:8888"},
-            ],
+            "cluster1": {
+                "app01:8888": {},
+                "app04:8888": {},
+            },
+            "cluster2": {
+                "app02:8888": {},
+                "app03:8888": {},
+            },
         }
 
-        control.enable_node.return_value = ""
-        control.disable_node.return_value = "Something went wrong."
+        control.update_nodes.return_value = ["Something went wrong."]
 
         balancer = HAProxy()
         balancer.apply_config(
@@ -652,9 +771,7 @@ class HAProxyBalancerTests(unittest.TestCase):
 
         balancer.sync_nodes([cluster1, cluster2])
 
-        control.disable_node.assert_has_calls([
-            call("cluster2", "app02:8888"),
-        ])
+        self.assertEqual(control.update_nodes.call_count, 1)
         self.assertEqual(balancer.restart_required, True)
 
     def test_sync_nodes_exception_with_command(self, Config, Control):
@@ -671,18 +788,17 @@ class HAProxyBalancerTests(unittest.TestCase):
         cluster2.name = "cluster2"
 
         Control.return_value.get_active_nodes.return_value = {
-            "cluster1": [
-                {"svname": "app01:8888"},
-                {"svname": "app04:8888"},
-            ],
-            "cluster2": [
-                {"svname": "app02:8888"},
-                {"svname": "app03:8888"},
-            ],
+            "cluster1": {
+                "app01:8888": {},
+                "app04:8888": {},
+            },
+            "cluster2": {
+                "app02:8888": {},
+                "app03:8888": {},
+            },
         }
 
-        control.enable_node.side_effect = Exception("something went wrong")
-        control.disable_node.return_value = ""
+        control.update_nodes.side_effect = Exception("something went wrong")
 
         balancer = HAProxy()
         balancer.apply_config(
@@ -696,11 +812,152 @@ class HAProxyBalancerTests(unittest.TestCase):
 
         balancer.sync_nodes([cluster1, cluster2])
 
-        control.disable_node.assert_has_calls([
-            call("cluster2", "app02:8888"),
-        ], any_order=True)
-        control.enable_node.assert_has_calls([
-            call("cluster1", "app01:8888"),
-            call("cluster1", "app04:8888"),
-        ], any_order=True)
+        self.assertEqual(control.update_nodes.call_count, 1)
+        self.assertEqual(balancer.restart_required, True)
+
+    def test_spare_server_slots_must_be_positive(self, Config, Control):
+        self.assertRaises(
+            ValueError,
+            HAProxy.validate_config,
+            {
+                "config_file": "/etc/haproxy/haproxy.conf",
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+                "spare_server_slots": 0,
+            }
+        )
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
+    def test_slots_not_used_with_old_haproxy(self, sync_nodes, restart,
+                                             Config, Control):
+        Control.return_value.version = (1, 7, 9)
+        Config.return_value.generate.return_value = "global\n"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+                "spare_server_slots": 4,
+            }
+        )
+        balancer.restart_required = False
+
+        balancer.sync_file([])
+
+        sync_nodes.assert_called_once_with([])
+        Config.return_value.generate.assert_called_once_with(
+            [], version=(1, 7, 9), slot_pools=None
+        )
+
+    @patch.object(HAProxy, "restart")
+    @patch.object(HAProxy, "sync_nodes")
+    def test_sync_file_uses_slot_pools(self, sync_nodes, restart,
+                                       Config, Control):
+        control = Control.return_value
+        control.version = (1, 8, 3)
+        control.update_slots.return_value = []
+        Config.return_value.generate.return_value = "global\n"
+
+        node1 = Mock(ip="10.0.0.1", port=8000)
+        node1.name = "app01:8000"
+        node2 = Mock(ip="10.0.0.2", port=8000)
+        node2.name = "app02:8000"
+
+        cluster = Mock(nodes=[node1])
+        cluster.name = "webapp"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+                "spare_server_slots": 2,
+            }
+        )
+
+        balancer.sync_file([cluster])
+
+        restart.assert_called_once_with()
+        self.assertEqual(control.update_slots.called, False)
+        self.assertEqual(balancer.slot_pools["webapp"].nodes, {1: node1})
+        Config.return_value.generate.assert_called_with(
+            [cluster], version=(1, 8, 3), slot_pools=balancer.slot_pools
+        )
+
+        balancer.restart_required = False
+        cluster.nodes = [node2]
+
+        balancer.sync_file([cluster])
+
+        self.assertEqual(restart.call_count, 1)
+        self.assertEqual(sync_nodes.called, False)
+        control.update_slots.assert_called_once_with(
+            [("webapp", "slot2", "10.0.0.2", 8000)],
+            [("webapp", "slot1")]
+        )
+
+    def test_sync_slots_exhausted_pool_begets_restart(self, Config, Control):
+        control = Control.return_value
+
+        nodes = []
+        for i in range(4):
+            node = Mock(ip="10.0.0.%d" % i, port=8000)
+            node.name = "app0%d:8000" % i
+            nodes.append(node)
+
+        cluster = Mock(nodes=nodes[:1])
+        cluster.name = "webapp"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+                "spare_server_slots": 2,
+            }
+        )
+
+        balancer.sync_slots([cluster])
+        balancer.restart_required = False
+
+        cluster.nodes = nodes
+
+        balancer.sync_slots([cluster])
+
+        self.assertEqual(balancer.restart_required, True)
+        self.assertEqual(control.update_slots.called, False)
+        self.assertEqual(balancer.slot_pools["webapp"].size, 6)
+
+    def test_sync_slots_error_begets_restart(self, Config, Control):
+        control = Control.return_value
+        control.update_slots.return_value = ["No such server."]
+
+        node = Mock(ip="10.0.0.1", port=8000)
+        node.name = "app01:8000"
+
+        cluster = Mock(nodes=[])
+        cluster.name = "webapp"
+
+        balancer = HAProxy()
+        balancer.apply_config(
+            {
+                "config_file": self.config_path,
+                "socket_file": "/var/run/haproxy.sock",
+                "pid_file": "/var/run/haproxy.pid",
+                "spare_server_slots": 2,
+            }
+        )
+
+        balancer.sync_slots([cluster])
+        balancer.restart_required = False
+
+        cluster.nodes = [node]
+
+        balancer.sync_slots([cluster])
+
         self.assertEqual(balancer.restart_required, True)
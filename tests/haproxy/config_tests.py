@@ -5,7 +5,10 @@ except ImportError:
 
 from mock import Mock, patch
 
-from lighthouse.haproxy.config import HAProxyConfig
+from lighthouse.haproxy.config import HAProxyConfig, content_hash
+from lighthouse.haproxy.stanzas.stanza import Stanza
+from lighthouse.node import Node
+from lighthouse.peer import Peer
 
 
 class HAProxyConfigTests(unittest.TestCase):
@@ -60,10 +63,10 @@ class HAProxyConfigTests(unittest.TestCase):
 
         config = HAProxyConfig(global_stanza, defaults_stanza)
 
-        cluster1 = Mock(haproxy={"acl": "path_beg /api"})
+        cluster1 = Mock(haproxy={"acl": "path_beg /api"}, nodes=[])
         cluster1_backend = Mock(name="cluster1_backend")
         cluster1_peers = Mock(name="cluster1_peers")
-        cluster2 = Mock(haproxy={"port": 8000})
+        cluster2 = Mock(haproxy={"port": 8000}, nodes=[])
         cluster2_frontend = Mock(name="cluster2_frontend")
         cluster2_backend = Mock(name="cluster2_backend")
         cluster2_peers = Mock(name="cluster2_peers")
@@ -77,7 +80,7 @@ class HAProxyConfigTests(unittest.TestCase):
 
         FrontendStanza.side_effect = get_frontend_stanza
 
-        def get_backend_stanza(cluster):
+        def get_backend_stanza(cluster, slot_pool=None):
             return backend_stanzas.pop(0)
 
         BackendStanza.side_effect = get_backend_stanza
@@ -119,11 +122,11 @@ class HAProxyConfigTests(unittest.TestCase):
 
         config = HAProxyConfig(global_stanza, defaults_stanza)
 
-        cluster1 = Mock(haproxy={"port": 9999})
+        cluster1 = Mock(haproxy={"port": 9999}, nodes=[])
         cluster1_frontend = Mock()
         cluster1_backend = Mock()
         cluster1_peers = Mock()
-        cluster2 = Mock(haproxy={"port": 8888})
+        cluster2 = Mock(haproxy={"port": 8888}, nodes=[])
         cluster2_frontend = Mock()
         cluster2_backend = Mock()
         cluster2_peers = Mock()
@@ -137,7 +140,7 @@ class HAProxyConfigTests(unittest.TestCase):
 
         FrontendStanza.side_effect = get_frontend_stanza
 
-        def get_backend_stanza(cluster):
+        def get_backend_stanza(cluster, slot_pool=None):
             return backend_stanzas.pop(0)
 
         BackendStanza.side_effect = get_backend_stanza
@@ -187,3 +190,104 @@ class HAProxyConfigTests(unittest.TestCase):
         config.generate([])
 
         self.assertIn(stats_stanza, included_stanzas)
+
+    @patch("lighthouse.haproxy.config.PeersStanza")
+    @patch("lighthouse.haproxy.config.BackendStanza")
+    @patch("lighthouse.haproxy.config.FrontendStanza")
+    def test_unchanged_cluster_stanzas_are_reused(self, FrontendStanza,
+                                                  BackendStanza,
+                                                  PeersStanza):
+        config = HAProxyConfig(Mock(name="global"), Mock(name="defaults"))
+
+        node = Node("app01", "10.0.1.2", 8000, peer=Peer("app01", "10.0.1.2"))
+
+        cluster1 = Mock(haproxy={"port": 9999}, nodes=[node])
+        cluster1.name = "cluster1"
+        cluster2 = Mock(haproxy={"port": 8888}, nodes=[])
+        cluster2.name = "cluster2"
+
+        config.generate([cluster1, cluster2], version=(1, 5, 12))
+
+        self.assertEqual(FrontendStanza.call_count, 2)
+        self.assertEqual(BackendStanza.call_count, 2)
+        self.assertEqual(PeersStanza.call_count, 2)
+
+        cluster2.nodes = [
+            Node("app02", "10.0.1.3", 8000, peer=Peer("app02", "10.0.1.3"))
+        ]
+
+        config.generate([cluster1, cluster2], version=(1, 5, 12))
+
+        self.assertEqual(FrontendStanza.call_count, 3)
+        self.assertEqual(BackendStanza.call_count, 3)
+        self.assertEqual(PeersStanza.call_count, 3)
+        BackendStanza.assert_called_with(cluster2, slot_pool=None)
+
+        cluster1.haproxy = {"port": 9999, "backend": ["mode http"]}
+
+        config.generate([cluster1, cluster2], version=(1, 5, 12))
+
+        self.assertEqual(BackendStanza.call_count, 4)
+        BackendStanza.assert_called_with(cluster1, slot_pool=None)
+
+    @patch("lighthouse.haproxy.config.BackendStanza")
+    def test_removed_clusters_are_dropped_from_cache(self, BackendStanza):
+        config = HAProxyConfig(Mock(name="global"), Mock(name="defaults"))
+
+        cluster1 = Mock(haproxy={}, nodes=[])
+        cluster1.name = "cluster1"
+        cluster2 = Mock(haproxy={}, nodes=[])
+        cluster2.name = "cluster2"
+
+        config.generate([cluster1, cluster2])
+
+        self.assertEqual(
+            set(config.stanza_cache), set(["cluster1", "cluster2"])
+        )
+
+        config.generate([cluster2])
+
+        self.assertEqual(set(config.stanza_cache), set(["cluster2"]))
+        self.assertEqual(BackendStanza.call_count, 2)
+
+    def test_cached_stanzas_render_same_content(self):
+        config = HAProxyConfig(Stanza("global"), Stanza("defaults"))
+
+        cluster = Mock(haproxy={"port": 9999}, nodes=[
+            Node("app01", "10.0.1.2", 8000, peer=Peer("app01", "10.0.1.2")),
+        ])
+        cluster.name = "cluster"
+        cluster.meta_cluster = None
+
+        first = config.generate([cluster], version=(1, 5, 12))
+        second = config.generate([cluster], version=(1, 5, 12))
+
+        self.assertEqual(
+            first.split("\n", 2)[2], second.split("\n", 2)[2]
+        )
+        self.assertIn("server app01:8000 10.0.1.2:8000", second)
+
+
+class ContentHashTests(unittest.TestCase):
+
+    def test_header_timestamp_ignored(self):
+        config = HAProxyConfig(Stanza("global"), Stanza("defaults"))
+
+        with patch("lighthouse.haproxy.config.datetime") as mock_datetime:
+            mock_datetime.datetime.now.return_value.strftime.return_value = (
+                "Mon Jan  1 00:00:00 2015"
+            )
+            first = config.generate([])
+            mock_datetime.datetime.now.return_value.strftime.return_value = (
+                "Mon Jan  1 00:00:05 2015"
+            )
+            second = config.generate([])
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(content_hash(first), content_hash(second))
+
+    def test_different_content(self):
+        self.assertNotEqual(
+            content_hash("global\n\tdaemon\n"),
+            content_hash("global\n\tdebug\n")
+        )
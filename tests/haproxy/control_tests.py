@@ -1,16 +1,19 @@
 import errno
+import os
+import shutil
 import socket
 import subprocess
 import sys
+import tempfile
 try:
     import unittest2 as unittest
 except ImportError:
     import unittest
 
-from mock import patch, Mock, mock_open
+from mock import patch, Mock, PropertyMock, mock_open
 
 from lighthouse.haproxy.control import (
-    HAProxyControl,
+    HAProxyControl, batch_commands, get_binary_key,
     UnknownCommandError, PermissionError, UnknownServerError
 )
 
@@ -92,6 +95,61 @@ class HAProxyControlTests(unittest.TestCase):
 
         self.assertEqual(ctl.get_version(), None)
 
+    @patch("lighthouse.haproxy.control.get_binary_key")
+    @patch.object(HAProxyControl, "get_version")
+    def test_version_cached_until_binary_changes(self, get_version,
+                                                 get_binary_key):
+        get_version.return_value = (1, 5, 9)
+        get_binary_key.return_value = ("/usr/sbin/haproxy", 1234, 1000.0)
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(ctl.version, (1, 5, 9))
+        self.assertEqual(ctl.version, (1, 5, 9))
+        self.assertEqual(get_version.call_count, 1)
+
+        get_version.return_value = (1, 6, 2)
+        get_binary_key.return_value = ("/usr/sbin/haproxy", 5678, 2000.0)
+
+        self.assertEqual(ctl.version, (1, 6, 2))
+        self.assertEqual(get_version.call_count, 2)
+
+    @patch("lighthouse.haproxy.control.get_binary_key")
+    @patch.object(HAProxyControl, "get_version")
+    def test_version_not_cached_if_unknown(self, get_version,
+                                           get_binary_key):
+        get_binary_key.return_value = ("/usr/sbin/haproxy", 1234, 1000.0)
+        get_version.return_value = None
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(ctl.version, None)
+
+        get_version.return_value = (1, 5, 9)
+
+        self.assertEqual(ctl.version, (1, 5, 9))
+
+        get_binary_key.return_value = None
+
+        ctl.version
+        self.assertEqual(get_version.call_count, 3)
+
+    @patch("lighthouse.haproxy.control.subprocess")
+    def test_get_version_decodes_bytes(self, mock_subprocess):
+        mock_subprocess.check_output.return_value = (
+            b"HA-Proxy version 1.8.3 2017/12/30\n"
+        )
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(ctl.get_version(), (1, 8, 3))
+
     def test_enable_node(self):
         self.stub_commands = {
             "enable server rediscache/redis01": "OK"
@@ -118,13 +176,86 @@ class HAProxyControlTests(unittest.TestCase):
 
         self.assertEqual(result, "OK")
 
+    def test_update_nodes(self):
+        self.command_patcher.stop()
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        with patch.object(ctl, "send_commands") as send_commands:
+            result = ctl.update_nodes(
+                [("rediscache", "redis01"), ("rediscache", "redis02")],
+                [("webapp", "app01")]
+            )
+
+        send_commands.assert_called_once_with([
+            "enable server rediscache/redis01",
+            "enable server rediscache/redis02",
+            "disable server webapp/app01",
+        ])
+        self.assertEqual(result, send_commands.return_value)
+
+    def test_update_slots(self):
+        self.command_patcher.stop()
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        with patch.object(ctl, "send_commands") as send_commands:
+            result = ctl.update_slots(
+                [("webapp", "slot3", "10.0.0.3", 8000)],
+                [("webapp", "slot1")]
+            )
+
+        send_commands.assert_called_once_with([
+            "set server webapp/slot1 state maint",
+            "set server webapp/slot3 addr 10.0.0.3 port 8000",
+            "set server webapp/slot3 state ready",
+        ])
+        self.assertEqual(result, send_commands.return_value)
+
+    def test_send_commands_joins_with_semicolons(self):
+        self.stub_commands = {
+            "enable server rediscache/redis01;disable server webapp/app01": (
+                "No such server."
+            )
+        }
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        result = ctl.send_commands([
+            "enable server rediscache/redis01",
+            "disable server webapp/app01",
+        ])
+
+        self.assertEqual(result, ["No such server."])
+
+    def test_send_commands_no_errors(self):
+        self.stub_commands = {
+            "enable server rediscache/redis01": ""
+        }
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        result = ctl.send_commands(["enable server rediscache/redis01"])
+
+        self.assertEqual(result, [])
+
     def test_get_active_nodes(self):
         self.stub_commands = {
             "show stat -1 4 -1":
-            """# pxname,svname,qcur,qmax,scur,smax,slim,stot,bin,bout,dreq
-rediscache,redis01,,,0,0,1000,0,0,500,0
-rediscache,redis02,0,0,0,0,1000,0,0,0,1000
-web,app03,0,0,0,0,1000,0,0,0,0"""
+            """# pxname,svname,qcur,qmax,scur,status,weight,addr,
+rediscache,redis01,,,0,UP,1,10.0.0.1:6379,
+rediscache,redis02,0,0,0,MAINT,1,10.0.0.2:6379,
+web,app03,0,0,0,UP,2,10.0.1.3:8000,
+
+"""
         }
 
         ctl = HAProxyControl(
@@ -134,26 +265,69 @@ web,app03,0,0,0,0,1000,0,0,0,0"""
         self.assertEqual(
             ctl.get_active_nodes(),
             {
-                "rediscache": [
-                    {
-                        'bin': '0', 'smax': '0', 'scur': '0', 'stot': '0',
-                        'slim': '1000', 'qmax': '', 'dreq': '0', 'qcur': '',
-                        'bout': '500', 'svname': 'redis01'
+                "rediscache": {
+                    "redis01": {
+                        "status": "UP", "weight": "1",
+                        "addr": "10.0.0.1:6379",
+                    },
+                    "redis02": {
+                        "status": "MAINT", "weight": "1",
+                        "addr": "10.0.0.2:6379",
                     },
-                    {
-                        'bin': '0', 'smax': '0', 'scur': '0', 'stot': '0',
-                        'slim': '1000', 'qmax': '0', 'dreq': '1000', 'qcur':
-                        '0', 'bout': '0', 'svname': 'redis02'
+                },
+                "web": {
+                    "app03": {
+                        "status": "UP", "weight": "2",
+                        "addr": "10.0.1.3:8000",
                     },
-                ],
-                "web": [
-                    {
-                        "svname": "app03",
-                        'bin': '0', 'smax': '0', 'scur': '0', 'stot': '0',
-                        'slim': '1000', 'qmax': '0', 'dreq': '0', 'qcur': '0',
-                        'bout': '0'
+                },
+            }
+        )
+
+    def test_get_active_nodes__given_columns(self):
+        self.stub_commands = {
+            "show stat -1 4 -1":
+            """# pxname,svname,qcur,qmax,scur,status,weight,
+rediscache,redis01,,,0,UP,1,
+web,app03,0,0,0,UP,2,"""
+        }
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(
+            ctl.get_active_nodes(columns=("qcur", "scur")),
+            {
+                "rediscache": {"redis01": {"qcur": "", "scur": "0"}},
+                "web": {"app03": {"qcur": "0", "scur": "0"}},
+            }
+        )
+        self.assertEqual(
+            ctl.get_active_nodes(columns=()),
+            {"rediscache": {"redis01": {}}, "web": {"app03": {}}},
+        )
+
+    def test_get_active_nodes__quoted_values(self):
+        self.stub_commands = {
+            "show stat -1 4 -1":
+            """# pxname,svname,status,check_desc,weight,
+web,app03,DOWN,"Layer7 wrong status, 503",1,"""
+        }
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(
+            ctl.get_active_nodes(columns=("check_desc", "weight")),
+            {
+                "web": {
+                    "app03": {
+                        "check_desc": "Layer7 wrong status, 503",
+                        "weight": "1",
                     },
-                ]
+                },
             }
         )
 
@@ -168,7 +342,21 @@ web,app03,0,0,0,0,1000,0,0,0,0"""
 
         self.assertEqual(
             ctl.get_active_nodes(),
-            []
+            {}
+        )
+
+    def test_get_active_nodes__unknown_output(self):
+        self.stub_commands = {
+            "show stat -1 4 -1": "Unknown command."
+        }
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(
+            ctl.get_active_nodes(),
+            {}
         )
 
     def test_get_info(self):
@@ -208,15 +396,15 @@ Pid: 12334"""
 
         self.assertEqual(ctl.get_info(), {})
 
-    @patch.object(HAProxyControl, "get_version")
+    @patch.object(HAProxyControl, "version", new_callable=PropertyMock)
     @patch("lighthouse.haproxy.control.Peer")
     @patch("lighthouse.haproxy.control.os")
     @patch("lighthouse.haproxy.control.subprocess")
     @patch(builtin_module + ".open", mock_open(read_data="12355"))
     def test_restart_with_peer(
-            self, mock_subprocess, mock_os, Peer, get_version
+            self, mock_subprocess, mock_os, Peer, version
     ):
-        get_version.return_value = (1, 5, 11)
+        version.return_value = (1, 5, 11)
         mock_os.path.exists.return_value = True
 
         peer = Mock(host="app08", port=8888)
@@ -234,15 +422,15 @@ Pid: 12334"""
             "-L", "app08", "-sf", "12355"
         ])
 
-    @patch.object(HAProxyControl, "get_version")
+    @patch.object(HAProxyControl, "version", new_callable=PropertyMock)
     @patch("lighthouse.haproxy.control.Peer")
     @patch("lighthouse.haproxy.control.os")
     @patch("lighthouse.haproxy.control.subprocess")
     @patch(builtin_module + ".open", mock_open(read_data="12355"))
     def test_restart_without_peer(
-            self, mock_subprocess, mock_os, Peer, get_version
+            self, mock_subprocess, mock_os, Peer, version
     ):
-        get_version.return_value = (1, 4, 9)
+        version.return_value = (1, 4, 9)
         mock_os.path.exists.return_value = True
 
         ctl = HAProxyControl(
@@ -256,14 +444,14 @@ Pid: 12334"""
             "-sf", "12355"
         ])
 
-    @patch.object(HAProxyControl, "get_version")
+    @patch.object(HAProxyControl, "version", new_callable=PropertyMock)
     @patch("lighthouse.haproxy.control.Peer")
     @patch("lighthouse.haproxy.control.os")
     @patch("lighthouse.haproxy.control.subprocess")
     def test_restart_without_peer_or_pid_file(
-            self, mock_subprocess, mock_os, Peer, get_version
+            self, mock_subprocess, mock_os, Peer, version
     ):
-        get_version.return_value = (1, 4, 9)
+        version.return_value = (1, 4, 9)
         mock_os.path.exists.return_value = False
 
         ctl = HAProxyControl(
@@ -276,6 +464,7 @@ Pid: 12334"""
             "haproxy", "-f", "/etc/haproxy.cfg",  "-p", "/var/run/haproxy.pid",
         ])
 
+    @patch.object(HAProxyControl, "version", PropertyMock(return_value=None))
     @patch("lighthouse.haproxy.control.Peer")
     @patch("lighthouse.haproxy.control.os")
     @patch("lighthouse.haproxy.control.subprocess")
@@ -303,7 +492,9 @@ Pid: 12334"""
         ])
 
     @patch.object(HAProxyControl, "get_info")
-    @patch.object(HAProxyControl, "get_version", Mock(return_value=(1, 4, 12)))
+    @patch.object(
+        HAProxyControl, "version", PropertyMock(return_value=(1, 4, 12))
+    )
     @patch("lighthouse.haproxy.control.subprocess")
     def test_restart__get_info_error(self, mock_subprocess, mock_get_info):
         mock_get_info.side_effect = Exception("oh no!")
@@ -338,6 +529,21 @@ Pid: 12334"""
         mock_sock.sendall.assert_called_once_with(b"show foobar\n")
         mock_sock.close.assert_called_once_with()
 
+    @patch("lighthouse.haproxy.control.metrics")
+    @patch("lighthouse.haproxy.control.socket")
+    def test_send_command_is_timed(self, mock_socket, metrics):
+        self.command_patcher.stop()
+
+        mock_socket.socket.return_value.recv.side_effect = [b"1.9.0\n", b""]
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock", "/var/run/haproxy.pid"
+        )
+
+        self.assertEqual(ctl.send_command("show version"), "1.9.0")
+
+        metrics.socket_command_duration.time.assert_called_once_with()
+
     @patch("lighthouse.haproxy.control.socket")
     def test_send_command_error_connection_refused(self, mock_socket):
         mock_socket.error = socket.error
@@ -514,3 +720,223 @@ Pid: 12334"""
             UnknownServerError,
             ctl.send_command, "disable server foobar/bazz"
         )
+
+    @patch("lighthouse.haproxy.control.socket")
+    def test_send_command_sets_timeout(self, mock_socket):
+        self.command_patcher.stop()
+
+        mock_sock = mock_socket.socket.return_value
+        mock_sock.recv.return_value = b""
+
+        ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock",
+            "/var/run/haproxy.pid", command_timeout=3
+        )
+
+        ctl.send_command("show foobar")
+
+        mock_sock.settimeout.assert_called_once_with(3)
+
+
+class InteractiveHAProxyControlTests(unittest.TestCase):
+
+    def setUp(self):
+        socket_patcher = patch("lighthouse.haproxy.control.socket")
+        mock_socket = socket_patcher.start()
+        self.addCleanup(socket_patcher.stop)
+
+        mock_socket.error = socket.error
+
+        self.socks = []
+        self.responses = []
+
+        def create_socket(family, type):
+            sock = Mock()
+
+            def recv(bufsize):
+                if not self.responses:
+                    return b""
+                chunk = self.responses.pop(0)
+                if isinstance(chunk, Exception):
+                    raise chunk
+                return chunk
+
+            sock.recv.side_effect = recv
+            self.socks.append(sock)
+            return sock
+
+        mock_socket.socket.side_effect = create_socket
+
+        self.ctl = HAProxyControl(
+            "/etc/haproxy.cfg", "/var/run/haproxy.sock",
+            "/var/run/haproxy.pid", interactive=True
+        )
+
+    def test_session_opened_in_prompt_mode_and_reused(self):
+        self.responses = [
+            b"\n> ",
+            b"Name: HAProxy\n", b"\n> ",
+            b"\n> ",
+        ]
+
+        self.assertEqual(self.ctl.send_command("show info"), "Name: HAProxy")
+        self.assertEqual(self.ctl.send_command("enable server a/b"), "")
+
+        self.assertEqual(len(self.socks), 1)
+        self.assertEqual(
+            [args[0] for args, _ in self.socks[0].sendall.call_args_list],
+            [b"prompt\n", b"show info\n", b"enable server a/b\n"]
+        )
+        self.assertEqual(self.socks[0].close.called, False)
+
+    @patch("lighthouse.haproxy.control.metrics")
+    def test_commands_are_timed_per_round_trip(self, metrics):
+        self.responses = [
+            b"\n> ",
+            b"Name: HAProxy\n", b"\n> ",
+            b"\n> \n> ",
+        ]
+
+        self.ctl.send_command("show info")
+        self.ctl.send_commands(["enable server a/b", "enable server a/c"])
+
+        self.assertEqual(metrics.socket_command_duration.time.call_count, 2)
+
+    def test_batched_commands_split_by_prompt(self):
+        self.responses = [
+            b"\n> ",
+            b"\n> No such server.\n",
+            b"\n> \n> ",
+        ]
+
+        result = self.ctl.send_commands([
+            "enable server a/b", "enable server a/c", "disable server a/d"
+        ])
+
+        self.assertEqual(result, ["No such server."])
+        self.socks[0].sendall.assert_called_with(
+            b"enable server a/b;enable server a/c;disable server a/d\n"
+        )
+
+    def test_reconnects_if_session_closed(self):
+        self.responses = [
+            b"\n> ",
+            b"\n> ",
+            b"",
+            b"\n> ",
+            b"OK\n\n> ",
+        ]
+
+        self.ctl.send_command("enable server a/b")
+        result = self.ctl.send_command("enable server a/c")
+
+        self.assertEqual(result, "OK")
+        self.assertEqual(len(self.socks), 2)
+        self.socks[0].close.assert_called_once_with()
+        self.socks[1].sendall.assert_called_with(b"enable server a/c\n")
+
+    def test_reconnects_on_broken_pipe(self):
+        self.responses = [b"\n> ", b"\n> "]
+
+        self.ctl.send_command("enable server a/b")
+
+        self.socks[0].sendall.side_effect = socket.error(errno.EPIPE, "")
+        self.responses = [b"\n> ", b"\n> "]
+
+        self.assertEqual(self.ctl.send_command("enable server a/c"), "")
+        self.assertEqual(len(self.socks), 2)
+
+    def test_other_errors_close_session_and_raise(self):
+        self.responses = [b"\n> ", socket.error(errno.ETIMEDOUT, "")]
+
+        self.assertRaises(
+            socket.error,
+            self.ctl.send_command, "show info"
+        )
+
+        self.socks[0].close.assert_called_once_with()
+        self.assertEqual(self.ctl.session, None)
+
+    def test_connection_refused(self):
+        self.ctl.connect = Mock(return_value=None)
+
+        self.assertEqual(self.ctl.send_command("show info"), None)
+        self.assertEqual(self.ctl.send_commands(["enable server a/b"]), [])
+
+    def test_error_responses_raise(self):
+        self.responses = [b"\n> ", b"Permission denied.\n\n> "]
+
+        self.assertRaises(
+            PermissionError,
+            self.ctl.send_command, "enable server a/b"
+        )
+
+    @patch.object(HAProxyControl, "version", PropertyMock(return_value=None))
+    @patch("lighthouse.haproxy.control.subprocess")
+    def test_restart_closes_session(self, mock_subprocess):
+        mock_subprocess.check_output.return_value = ""
+        self.responses = [b"\n> ", b"\n> "]
+
+        self.ctl.send_command("enable server a/b")
+        self.ctl.restart()
+
+        self.socks[0].close.assert_called_once_with()
+        self.assertEqual(self.ctl.session, None)
+
+
+class BatchCommandsTests(unittest.TestCase):
+
+    def test_small_batch(self):
+        self.assertEqual(
+            list(batch_commands(["show info", "show stat"])),
+            [["show info", "show stat"]]
+        )
+
+    @patch("lighthouse.haproxy.control.MAX_COMMAND_LINE_LENGTH", 20)
+    def test_batches_limited_in_length(self):
+        self.assertEqual(
+            list(batch_commands([
+                "enable server a/b", "enable server a/c", "x" * 30, "y"
+            ])),
+            [["enable server a/b"], ["enable server a/c"], ["x" * 30], ["y"]]
+        )
+
+    def test_no_commands(self):
+        self.assertEqual(list(batch_commands([])), [])
+
+
+class BinaryKeyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bin_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.bin_dir)
+
+        environ_patcher = patch.dict(
+            "os.environ",
+            {"PATH": os.pathsep.join(["/nonexistent", self.bin_dir])}
+        )
+        environ_patcher.start()
+        self.addCleanup(environ_patcher.stop)
+
+    def test_missing_binary(self):
+        self.assertEqual(get_binary_key("haproxy"), None)
+
+    def test_non_executable_file(self):
+        open(os.path.join(self.bin_dir, "haproxy"), "w").close()
+
+        self.assertEqual(get_binary_key("haproxy"), None)
+
+    def test_key_changes_when_binary_replaced(self):
+        path = os.path.join(self.bin_dir, "haproxy")
+        open(path, "w").close()
+        os.chmod(path, 0o755)
+        os.utime(path, (1000, 1000))
+
+        key = get_binary_key("haproxy")
+
+        self.assertEqual(key[0], path)
+        self.assertEqual(key[2], 1000)
+
+        os.utime(path, (2000, 2000))
+
+        self.assertNotEqual(get_binary_key("haproxy"), key)
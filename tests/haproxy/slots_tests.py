@@ -0,0 +1,105 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from lighthouse.haproxy.slots import SlotPool
+from lighthouse.node import Node
+from lighthouse.peer import Peer
+
+
+def make_node(host, ip, port=8000):
+    return Node(host, ip, port, peer=Peer(host, ip))
+
+
+class SlotPoolTests(unittest.TestCase):
+
+    def test_slot_name(self):
+        self.assertEqual(SlotPool.slot_name(3), "slot3")
+
+    def test_for_nodes_leaves_spare_slots(self):
+        app1 = make_node("app01", "10.0.0.1")
+        app2 = make_node("app02", "10.0.0.2")
+
+        pool = SlotPool.for_nodes([app2, app1], 3)
+
+        self.assertEqual(pool.size, 5)
+        self.assertEqual(pool.nodes, {1: app1, 2: app2})
+        self.assertEqual(pool.free_ranges(), [(3, 5)])
+
+    def test_update_fills_free_slots_and_frees_removed(self):
+        app1 = make_node("app01", "10.0.0.1")
+        app2 = make_node("app02", "10.0.0.2")
+        app3 = make_node("app03", "10.0.0.3")
+
+        pool = SlotPool.for_nodes([app1, app2], 2)
+
+        added, removed = pool.update([app2, app3])
+
+        self.assertEqual(added, [(3, app3)])
+        self.assertEqual(removed, [1])
+        self.assertEqual(pool.nodes, {2: app2, 3: app3})
+
+    def test_freed_slots_reused_if_none_other_free(self):
+        app1 = make_node("app01", "10.0.0.1")
+        app2 = make_node("app02", "10.0.0.2")
+        app3 = make_node("app03", "10.0.0.3")
+
+        pool = SlotPool.for_nodes([app1], 1)
+
+        added, removed = pool.update([app2, app3])
+
+        self.assertEqual(added, [(2, app2), (1, app3)])
+        self.assertEqual(removed, [1])
+
+    def test_update_no_changes(self):
+        app1 = make_node("app01", "10.0.0.1")
+
+        pool = SlotPool.for_nodes([app1], 2)
+
+        self.assertEqual(
+            pool.update([make_node("app01", "10.0.0.1")]), ([], [])
+        )
+
+    def test_changed_ip_is_new_node(self):
+        app1 = make_node("app01", "10.0.0.1")
+        moved_app1 = make_node("app01", "10.0.0.9")
+
+        pool = SlotPool.for_nodes([app1], 1)
+
+        added, removed = pool.update([moved_app1])
+
+        self.assertEqual(added, [(2, moved_app1)])
+        self.assertEqual(removed, [1])
+
+    def test_update_exhausted_pool_left_untouched(self):
+        app1 = make_node("app01", "10.0.0.1")
+        app2 = make_node("app02", "10.0.0.2")
+        app3 = make_node("app03", "10.0.0.3")
+
+        pool = SlotPool.for_nodes([app1], 1)
+
+        self.assertEqual(pool.update([app1, app2, app3]), None)
+        self.assertEqual(pool.nodes, {1: app1})
+
+    def test_free_ranges(self):
+        pool = SlotPool(7)
+        pool.nodes = {
+            2: make_node("app02", "10.0.0.2"),
+            5: make_node("app05", "10.0.0.5"),
+        }
+
+        self.assertEqual(pool.free_ranges(), [(1, 1), (3, 4), (6, 7)])
+
+    def test_fingerprint_changes_with_assignments(self):
+        app1 = make_node("app01", "10.0.0.1")
+        app2 = make_node("app02", "10.0.0.2")
+
+        pool = SlotPool.for_nodes([app1], 2)
+        fingerprint = pool.fingerprint()
+
+        pool.update([app1])
+        self.assertEqual(pool.fingerprint(), fingerprint)
+
+        pool.update([app1, app2])
+        self.assertNotEqual(pool.fingerprint(), fingerprint)
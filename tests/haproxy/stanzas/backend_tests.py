@@ -3,8 +3,9 @@ try:
 except ImportError:
     import unittest
 
-from mock import Mock
+from mock import Mock, patch
 
+from lighthouse.haproxy.slots import SlotPool
 from lighthouse.haproxy.stanzas.backend import BackendStanza
 
 
@@ -97,3 +98,61 @@ class BackendStanzaTests(unittest.TestCase):
 \tmode tcp
 \tserver server1.int:8000 10.0.1.12:8000  """
         )
+
+    def test_slot_pool(self):
+        node1 = Mock(host="server1.int", ip="10.0.1.12", port=8000)
+        node1.name = "server1.int:8000"
+        node2 = Mock(host="server2.int", ip="10.0.1.13", port=8000)
+        node2.name = "server2.int:8000"
+
+        cluster = Mock()
+        cluster.name = "accounts"
+        cluster.nodes = [node1, node2]
+        cluster.haproxy = {
+            "backend": [
+                "mode tcp"
+            ],
+            "server_options": "check"
+        }
+
+        slot_pool = SlotPool(6)
+        slot_pool.nodes = {1: node1, 3: node2}
+
+        stanza = BackendStanza(cluster, slot_pool=slot_pool)
+
+        self.assertEqual(
+            str(stanza),
+            """backend accounts
+\tmode tcp
+\tserver slot1 10.0.1.12:8000 check
+\tserver slot3 10.0.1.13:8000 check
+\tserver-template slot 2-2 127.0.0.1:1 disabled check
+\tserver-template slot 4-6 127.0.0.1:1 disabled check"""
+        )
+
+    @patch("lighthouse.haproxy.stanzas.backend.logger")
+    def test_slot_pool_http_mode_warns_without_dynamic_cookies(self, logger):
+        node = Mock(host="server1.int", ip="10.0.1.12", port=8000)
+        node.name = "server1.int:8000"
+
+        cluster = Mock()
+        cluster.name = "accounts"
+        cluster.nodes = [node]
+        cluster.haproxy = {"backend": ["mode http"]}
+
+        slot_pool = SlotPool(2)
+        slot_pool.nodes = {1: node}
+
+        stanza = BackendStanza(cluster, slot_pool=slot_pool)
+
+        self.assertTrue(logger.warning.called)
+        self.assertNotIn("cookie", str(stanza))
+
+        logger.reset_mock()
+        cluster.haproxy = {
+            "backend": ["mode http", "cookie SRV insert dynamic"]
+        }
+
+        BackendStanza(cluster, slot_pool=slot_pool)
+
+        self.assertFalse(logger.warning.called)
@@ -0,0 +1,108 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import socket
+
+from mock import patch
+
+from lighthouse.identity import Identity
+
+
+@patch("lighthouse.identity.time")
+@patch("lighthouse.identity.socket")
+class IdentityTests(unittest.TestCase):
+
+    def setUp(self):
+        super(IdentityTests, self).setUp()
+
+        self.identity = Identity(ttl=60)
+
+    def test_looks_up_name_and_ip(self, mock_socket, mock_time):
+        mock_socket.getfqdn.return_value = "app01.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+        mock_time.time.return_value = 1000
+
+        self.assertEqual(self.identity.get(), ("app01.int.local", "10.0.1.8"))
+
+        mock_socket.gethostbyname.assert_called_once_with("app01.int.local")
+
+    def test_cached_until_ttl_is_up(self, mock_socket, mock_time):
+        mock_socket.getfqdn.return_value = "app01.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+
+        mock_time.time.return_value = 1000
+        self.identity.get()
+        mock_time.time.return_value = 1059
+        self.identity.get()
+
+        self.assertEqual(mock_socket.getfqdn.call_count, 1)
+
+        mock_socket.gethostbyname.return_value = "10.0.1.9"
+        mock_time.time.return_value = 1060
+
+        self.assertEqual(self.identity.get(), ("app01.int.local", "10.0.1.9"))
+        self.assertEqual(mock_socket.getfqdn.call_count, 2)
+
+    def test_refresh(self, mock_socket, mock_time):
+        mock_time.time.return_value = 1000
+
+        self.identity.get()
+        self.identity.refresh()
+        self.identity.get()
+
+        self.assertEqual(mock_socket.getfqdn.call_count, 2)
+
+    def test_overrides(self, mock_socket, mock_time):
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+        mock_time.time.return_value = 1000
+
+        self.identity.configure(name="app01.example.com")
+
+        self.assertEqual(
+            self.identity.get(), ("app01.example.com", "10.0.1.8")
+        )
+        self.assertFalse(mock_socket.getfqdn.called)
+
+        self.identity.configure(name="app01.example.com", ip="192.168.0.2")
+
+        self.assertEqual(
+            self.identity.get(), ("app01.example.com", "192.168.0.2")
+        )
+        self.assertEqual(mock_socket.gethostbyname.call_count, 1)
+
+    def test_configure_ttl(self, mock_socket, mock_time):
+        mock_time.time.return_value = 1000
+
+        self.identity.configure(ttl=0)
+        self.identity.get()
+        self.identity.get()
+
+        self.assertEqual(mock_socket.getfqdn.call_count, 2)
+
+    def test_failed_lookup_keeps_stale_values(self, mock_socket, mock_time):
+        mock_socket.error = socket.error
+        mock_socket.getfqdn.return_value = "app01.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+        mock_time.time.return_value = 1000
+        self.identity.get()
+
+        mock_socket.gethostbyname.side_effect = socket.gaierror("timed out")
+        mock_time.time.return_value = 2000
+
+        self.assertEqual(self.identity.get(), ("app01.int.local", "10.0.1.8"))
+        self.assertEqual(self.identity.get(), ("app01.int.local", "10.0.1.8"))
+        self.assertEqual(mock_socket.gethostbyname.call_count, 2)
+
+        mock_time.time.return_value = 2010
+        self.identity.get()
+
+        self.assertEqual(mock_socket.gethostbyname.call_count, 3)
+
+    def test_failed_first_lookup_raises(self, mock_socket, mock_time):
+        mock_socket.error = socket.error
+        mock_socket.gethostbyname.side_effect = socket.gaierror("timed out")
+        mock_time.time.return_value = 1000
+
+        self.assertRaises(socket.gaierror, self.identity.get)
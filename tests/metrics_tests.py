@@ -0,0 +1,192 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch, Mock
+from six.moves import urllib
+
+from lighthouse import metrics
+
+
+class RegistryTests(unittest.TestCase):
+
+    def test_registering_same_name_replaces_metric(self):
+        registry = metrics.Registry()
+
+        metrics.Counter("foo_total", "Old.", registry=registry)
+        new = metrics.Counter("foo_total", "New.", registry=registry)
+
+        self.assertEqual(registry.metrics, {"foo_total": new})
+
+    def test_render_includes_help_and_type_sorted_by_name(self):
+        registry = metrics.Registry()
+
+        metrics.Counter("b_total", "The b count.", registry=registry)
+        metrics.Counter("a_total", "The a count.", registry=registry)
+
+        self.assertEqual(
+            registry.render(),
+            "# HELP a_total The a count.\n"
+            "# TYPE a_total counter\n"
+            "# HELP b_total The b count.\n"
+            "# TYPE b_total counter\n"
+        )
+
+
+class CounterTests(unittest.TestCase):
+
+    def test_inc_per_label_set(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter("foo_total", "Foos.", registry=registry)
+
+        counter.inc(result="pass")
+        counter.inc(result="pass")
+        counter.inc(3, result="fail")
+
+        self.assertEqual(
+            registry.render().splitlines()[2:],
+            [
+                'foo_total{result="fail"} 3',
+                'foo_total{result="pass"} 2',
+            ]
+        )
+
+    def test_label_values_are_escaped(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter("foo_total", "Foos.", registry=registry)
+
+        counter.inc(name='a "b"\\\nc')
+
+        self.assertEqual(
+            registry.render().splitlines()[2],
+            'foo_total{name="a \\"b\\"\\\\\\nc"} 1',
+        )
+
+    def test_labels_in_sorted_order(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter("foo_total", "Foos.", registry=registry)
+
+        counter.inc(service="app", check="http")
+
+        self.assertEqual(
+            registry.render().splitlines()[2],
+            'foo_total{check="http",service="app"} 1',
+        )
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_cumulative_buckets_sum_and_count(self):
+        registry = metrics.Registry()
+        histogram = metrics.Histogram(
+            "foo_seconds", "Foo time.", buckets=(1, .5), registry=registry
+        )
+
+        histogram.observe(.25)
+        histogram.observe(.5)
+        histogram.observe(2)
+
+        self.assertEqual(
+            registry.render().splitlines()[2:],
+            [
+                'foo_seconds_bucket{le="0.5"} 2',
+                'foo_seconds_bucket{le="1"} 2',
+                'foo_seconds_bucket{le="+Inf"} 3',
+                'foo_seconds_sum 2.75',
+                'foo_seconds_count 3',
+            ]
+        )
+
+    @patch("lighthouse.metrics.time")
+    def test_time_observes_duration_with_labels(self, mock_time):
+        registry = metrics.Registry()
+        histogram = metrics.Histogram(
+            "foo_seconds", "Foo time.", buckets=(1,), registry=registry
+        )
+        mock_time.time.side_effect = [10, 12]
+
+        with histogram.time(service="app"):
+            pass
+
+        self.assertEqual(
+            registry.render().splitlines()[2:],
+            [
+                'foo_seconds_bucket{service="app",le="1"} 0',
+                'foo_seconds_bucket{service="app",le="+Inf"} 1',
+                'foo_seconds_sum{service="app"} 2',
+                'foo_seconds_count{service="app"} 1',
+            ]
+        )
+
+    @patch("lighthouse.metrics.time")
+    def test_time_observes_even_on_error(self, mock_time):
+        registry = metrics.Registry()
+        histogram = metrics.Histogram(
+            "foo_seconds", "Foo time.", registry=registry
+        )
+        mock_time.time.side_effect = [10, 11]
+
+        with self.assertRaises(ValueError):
+            with histogram.time():
+                raise ValueError()
+
+        self.assertIn("foo_seconds_count 1", registry.render())
+
+
+class GaugeTests(unittest.TestCase):
+
+    def test_value_read_from_function(self):
+        registry = metrics.Registry()
+        metrics.Gauge("depth", "Depth.", lambda: 3, registry=registry)
+
+        self.assertEqual(registry.render().splitlines()[2], "depth 3")
+
+    @patch("lighthouse.metrics.logger")
+    def test_failing_function_skips_sample(self, logger):
+        registry = metrics.Registry()
+        metrics.Gauge(
+            "depth", "Depth.", Mock(side_effect=Exception("oh no")),
+            registry=registry
+        )
+
+        self.assertEqual(len(registry.render().splitlines()), 2)
+        self.assertTrue(logger.debug.called)
+
+
+class MetricsServerTests(unittest.TestCase):
+
+    def setUp(self):
+        super(MetricsServerTests, self).setUp()
+
+        self.registry = metrics.Registry()
+        metrics.Counter(
+            "foo_total", "Foos.", registry=self.registry
+        ).inc()
+
+        self.server = metrics.MetricsServer(0, registry=self.registry)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def test_serves_metrics(self):
+        response = urllib.request.urlopen(
+            "http://127.0.0.1:%d/metrics" % self.server.port
+        )
+
+        self.assertEqual(
+            response.info()["Content-Type"], metrics.CONTENT_TYPE
+        )
+        self.assertEqual(
+            response.read().decode("utf-8"), self.registry.render()
+        )
+
+    def test_other_paths_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(
+                "http://127.0.0.1:%d/foo" % self.server.port
+            )
+
+        self.assertEqual(context.exception.code, 404)
+
+    def test_stop_without_start_is_harmless(self):
+        metrics.MetricsServer(0).stop()
@@ -4,9 +4,12 @@ try:
 except ImportError:
     import unittest
 
-from mock import patch
+from mock import patch, Mock
 
-from lighthouse.node import Node
+from lighthouse import node as node_module
+from lighthouse.node import (
+    Node, parse_metadata, COMPACT_FORMAT, LEGACY_FORMAT
+)
 from lighthouse.peer import Peer
 
 
@@ -29,6 +32,18 @@ class NodeTests(unittest.TestCase):
 
         current_peer.assert_called_once_with()
 
+    @patch.object(Peer, "current")
+    @patch("lighthouse.node.identity")
+    def test_current_uses_local_identity(self, identity, current_peer):
+        identity.local.get.return_value = ("app01.local", "10.0.1.4")
+
+        node = Node.current(Mock(metadata={"role": "web"}), 8000)
+
+        self.assertEqual(node.host, "app01.local")
+        self.assertEqual(node.ip, "10.0.1.4")
+        self.assertEqual(node.port, 8000)
+        self.assertEqual(node.metadata, {"role": "web"})
+
     def test_name_property(self):
         node = Node("somehost", "10.0.1.13", 1234)
 
@@ -103,16 +118,14 @@ class NodeTests(unittest.TestCase):
         self.assertEqual(result.peer.name, "host04")
         self.assertEqual(result.peer.ip, "10.10.10.10")
 
-    @patch("lighthouse.node.socket")
-    def test_deserialize_no_host_uses_fqdn(self, mock_socket):
-        mock_socket.gethostbyaddr.return_value = (
-            "app03", "app03.int", "10.0.1.12"
-        )
+    @patch("socket.gethostbyaddr")
+    @patch.object(Peer, "current", Mock())
+    def test_deserialize_no_host_uses_ip(self, gethostbyaddr):
         result = Node.deserialize('{"ip": "10.0.1.12", "port": 8888}')
 
-        self.assertEqual(result.host, mock_socket.get_fqdn.return_value)
-        mock_socket.get_fqdn.assert_called_once_with("app03")
-        mock_socket.gethostbyaddr.assert_called_once_with("10.0.1.12")
+        self.assertEqual(result.host, "10.0.1.12")
+        self.assertEqual(result.name, "10.0.1.12:8888")
+        self.assertFalse(gethostbyaddr.called)
 
     def test_deserialize_no_ip_raises_valueerror(self):
         self.assertRaises(
@@ -160,3 +173,151 @@ class NodeTests(unittest.TestCase):
         node2 = Node("localhost", "10.0.1.13", 1234, peer=peer2)
 
         self.assertTrue(node1 == node2)
+
+    def test_set_of_nodes(self):
+        peer = Peer("service03", "10.10.0.8")
+        node1 = Node("localhost", "10.0.1.13", 1234, peer=peer)
+        node2 = Node("app02", "10.0.1.13", 1234, peer=peer)
+        node3 = Node("localhost", "10.0.1.13", 8888, peer=peer)
+
+        self.assertEqual(set([node1, node2, node3]), set([node1, node3]))
+
+    def test_not_equal_to_other_types(self):
+        node = Node("localhost", "10.0.1.13", 1234, peer=Mock())
+
+        self.assertFalse(node == "localhost:1234")
+        self.assertTrue(node != "localhost:1234")
+
+    def test_slotted(self):
+        node = Node("localhost", "10.0.1.13", 1234, peer=Mock())
+
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_deserialize_shares_peer_and_metadata(self):
+        payloads = [
+            json.dumps({
+                "host": "app01", "ip": "10.0.0.1", "port": port,
+                "peer": '{"ip": "10.0.0.1", "name": "app01", "port": 1024}',
+                "metadata": '{"role": "web"}',
+            })
+            for port in (8000, 8001)
+        ]
+
+        node1, node2 = [Node.deserialize(payload) for payload in payloads]
+
+        self.assertEqual(node1.metadata, {"role": "web"})
+        self.assertTrue(node1.peer is node2.peer)
+        self.assertTrue(node1.metadata is node2.metadata)
+
+    @patch.object(Peer, "current")
+    def test_deserialize_null_peer(self, current_peer):
+        result = Node.deserialize(
+            '{"host": "app03", "ip": "10.0.1.12", "port": 8888,' +
+            ' "peer": null}'
+        )
+
+        self.assertEqual(result.peer, current_peer.return_value)
+
+    @patch("lighthouse.node.MAX_SHARED_METADATA", 2)
+    @patch("lighthouse.node.shared_metadata", {})
+    def test_shared_metadata_is_bounded(self):
+        for index in range(5):
+            parse_metadata('{"index": %d}' % index)
+
+        self.assertEqual(parse_metadata('{"index": 4}'), {"index": 4})
+        self.assertTrue(len(node_module.shared_metadata) <= 2)
+        self.assertEqual(parse_metadata({"index": 5}), {"index": 5})
+
+    def test_serialize_compact(self):
+        node = Node(
+            "app01", "10.0.0.1", 8000,
+            peer=Peer("app01", "10.0.0.1"), metadata={"role": "web"}
+        )
+
+        self.assertEqual(
+            node.serialize(version=COMPACT_FORMAT),
+            '{"h":"app01","i":"10.0.0.1","m":{"role":"web"},"p":8000,"v":2}'
+        )
+
+    def test_serialize_compact_different_peer(self):
+        node = Node(
+            "app01", "10.0.0.1", 8000,
+            peer=Peer("proxy01", "10.0.0.9", port=2048)
+        )
+
+        self.assertEqual(
+            json.loads(node.serialize(version=COMPACT_FORMAT)),
+            {
+                "v": 2, "h": "app01", "i": "10.0.0.1", "p": 8000,
+                "pn": "proxy01", "pi": "10.0.0.9", "pp": 2048,
+            }
+        )
+
+    def test_serialize_unknown_version(self):
+        node = Node("app01", "10.0.0.1", 8000, peer=Mock())
+
+        self.assertRaises(ValueError, node.serialize, version=3)
+
+    def test_compact_round_trip(self):
+        for peer in (Peer("app01", "10.0.0.1"), Peer("proxy01", "10.0.0.9")):
+            node = Node(
+                "app01", "10.0.0.1", 8000,
+                peer=peer, metadata={"role": "web", "weight": 2}
+            )
+
+            result = Node.deserialize(node.serialize(version=COMPACT_FORMAT))
+
+            self.assertEqual(result.host, "app01")
+            self.assertEqual(result.ip, "10.0.0.1")
+            self.assertEqual(result.port, 8000)
+            self.assertEqual(result.peer.name, peer.name)
+            self.assertEqual(result.peer.ip, peer.ip)
+            self.assertEqual(result.peer.port, peer.port)
+            self.assertEqual(result.metadata, {"role": "web", "weight": 2})
+
+    def test_legacy_is_default(self):
+        node = Node(
+            "app01", "10.0.0.1", 8000,
+            peer=Peer("app01", "10.0.0.1"), metadata={"role": "web"}
+        )
+
+        self.assertEqual(
+            node.serialize(), node.serialize(version=LEGACY_FORMAT)
+        )
+        self.assertFalse("v" in json.loads(node.serialize()))
+
+        result = Node.deserialize(node.serialize())
+
+        self.assertEqual(result.name, "app01:8000")
+        self.assertEqual(result.metadata, {"role": "web"})
+
+    def test_deserialize_compact_shares_metadata(self):
+        node1 = Node.deserialize(
+            '{"h":"app01","i":"10.0.0.1","m":{"role":"web"},"p":8000,"v":2}'
+        )
+        node2 = Node.deserialize(
+            '{"h":"app02","i":"10.0.0.2","m":{"role":"web"},"p":8000,"v":2}'
+        )
+
+        self.assertTrue(node1.metadata is node2.metadata)
+        self.assertEqual(parse_metadata({"tags": ["a"]}), {"tags": ["a"]})
+
+    def test_deserialize_compact_no_host(self):
+        result = Node.deserialize('{"i":"10.0.1.12","p":8888,"v":2}')
+
+        self.assertEqual(result.host, "10.0.1.12")
+        self.assertEqual(result.peer.name, "10.0.1.12")
+
+    def test_deserialize_compact_requires_ip_and_port(self):
+        self.assertRaises(
+            ValueError, Node.deserialize, '{"h":"app01","p":8000,"v":2}'
+        )
+        self.assertRaises(
+            ValueError, Node.deserialize, '{"h":"app01","i":"10.0.0.1","v":2}'
+        )
+
+    def test_deserialize_unknown_version(self):
+        self.assertRaises(
+            ValueError,
+            Node.deserialize, '{"h":"app01","i":"10.0.0.1","p":8000,"v":9}'
+        )
@@ -17,20 +17,17 @@ class PeerTests(unittest.TestCase):
 
         self.assertEqual(peer.port, 1024)
 
-    @patch("lighthouse.peer.socket")
-    def test_current_uses_local_machine_values(self, mock_socket):
-        mock_socket.getfqdn.return_value = "my-host.example.co.biz"
-        mock_socket.gethostbyname.return_value = "10.10.10.1"
+    @patch("lighthouse.peer.identity")
+    def test_current_uses_local_identity(self, identity):
+        identity.local.get.return_value = (
+            "my-host.example.co.biz", "10.10.10.1"
+        )
 
         peer = Peer.current()
 
         self.assertEqual(peer.name, "my-host.example.co.biz")
         self.assertEqual(peer.ip, "10.10.10.1")
 
-        mock_socket.gethostbyname.assert_called_once_with(
-            "my-host.example.co.biz"
-        )
-
     def test_serialize(self):
         peer = Peer("cluster03", "196.0.0.8", port=3333)
 
@@ -106,3 +103,40 @@ class PeerTests(unittest.TestCase):
             set([peer1, peer2, peer3]),
             set([peer1, peer3]),
         )
+
+    def test_not_equal_to_other_types(self):
+        peer = Peer("app01", "10.0.3.10", port=8888)
+
+        self.assertFalse(peer == "10.0.3.10:8888")
+        self.assertTrue(peer != "10.0.3.10:8888")
+
+    def test_slotted(self):
+        peer = Peer("app01", "10.0.3.10", port=8888)
+
+        self.assertFalse(hasattr(peer, "__dict__"))
+
+    def test_intern(self):
+        peer1 = Peer.intern("app01", "10.0.3.10", 8888)
+        peer2 = Peer.intern("app01", "10.0.3.10", 8888)
+
+        self.assertTrue(peer1 is peer2)
+
+        peer3 = Peer.intern("app01.local", "10.0.3.10", 8888)
+
+        self.assertFalse(peer3 is peer1)
+        self.assertEqual(peer3.name, "app01.local")
+        self.assertTrue(Peer.intern("app01.local", "10.0.3.10", 8888) is peer3)
+
+    def test_deserialize_interns(self):
+        value = json.dumps({"name": "app01", "ip": "10.0.3.11", "port": 8888})
+
+        peer = Peer.deserialize(value)
+
+        self.assertTrue(Peer.deserialize(value) is peer)
+        self.assertTrue(Peer.intern("app01", "10.0.3.11", 8888) is peer)
+
+    @patch("lighthouse.peer.identity")
+    def test_current_is_interned(self, identity):
+        identity.local.get.return_value = ("my-host.local", "10.10.10.2")
+
+        self.assertTrue(Peer.current() is Peer.current())
@@ -15,5 +15,5 @@ class RedisCheckTests(unittest.TestCase):
             "rise": 1, "fall": 1
         })
 
-        self.assertEqual(check.query, "PING")
-        self.assertEqual(check.expected_response, "PONG")
+        self.assertEqual(check.query, b"PING\r\n")
+        self.assertEqual(check.expected_response, b"+PONG")
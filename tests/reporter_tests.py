@@ -1,10 +1,18 @@
-from mock import Mock, patch
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import sys
+import threading
+
+from mock import Mock, patch, call
 
 from tests import cases
 
 from lighthouse.service import Service
 from lighthouse.discovery import Discovery
-from lighthouse.reporter import Reporter
+from lighthouse.reporter import Reporter, PortChangeBatch, ASYNCIO_ENGINE
 
 
 class ReporterTests(cases.WatcherTestCase):
@@ -25,6 +33,163 @@ class ReporterTests(cases.WatcherTestCase):
         discovery1.stop.assert_called_once_with()
         discovery2.stop.assert_called_once_with()
 
+    def test_unknown_check_engine(self):
+        self.assertRaises(ValueError, Reporter, "/etc/configs", "gevent")
+
+    @unittest.skipIf(
+        sys.version_info < (3, 5), "The asyncio check engine needs python 3.5+"
+    )
+    @patch("lighthouse.engine.AsyncCheckEngine")
+    def test_asyncio_check_engine(self, AsyncCheckEngine):
+        engine = AsyncCheckEngine.return_value
+
+        reporter = Reporter("/etc/configs", check_engine=ASYNCIO_ENGINE)
+
+        AsyncCheckEngine.assert_called_once_with(
+            reporter.prepare_checks, reporter.submit_report
+        )
+        engine.start.assert_called_once_with()
+
+        service = Mock()
+        service.name = "app"
+
+        reporter.add_configurable(Service, "app", service)
+
+        engine.add_service.assert_called_once_with(service)
+
+        reporter.remove_configurable(Service, "app")
+
+        engine.remove_service.assert_called_once_with("app")
+
+        reporter.wind_down()
+
+        engine.stop.assert_called_once_with()
+
+    def test_submit_report_reports_to_discovery(self):
+        discovery = Mock()
+
+        service = Mock()
+        service.name = "app"
+        service.discovery = "disco"
+
+        reporter = Reporter("/etc/configs")
+        reporter.configurables[Discovery] = {"disco": discovery}
+
+        reporter.submit_report(service, set([8000]), set([9000]))
+
+        discovery.report_batch.assert_called_once_with(service, [8000], [9000])
+
+    @patch("lighthouse.reporter.logger")
+    def test_submit_report_logs_errors(self, logger):
+        discovery = Mock()
+        discovery.report_batch.side_effect = Exception("oh no")
+
+        service = Mock()
+        service.name = "app"
+        service.discovery = "disco"
+
+        reporter = Reporter("/etc/configs")
+        reporter.configurables[Discovery] = {"disco": discovery}
+
+        reporter.submit_report(service, set([8000]), set())
+
+        self.assertTrue(logger.exception.called)
+
+    def test_run_checks_reports_changes_in_one_batch(self):
+        discovery = Mock()
+
+        service = Mock()
+        service.name = "app"
+        service.discovery = "disco"
+        service.check_interval = 3
+
+        reporter = Reporter("/etc/configs")
+        reporter.configurables[Discovery] = {"disco": discovery}
+
+        def run_checks(executor, timeout, callback):
+            callback(set([8000]), set())
+            callback(set([8001]), set())
+            return set(), set([9000])
+
+        service.run_checks.side_effect = run_checks
+
+        reporter.run_checks(service)
+
+        discovery.report_batch.assert_called_once_with(
+            service, [8000, 8001], [9000]
+        )
+        _, kwargs = service.run_checks.call_args
+        self.assertEqual(kwargs["executor"], reporter.check_pool)
+        self.assertEqual(kwargs["timeout"], 3)
+
+    def test_run_checks_multi_port_service_reported_in_one_batch(self):
+        discovery = Mock()
+
+        service = Service()
+        service.name = "app"
+        service.discovery = "disco"
+        service.check_interval = 3
+        service.configured_ports = list(range(8000, 8020))
+        service.checks = dict(
+            (port, {"check": Mock(passing=True)})
+            for port in service.configured_ports
+        )
+
+        reporter = Reporter("/etc/configs")
+        reporter.configurables[Discovery] = {"disco": discovery}
+
+        reporter.run_checks(service)
+
+        discovery.report_batch.assert_called_once_with(
+            service, list(range(8000, 8020)), []
+        )
+
+    @patch("lighthouse.reporter.logger")
+    def test_run_checks_reports_after_window(self, logger):
+        discovery = Mock()
+
+        service = Mock()
+        service.name = "app"
+        service.discovery = "disco"
+        service.check_interval = 3
+
+        reporter = Reporter("/etc/configs")
+        reporter.configurables[Discovery] = {"disco": discovery}
+
+        reported = threading.Event()
+        discovery.report_batch.side_effect = lambda *args: reported.set()
+
+        def run_checks(executor, timeout, callback):
+            callback(set([8000]), set())
+            self.assertTrue(reported.wait(5))
+            callback(set(), set([8001]))
+            return set(), set()
+
+        service.run_checks.side_effect = run_checks
+
+        with patch("lighthouse.reporter.REPORT_BATCH_WINDOW", .01):
+            reporter.run_checks(service)
+
+        discovery.report_batch.assert_has_calls([
+            call(service, [8000], []), call(service, [], [8001]),
+        ])
+        self.assertFalse(logger.exception.called)
+
+    @patch("lighthouse.reporter.logger")
+    def test_port_change_batch_logs_errors(self, logger):
+        report = Mock(side_effect=Exception("oh no"))
+        batch = PortChangeBatch("app", report, 5)
+
+        batch.add(set([8000]), set())
+        batch.flush()
+
+        report.assert_called_once_with(set([8000]), set())
+        self.assertTrue(logger.exception.called)
+
+        batch.flush()
+
+        self.assertEqual(report.call_count, 1)
+
     def test_add_discovery_calls_connect(self):
         discovery = Mock()
         discovery.name = "existing"
@@ -71,91 +236,119 @@ class ReporterTests(cases.WatcherTestCase):
 
         discovery.stop.assert_called_once_with()
 
-    @patch.object(Reporter, "launch_thread")
-    def test_add_service_starts_check_run_thread(self, launch_thread):
+    @patch("lighthouse.reporter.CheckScheduler")
+    def test_add_service_schedules_checks(self, CheckScheduler):
+        scheduler = CheckScheduler.return_value
+
         service = Mock()
         service.name = "existing"
+        service.check_interval = 3
+        service.check_splay = 1
 
         reporter = Reporter("/etc/configs")
+        reporter.check_service = Mock()
 
         reporter.add_configurable(Service, "existing", service)
 
-        launch_thread.assert_called_once_with(
-            "existing", reporter.check_loop, service
-        )
+        name, job, interval = scheduler.add.call_args[0]
+        self.assertEqual(name, "existing")
+        self.assertEqual(interval, 3)
+        self.assertEqual(scheduler.add.call_args[1], {"splay": 1})
+
+        job()
+
+        reporter.check_service.assert_called_once_with(service)
+
+    @patch("lighthouse.reporter.CheckScheduler")
+    def test_update_service_reschedules_checks(self, CheckScheduler):
+        scheduler = CheckScheduler.return_value
 
-    def test_check_loop_passes_if_shutdown_set(self):
         service = Mock()
-        service.name = "a_service"
-        service.run_checks.return_value = (set(), set())
+        service.name = "existing"
+        service.check_interval = 3
+        service.check_splay = 0
 
         reporter = Reporter("/etc/configs")
+        reporter.configurables[Service] = {"existing": service}
 
-        reporter.shutdown.set()
+        reporter.update_configurable(Service, "existing", {})
 
-        reporter.check_loop(service)
+        self.assertEqual(scheduler.add.call_args[0][0], "existing")
 
-    def test_check_loop_passes_if_service_not_in_services(self):
-        service = Mock()
-        service.name = "other_service"
-        service.run_checks.return_value = (set(), set())
+    @patch("lighthouse.reporter.CheckScheduler")
+    def test_remove_service_unschedules_checks(self, CheckScheduler):
+        scheduler = CheckScheduler.return_value
 
         reporter = Reporter("/etc/configs")
-        reporter.configurables[Service] = {
-            "a_service": Mock()
-        }
+        reporter.configurables[Service] = {"existing": Mock()}
 
-        reporter.check_loop(service)
+        reporter.remove_configurable(Service, "existing")
+
+        scheduler.remove.assert_called_once_with("existing")
+
+    @patch("lighthouse.reporter.CheckScheduler")
+    def test_wind_down_stops_scheduler(self, CheckScheduler):
+        reporter = Reporter("/etc/configs")
+
+        reporter.wind_down()
+
+        CheckScheduler.return_value.stop.assert_called_once_with()
+
+    @patch("lighthouse.reporter.CheckScheduler")
+    def test_check_service_skipped_if_previous_run_going(self,
+                                                         CheckScheduler):
+        scheduler = CheckScheduler.return_value
+        scheduler.missed = {"app": 0}
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_check_loop_loops_with_check_interval(self, wait_on_event):
         service = Mock()
-        service.run_checks.return_value = (set(), set())
+        service.name = "app"
 
-        reporter = Reporter("etc/configs")
+        reporter = Reporter("/etc/configs")
+        reporter.run_checks = Mock()
+        reporter.in_flight["app"] = Mock()
+        reporter.in_flight["app"].done.return_value = False
 
-        def set_shutdown(*args, **wargs):
-            reporter.shutdown.set()
+        reporter.check_service(service)
 
-        wait_on_event.side_effect = set_shutdown
+        self.assertFalse(reporter.run_checks.called)
+        self.assertEqual(scheduler.missed, {"app": 1})
 
-        reporter.configurables[Service] = {
-            "a_service": service
-        }
+        reporter.in_flight["app"].done.return_value = True
+        reporter.run_checks.return_value = (set(), set())
 
-        reporter.check_loop(service)
+        reporter.check_service(service)
 
-        wait_on_event.assert_called_once_with(
-            reporter.shutdown, timeout=service.check_interval
-        )
+        reporter.run_checks.assert_called_once_with(service)
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_run_checks_service_uses_unknown_discovery(self, wait_on_event):
+    def test_run_checks_service_uses_unknown_discovery(self):
         service = Mock()
         service.name = "a_service"
         service.discovery = "fake_discovery"
-        service.run_checks.return_value = (set(), set())
 
         reporter = Reporter("etc/configs")
         reporter.configurables[Discovery] = {
             "foobar": Mock()
         }
 
-        def set_shutdown(*args, **kwargs):
-            reporter.shutdown.set()
+        reporter.check_service(service)
 
-        wait_on_event.side_effect = set_shutdown
+        assert service.run_checks.called is False
 
-        reporter.configurables[Service] = {
-            "a_service": service
-        }
+    @patch("lighthouse.reporter.logger")
+    def test_check_service_error_is_logged(self, logger):
+        service = Mock()
+        service.name = "app"
+        service.discovery = "disco"
+        service.run_checks.side_effect = Exception("oh no")
+
+        reporter = Reporter("etc/configs")
+        reporter.configurables[Discovery] = {"disco": Mock()}
 
-        reporter.check_loop(service)
+        reporter.check_service(service)
 
-        assert service.run_check.called is False
+        self.assertTrue(logger.exception.called)
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_check_loop_up_service_fails(self, wait_on_event):
+    def test_check_service_up_service_fails(self):
         discovery = Mock()
 
         service = Mock()
@@ -168,21 +361,12 @@ class ReporterTests(cases.WatcherTestCase):
         reporter.configurables[Discovery] = {
             "disco": discovery
         }
-        reporter.configurables[Service] = {
-            service.name: service
-        }
-
-        def set_shutdown(*args, **kwargs):
-            reporter.shutdown.set()
-
-        wait_on_event.side_effect = set_shutdown
 
-        reporter.check_loop(service)
+        reporter.check_service(service)
 
-        discovery.report_down.assert_called_once_with(service, 8888)
+        discovery.report_batch.assert_called_once_with(service, [], [8888])
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_check_loop_down_service_passes(self, wait_on_event):
+    def test_check_service_down_service_passes(self):
         discovery = Mock()
 
         service = Mock()
@@ -196,26 +380,15 @@ class ReporterTests(cases.WatcherTestCase):
             "disco": discovery
         }
 
-        def set_shutdown(*args, **kwargs):
-            reporter.shutdown.set()
-
-        wait_on_event.side_effect = set_shutdown
-
-        reporter.configurables[Service] = {
-            "service": service
-        }
-
-        reporter.check_loop(service)
+        reporter.check_service(service)
 
-        discovery.report_up.assert_called_once_with(service, 8888)
+        discovery.report_batch.assert_called_once_with(service, [8888], [])
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_check_loop_with_no_checks_defined(self, wait_on_event):
+    def test_check_service_with_no_changes(self):
         discovery = Mock()
 
         service = Mock()
         service.name = "service"
-        service.is_up = False
         service.discovery = "disco"
         service.checks = {}
         service.run_checks.return_value = (set(), set())
@@ -225,17 +398,6 @@ class ReporterTests(cases.WatcherTestCase):
             "disco": discovery
         }
 
-        def set_shutdown(*args, **kwargs):
-            reporter.shutdown.set()
-
-        wait_on_event.side_effect = set_shutdown
-
-        reporter.configurables[Service] = {
-            "service": service
-        }
-
-        reporter.check_loop(service)
+        reporter.check_service(service)
 
-        wait_on_event.assert_called_once_with(
-            reporter.shutdown, timeout=service.check_interval
-        )
+        self.assertFalse(discovery.report_batch.called)
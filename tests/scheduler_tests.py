@@ -0,0 +1,126 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import threading
+
+from mock import patch, Mock
+
+from lighthouse.scheduler import CheckScheduler, get_next_deadline
+
+
+class GetNextDeadlineTests(unittest.TestCase):
+
+    def test_fixed_rate(self):
+        self.assertEqual(get_next_deadline(100, 5, 101.5), (105, 0))
+
+    def test_late_but_before_next_deadline(self):
+        self.assertEqual(get_next_deadline(100, 5, 104.9), (105, 0))
+
+    def test_missed_deadlines_are_skipped(self):
+        self.assertEqual(get_next_deadline(100, 5, 112), (115, 2))
+
+
+@patch("lighthouse.scheduler.threading.Thread", Mock())
+class CheckSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        super(CheckSchedulerTests, self).setUp()
+
+        now_patcher = patch("lighthouse.scheduler.now")
+        self.now = now_patcher.start()
+        self.addCleanup(now_patcher.stop)
+
+        self.now.return_value = 100
+
+    def test_jobs_fire_at_fixed_rate(self):
+        scheduler = CheckScheduler()
+        job = Mock()
+
+        scheduler.add("app", job, 5)
+
+        self.assertEqual(scheduler.pop_due(100), (("app", job), None))
+        self.assertEqual(scheduler.pop_due(101), (None, 4))
+        self.assertEqual(scheduler.pop_due(105.5), (("app", job), None))
+        self.assertEqual(scheduler.pop_due(106), (None, 4))
+
+    def test_jobs_ordered_by_deadline(self):
+        scheduler = CheckScheduler()
+        fast = Mock()
+        slow = Mock()
+
+        scheduler.add("slow", slow, 10)
+        scheduler.add("fast", fast, 3)
+
+        fired = []
+        for t in range(100, 110):
+            due, _ = scheduler.pop_due(t)
+            while due:
+                fired.append((t, due[0]))
+                due, _ = scheduler.pop_due(t)
+
+        self.assertEqual(
+            fired, [
+                (100, "slow"), (100, "fast"), (103, "fast"), (106, "fast"),
+                (109, "fast")
+            ]
+        )
+
+    @patch("lighthouse.scheduler.random")
+    def test_splay_offsets_first_deadline(self, random):
+        random.uniform.return_value = 2.5
+
+        scheduler = CheckScheduler()
+        scheduler.add("app", Mock(), 5, splay=4)
+
+        random.uniform.assert_called_once_with(0, 4)
+        self.assertEqual(scheduler.pop_due(100), (None, 2.5))
+
+    @patch("lighthouse.scheduler.logger")
+    def test_missed_deadlines_counted(self, logger):
+        scheduler = CheckScheduler()
+        job = Mock()
+
+        scheduler.add("app", job, 5)
+        scheduler.pop_due(100)
+
+        self.assertEqual(scheduler.pop_due(117), (("app", job), None))
+
+        self.assertEqual(scheduler.missed["app"], 2)
+        self.assertTrue(logger.warning.called)
+        self.assertEqual(scheduler.pop_due(117), (None, 3))
+
+    def test_removed_and_replaced_jobs(self):
+        scheduler = CheckScheduler()
+        old_job = Mock()
+        new_job = Mock()
+
+        scheduler.add("app", old_job, 5)
+        scheduler.add("other", Mock(), 5)
+        scheduler.remove("other")
+
+        self.now.return_value = 102
+        scheduler.add("app", new_job, 5)
+
+        self.assertEqual(scheduler.pop_due(101), (None, 1))
+        self.assertEqual(scheduler.pop_due(102), (("app", new_job), None))
+        self.assertEqual(scheduler.heap, [(107, 2, "app")])
+
+
+class CheckSchedulerThreadTests(unittest.TestCase):
+
+    def test_runs_jobs_until_stopped(self):
+        scheduler = CheckScheduler()
+        fired = threading.Event()
+        broken = Mock(side_effect=Exception("oh no"))
+
+        scheduler.add("broken", broken, 0.01)
+        scheduler.add("app", fired.set, 0.01)
+
+        self.assertTrue(fired.wait(5))
+
+        scheduler.stop()
+
+        self.assertFalse(scheduler.thread.is_alive())
+        self.assertTrue(broken.called)
@@ -8,19 +8,56 @@ from mock import patch
 from lighthouse.scripts import reporter
 
 
+@patch("lighthouse.scripts.reporter.identity")
 @patch("lighthouse.scripts.reporter.reporter.Reporter")
 @patch("lighthouse.scripts.reporter.parser")
 class ReporterScriptTests(unittest.TestCase):
 
-    def test_run_handles_keyboardinterrupt(self, parser, Reporter):
+    def test_run_handles_keyboardinterrupt(self, parser, Reporter, identity):
+        parser.parse_args.return_value.metrics_port = None
         Reporter.return_value.start.side_effect = KeyboardInterrupt
 
         reporter.run()
 
         Reporter.return_value.stop.assert_called_once_with()
 
+    @patch("lighthouse.scripts.reporter.metrics")
+    def test_metrics_off_by_default(self, metrics, parser, Reporter, identity):
+        parser.parse_args.return_value.metrics_port = None
+
+        reporter.run()
+
+        self.assertFalse(metrics.MetricsServer.called)
+
+    @patch("lighthouse.scripts.reporter.metrics")
+    def test_metrics_server_lifecycle(self, metrics, parser, Reporter,
+                                      identity):
+        args = parser.parse_args.return_value
+        args.metrics_port = 9100
+        Reporter.return_value.start.side_effect = KeyboardInterrupt
+
+        reporter.run()
+
+        metrics.MetricsServer.assert_called_once_with(
+            9100, address=args.metrics_address
+        )
+        metrics.MetricsServer.return_value.start.assert_called_once_with()
+        metrics.MetricsServer.return_value.stop.assert_called_once_with()
+
+    def test_identity_configured(self, parser, Reporter, identity):
+        args = parser.parse_args.return_value
+        args.metrics_port = None
+
+        reporter.run()
+
+        identity.local.configure.assert_called_once_with(
+            name=args.hostname, ip=args.ip, ttl=args.identity_ttl
+        )
+
     @patch("lighthouse.scripts.reporter.log")
-    def test_log_setup_called(self, log, parser, Reporter):
+    def test_log_setup_called(self, log, parser, Reporter, identity):
+        parser.parse_args.return_value.metrics_port = None
+
         reporter.run()
 
         log.setup.assert_called_once_with("REPORTER")
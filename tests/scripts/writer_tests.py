@@ -8,19 +8,55 @@ from mock import patch
 from lighthouse.scripts import writer
 
 
+@patch("lighthouse.scripts.writer.identity")
 @patch("lighthouse.scripts.writer.writer.Writer")
 @patch("lighthouse.scripts.writer.parser")
 class WriterScriptTests(unittest.TestCase):
 
-    def test_run_handles_keyboardinterrupt(self, parser, Writer):
+    def test_run_handles_keyboardinterrupt(self, parser, Writer, identity):
+        parser.parse_args.return_value.metrics_port = None
         Writer.return_value.start.side_effect = KeyboardInterrupt
 
         writer.run()
 
         Writer.return_value.stop.assert_called_once_with()
 
+    @patch("lighthouse.scripts.writer.metrics")
+    def test_metrics_off_by_default(self, metrics, parser, Writer, identity):
+        parser.parse_args.return_value.metrics_port = None
+
+        writer.run()
+
+        self.assertFalse(metrics.MetricsServer.called)
+
+    @patch("lighthouse.scripts.writer.metrics")
+    def test_metrics_server_lifecycle(self, metrics, parser, Writer, identity):
+        args = parser.parse_args.return_value
+        args.metrics_port = 9100
+        Writer.return_value.start.side_effect = KeyboardInterrupt
+
+        writer.run()
+
+        metrics.MetricsServer.assert_called_once_with(
+            9100, address=args.metrics_address
+        )
+        metrics.MetricsServer.return_value.start.assert_called_once_with()
+        metrics.MetricsServer.return_value.stop.assert_called_once_with()
+
+    def test_identity_configured(self, parser, Writer, identity):
+        args = parser.parse_args.return_value
+        args.metrics_port = None
+
+        writer.run()
+
+        identity.local.configure.assert_called_once_with(
+            name=args.hostname, ip=args.ip, ttl=args.identity_ttl
+        )
+
     @patch("lighthouse.scripts.writer.log")
-    def test_log_setup_called(self, log, parser, Writer):
+    def test_log_setup_called(self, log, parser, Writer, identity):
+        parser.parse_args.return_value.metrics_port = None
+
         writer.run()
 
         log.setup.assert_called_once_with("WRITER")
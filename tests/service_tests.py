@@ -3,8 +3,12 @@ try:
 except ImportError:
     import unittest
 
+import threading
+
 from mock import patch, Mock
+from concurrent import futures
 
+from lighthouse.check import Check
 from lighthouse.service import Service
 
 
@@ -133,8 +137,26 @@ class ServiceTests(unittest.TestCase):
             "http", {"uri": "/health"}
         )
 
-    @patch("lighthouse.reporter.wait_on_event")
-    def test_run_checks_runs_each_service_check(self, wait_on_event):
+    @patch("lighthouse.service.Check")
+    def test_apply_config_with_splay(self, Check):
+        service = Service()
+        service.apply_config({
+            "host": "localhost",
+            "port": 3333,
+            "discovery": "zookeeper",
+            "checks": {
+                "interval": 2,
+                "splay": 1.5,
+                "http": {"uri": "/health"}
+            }
+        })
+
+        self.assertEqual(service.check_splay, 1.5)
+        Check.from_config.assert_called_once_with(
+            "http", {"uri": "/health"}
+        )
+
+    def test_run_checks_runs_each_service_check(self):
         check1 = Mock()
         check2 = Mock()
 
@@ -156,3 +178,149 @@ class ServiceTests(unittest.TestCase):
 
         check1.run.assert_called_once_with()
         check2.run.assert_called_once_with()
+
+    def make_service(self, checks):
+        service = Service()
+        service.name = "app"
+        service.configured_ports = list(checks.keys())
+        service.update_ports()
+        service.checks = dict(
+            (port, dict(("check%d" % i, check) for i, check in enumerate(cs)))
+            for port, cs in checks.items()
+        )
+
+        return service
+
+    def make_check(self, passing=True, wait_on=None):
+        check = Mock()
+        check.passing = False
+
+        def run():
+            if wait_on:
+                wait_on.wait(5)
+            check.passing = passing
+
+        check.run.side_effect = run
+
+        return check
+
+    def test_run_checks_concurrently(self):
+        executor = futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        service = self.make_service({
+            8000: [self.make_check(), self.make_check()],
+            8001: [self.make_check(passing=False)],
+            8002: [self.make_check()],
+        })
+
+        came_up, went_down = service.run_checks(executor=executor, timeout=5)
+
+        self.assertEqual(came_up, set([8000, 8002]))
+        self.assertEqual(went_down, set([8001]))
+        self.assertEqual(service.running, {})
+
+    def test_run_checks_concurrently_reports_each_port(self):
+        executor = futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        reports = []
+
+        def callback(came_up, went_down):
+            reports.append((came_up, went_down))
+            release.set()
+
+        service = self.make_service({
+            8000: [self.make_check()],
+            8001: [self.make_check(passing=False, wait_on=release)],
+        })
+        service.checks[8888] = {"old": Mock()}
+
+        came_up, went_down = service.run_checks(
+            executor=executor, timeout=5, callback=callback
+        )
+
+        self.assertEqual(
+            reports, [(set([8000]), set()), (set(), set([8001]))]
+        )
+        self.assertEqual(came_up, set())
+        self.assertEqual(went_down, set([8888]))
+
+    @patch("lighthouse.service.logger")
+    def test_run_checks_concurrently_with_deadline(self, logger):
+        executor = futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        slow_check = self.make_check(wait_on=release)
+        service = self.make_service({
+            8000: [self.make_check()],
+            8001: [self.make_check(), slow_check],
+        })
+
+        came_up, went_down = service.run_checks(
+            executor=executor, timeout=0.05
+        )
+
+        self.assertEqual(came_up, set([8000]))
+        self.assertEqual(went_down, set([8001]))
+        self.assertTrue(logger.warn.called)
+
+        came_up, went_down = service.run_checks(
+            executor=executor, timeout=0.05
+        )
+
+        self.assertEqual(slow_check.run.call_count, 1)
+        self.assertEqual((came_up, went_down), (set(), set()))
+
+        release.set()
+
+        came_up, went_down = service.run_checks(
+            executor=executor, timeout=5
+        )
+
+        self.assertEqual(came_up, set([8001]))
+        self.assertEqual(service.running, {})
+
+    @patch("lighthouse.service.logger", Mock())
+    @patch.object(Check, "apply_check_config", Mock())
+    @patch.object(Check, "perform")
+    def test_run_checks_deadline_respects_fall_count(self, perform):
+        executor = futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        check = Check()
+        check.name = "slow"
+        check.apply_config({"rise": 1, "fall": 3})
+        service = self.make_service({8000: [check]})
+
+        perform.return_value = True
+        came_up, went_down = service.run_checks(executor=executor, timeout=5)
+
+        self.assertEqual((came_up, went_down), (set([8000]), set()))
+
+        perform.side_effect = lambda: release.wait(5)
+
+        for _ in range(2):
+            came_up, went_down = service.run_checks(
+                executor=executor, timeout=0.05
+            )
+
+            self.assertEqual((came_up, went_down), (set(), set()))
+            self.assertEqual(check.passing, True)
+            self.assertEqual(service.is_up[8000], True)
+
+        came_up, went_down = service.run_checks(
+            executor=executor, timeout=0.05
+        )
+
+        self.assertEqual((came_up, went_down), (set(), set([8000])))
+        self.assertEqual(check.passing, False)
@@ -1,4 +1,5 @@
 import os
+import sys
 
 import flake8.main
 import six
@@ -6,20 +7,33 @@ import six
 
 MAX_COMPLEXITY = 11
 
+# modules with python 3.5+ syntax, only checked on python 3.5+
+PY35_ONLY_FILES = ("lighthouse/engine.py", "tests/async_checks.py")
+
 
 def test_style():
-    for path in ("lighthouse", "tests"):
+    for path in ("lighthouse", "tests", "benchmarks"):
         python_files = list(get_python_files(path))
         yield create_style_assert(path, python_files)
 
 
 def get_python_files(path):
-    path = os.path.join(os.path.dirname(__file__), "../", path)
-    for root, dirs, files in os.walk(path):
+    root_path = os.path.join(os.path.dirname(__file__), "../")
+    for root, dirs, files in os.walk(os.path.join(root_path, path)):
         for filename in files:
             if not filename.endswith(".py"):
                 continue
-            yield os.path.join(root, filename)
+            file_path = os.path.join(root, filename)
+            if sys.version_info < (3, 5) and is_py35_only(file_path):
+                continue
+            yield file_path
+
+
+def is_py35_only(file_path):
+    relative_path = os.path.relpath(
+        file_path, os.path.join(os.path.dirname(__file__), "../")
+    )
+    return relative_path.replace(os.sep, "/") in PY35_ONLY_FILES
 
 
 def create_style_assert(path, python_files):
@@ -0,0 +1,153 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from mock import patch, Mock
+from concurrent import futures
+
+from lighthouse.sync import SyncScheduler
+
+
+class SyncSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        super(SyncSchedulerTests, self).setUp()
+
+        time_patcher = patch("lighthouse.sync.time")
+        timer_patcher = patch("lighthouse.sync.threading.Timer")
+
+        self.mock_time = time_patcher.start()
+        self.Timer = timer_patcher.start()
+
+        self.addCleanup(time_patcher.stop)
+        self.addCleanup(timer_patcher.stop)
+
+        self.mock_time.time.return_value = 100
+
+        self.work_pool = Mock()
+        self.futures = []
+
+        def submit(fn):
+            f = futures.Future()
+            self.futures.append((fn, f))
+            return f
+
+        self.work_pool.submit.side_effect = submit
+
+    def finish_job(self):
+        fn, f = self.futures.pop(0)
+        try:
+            f.set_result(fn())
+        except Exception as e:
+            f.set_exception(e)
+
+    def test_no_quiet_period_submits_right_away(self):
+        fn = Mock()
+        scheduler = SyncScheduler(self.work_pool, fn)
+
+        scheduler.request()
+
+        self.assertEqual(len(self.futures), 1)
+        self.assertFalse(self.Timer.called)
+
+        self.finish_job()
+
+        fn.assert_called_once_with()
+
+    def test_requests_while_in_flight_are_coalesced(self):
+        fn = Mock()
+        scheduler = SyncScheduler(self.work_pool, fn)
+
+        scheduler.request()
+        scheduler.request()
+        scheduler.request()
+        scheduler.request()
+
+        self.assertEqual(len(self.futures), 1)
+
+        self.finish_job()
+
+        self.assertEqual(len(self.futures), 1)
+
+        self.finish_job()
+
+        self.assertEqual(len(self.futures), 0)
+        self.assertEqual(fn.call_count, 2)
+
+    def test_quiet_period_starts_timer(self):
+        fn = Mock()
+        scheduler = SyncScheduler(self.work_pool, fn, quiet_period=2)
+
+        scheduler.request()
+
+        self.Timer.assert_called_once_with(2, scheduler.fire)
+        self.Timer.return_value.start.assert_called_once_with()
+        self.assertEqual(len(self.futures), 0)
+
+    def test_timer_restarted_if_requests_keep_coming(self):
+        fn = Mock()
+        scheduler = SyncScheduler(self.work_pool, fn, quiet_period=2)
+
+        scheduler.request()
+
+        self.mock_time.time.return_value = 101
+        scheduler.request()
+
+        self.assertEqual(self.Timer.call_count, 1)
+
+        self.mock_time.time.return_value = 102
+        scheduler.fire()
+
+        self.assertEqual(len(self.futures), 0)
+        self.Timer.assert_called_with(1, scheduler.fire)
+
+        self.mock_time.time.return_value = 103
+        scheduler.fire()
+
+        self.assertEqual(len(self.futures), 1)
+
+    def test_max_delay_caps_the_wait(self):
+        fn = Mock()
+        scheduler = SyncScheduler(
+            self.work_pool, fn, quiet_period=2, max_delay=3
+        )
+
+        for now in (100, 101, 102, 103):
+            self.mock_time.time.return_value = now
+            scheduler.request()
+
+        self.assertEqual(len(self.futures), 0)
+
+        scheduler.fire()
+
+        self.assertEqual(len(self.futures), 1)
+
+    @patch("lighthouse.sync.logger")
+    def test_errors_in_job_are_logged(self, logger):
+        fn = Mock(side_effect=Exception("oh no"))
+        scheduler = SyncScheduler(self.work_pool, fn)
+
+        scheduler.request()
+        self.finish_job()
+
+        self.assertTrue(logger.exception.called)
+
+        scheduler.request()
+
+        self.assertEqual(len(self.futures), 1)
+
+    def test_stop_cancels_timer_and_ignores_requests(self):
+        fn = Mock()
+        scheduler = SyncScheduler(self.work_pool, fn, quiet_period=2)
+
+        scheduler.request()
+        scheduler.stop()
+
+        self.Timer.return_value.cancel.assert_called_once_with()
+
+        scheduler.request()
+        scheduler.fire()
+
+        self.assertEqual(len(self.futures), 0)
+        self.assertEqual(self.Timer.call_count, 1)
@@ -235,6 +235,50 @@ class WriterTests(cases.WatcherTestCase):
 
         discovery.stop.assert_called_once_with()
 
+    def test_sync_requests_coalesced_while_sync_in_flight(self):
+        writer = Writer("/etc/configs")
+
+        balancer = Mock()
+        writer.configurables[Balancer] = {"balancer": balancer}
+        writer.configurables[Cluster] = {}
+
+        def sync_file(clusters):
+            if balancer.sync_file.call_count == 1:
+                writer.sync_balancer_files()
+                writer.sync_balancer_files()
+                writer.sync_balancer_files()
+
+        balancer.sync_file.side_effect = sync_file
+
+        writer.sync_balancer_files()
+
+        self.assertEqual(balancer.sync_file.call_count, 2)
+
+    @patch("lighthouse.writer.SyncScheduler")
+    def test_empty_discovery_delta_skips_sync(self, SyncScheduler):
+        writer = Writer("/etc/configs")
+
+        writer.sync_balancer_files([], [])
+
+        self.assertFalse(SyncScheduler.return_value.request.called)
+
+        writer.sync_balancer_files([], [Mock()])
+
+        SyncScheduler.return_value.request.assert_called_once_with()
+
+    @patch("lighthouse.writer.SyncScheduler")
+    def test_wind_down_stops_sync_scheduler(self, SyncScheduler):
+        writer = Writer("/etc/configs", sync_quiet_period=1, sync_max_delay=3)
+
+        SyncScheduler.assert_called_once_with(
+            writer.work_pool, writer.sync_balancers,
+            quiet_period=1, max_delay=3
+        )
+
+        writer.wind_down()
+
+        SyncScheduler.return_value.stop.assert_called_once_with()
+
     def test_removing_discovery_calls_stop(self):
         discovery = Mock()
         discovery.name = "existing"
@@ -5,16 +5,29 @@ except ImportError:
 
 import json
 
-from mock import patch, Mock, call
+from mock import patch, Mock, ANY, call
 
 from kazoo import client, exceptions
+from kazoo.protocol.states import EventType, WatchedEvent
 
-from lighthouse.zookeeper import ZookeeperDiscovery
+from lighthouse import identity
+from lighthouse.zookeeper import ZookeeperDiscovery, ChildrenStatWatch
 
 
 @patch("lighthouse.zookeeper.client")
 class ZookeeperTests(unittest.TestCase):
 
+    def setUp(self):
+        identity.local.refresh()
+        self.addCleanup(identity.local.refresh)
+
+    def fire_children_watch(self, zk, children, cversion):
+        zk.client.get_children.return_value = (
+            children, Mock(cversion=cversion)
+        )
+        watch = zk.client.get_children.call_args[1]["watch"]
+        watch(WatchedEvent(EventType.CHILD, None, "/lighthouse/webapp"))
+
     def test_validate_dependencies(self, mock_client):
         self.assertEqual(ZookeeperDiscovery.validate_dependencies(), True)
 
@@ -26,6 +39,7 @@ class ZookeeperTests(unittest.TestCase):
 
         self.assertEqual(zk.hosts, ["zk01.int", "zk02.int"])
         self.assertEqual(zk.base_path, "/lighthouse")
+        self.assertEqual(zk.watch_node_data, False)
 
     def test_config_with_no_hosts(self, mock_client):
         self.assertRaises(
@@ -40,6 +54,31 @@ class ZookeeperTests(unittest.TestCase):
             {"hosts": ["zk01.int", "zk02.int"]}
         )
 
+    def test_config_with_unknown_node_format(self, mock_client):
+        self.assertRaises(
+            ValueError,
+            ZookeeperDiscovery.validate_config,
+            {
+                "hosts": ["zk01.int"], "path": "/lighthouse",
+                "node_format": "msgpack",
+            }
+        )
+
+    def test_node_format_defaults_to_legacy(self, mock_client):
+        zk = ZookeeperDiscovery()
+        zk.apply_config({"hosts": ["zk01.int"], "path": "/lighthouse"})
+
+        self.assertEqual(zk.node_format, 1)
+
+        zk.apply_config(
+            {
+                "hosts": ["zk01.int"], "path": "/lighthouse",
+                "node_format": "compact",
+            }
+        )
+
+        self.assertEqual(zk.node_format, 2)
+
     def test_not_connected_by_default(self, mock_client):
         zk = ZookeeperDiscovery()
 
@@ -198,13 +237,10 @@ class ZookeeperTests(unittest.TestCase):
 
         self.assertIn(zk.connected, args)
 
-    @patch("lighthouse.peer.socket")
-    @patch("lighthouse.node.socket")
-    def test_report_up(self, mock_socket, peer_socket, mock_client):
+    @patch("lighthouse.identity.socket")
+    def test_report_up(self, mock_socket, mock_client):
         mock_socket.getfqdn.return_value = "redis1.int.local"
         mock_socket.gethostbyname.return_value = "10.0.1.8"
-        peer_socket.getfqdn.return_value = "redis1.int.local"
-        peer_socket.gethostbyname.return_value = "10.0.1.8"
 
         zk = ZookeeperDiscovery()
         zk.apply_config(
@@ -246,13 +282,42 @@ class ZookeeperTests(unittest.TestCase):
             }
         )
 
-    @patch("lighthouse.peer.socket")
-    @patch("lighthouse.node.socket")
-    def test_report_up__no_node(self, mock_socket, peer_socket, mock_client):
+    @patch("lighthouse.identity.socket")
+    def test_report_up__compact_format(self, mock_socket, mock_client):
+        mock_socket.getfqdn.return_value = "redis1.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+
+        zk = ZookeeperDiscovery()
+        zk.apply_config(
+            {
+                "hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse",
+                "node_format": "compact",
+            }
+        )
+        zk.connect()
+        zk.connected.set()
+
+        znode = Mock(owner_session_id="0x1234")
+        zk.client.exists.return_value = znode
+        zk.client.client_id = (znode.owner_session_id, "asf")
+
+        service = Mock(metadata={"type": "master"})
+        service.name = "webcache"
+
+        zk.report_up(service, 6379)
+
+        zk.client.set.assert_called_once_with(
+            "/lighthouse/webcache/redis1.int.local:6379",
+            (
+                b'{"h":"redis1.int.local","i":"10.0.1.8",'
+                b'"m":{"type":"master"},"p":6379,"v":2}'
+            )
+        )
+
+    @patch("lighthouse.identity.socket")
+    def test_report_up__no_node(self, mock_socket, mock_client):
         mock_socket.getfqdn.return_value = "redis1.int.local"
         mock_socket.gethostbyname.return_value = "10.0.1.8"
-        peer_socket.getfqdn.return_value = "redis1.int.local"
-        peer_socket.gethostbyname.return_value = "10.0.1.8"
 
         zk = ZookeeperDiscovery()
         zk.apply_config(
@@ -298,13 +363,10 @@ class ZookeeperTests(unittest.TestCase):
             }
         )
 
-    @patch("lighthouse.peer.socket")
-    @patch("lighthouse.node.socket")
-    def test_report_up__old_node(self, mock_socket, peer_socket, mock_client):
+    @patch("lighthouse.identity.socket")
+    def test_report_up__old_node(self, mock_socket, mock_client):
         mock_socket.getfqdn.return_value = "redis1.int.local"
         mock_socket.gethostbyname.return_value = "10.0.1.8"
-        peer_socket.getfqdn.return_value = "redis1.int.local"
-        peer_socket.gethostbyname.return_value = "10.0.1.8"
 
         zk = ZookeeperDiscovery()
         zk.apply_config(
@@ -356,6 +418,137 @@ class ZookeeperTests(unittest.TestCase):
 
         txn.commit.assert_called_once_with()
 
+    @patch("lighthouse.identity.socket")
+    def test_report_batch(self, mock_socket, mock_client):
+        mock_socket.getfqdn.return_value = "redis1.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+
+        zk = ZookeeperDiscovery()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+        zk.connect()
+        zk.connected.set()
+
+        zk.client.client_id = ("0xasdf", "asf")
+        owners = {
+            "/lighthouse/webcache/redis1.int.local:6379": None,
+            "/lighthouse/webcache/redis1.int.local:6380": "0x1234",
+            "/lighthouse/webcache/redis1.int.local:6381": "0xasdf",
+        }
+        zk.client.exists_async.side_effect = lambda path: Mock(**{
+            "get.return_value": (
+                Mock(owner_session_id=owners[path]) if owners[path] else None
+            )
+        })
+
+        txn = zk.client.transaction.return_value
+        txn.commit.return_value = ["path", True, "path", True]
+
+        service = Mock(metadata={})
+        service.name = "webcache"
+
+        zk.report_batch(service, [6379, 6380], [6381])
+
+        zk.client.ensure_path.assert_called_once_with("/lighthouse/webcache")
+        self.assertEqual(zk.client.exists_async.call_count, 3)
+        self.assertEqual(
+            [args for args, _ in txn.create.call_args_list],
+            [
+                ("/lighthouse/webcache/redis1.int.local:6379",),
+                ("/lighthouse/webcache/redis1.int.local:6380",),
+            ]
+        )
+        self.assertEqual(
+            txn.delete.call_args_list,
+            [
+                call("/lighthouse/webcache/redis1.int.local:6380"),
+                call("/lighthouse/webcache/redis1.int.local:6381"),
+            ]
+        )
+        txn.commit.assert_called_once_with()
+        self.assertEqual(zk.client.create.call_count, 0)
+        self.assertEqual(zk.client.delete.call_count, 0)
+
+        zk.client.transaction.return_value = Mock()
+        txn = zk.client.transaction.return_value
+        txn.commit.return_value = [True, True, "path"]
+
+        zk.report_batch(service, [6379, 6380, 6381], [])
+
+        self.assertEqual(zk.client.exists_async.call_count, 3)
+        self.assertEqual(zk.client.ensure_path.call_count, 1)
+        self.assertEqual(
+            [args[0] for args, _ in txn.set_data.call_args_list],
+            [
+                "/lighthouse/webcache/redis1.int.local:6379",
+                "/lighthouse/webcache/redis1.int.local:6380",
+            ]
+        )
+        self.assertEqual(
+            txn.create.call_args[0],
+            ("/lighthouse/webcache/redis1.int.local:6381",)
+        )
+
+    @patch.object(ZookeeperDiscovery, "report_down")
+    @patch.object(ZookeeperDiscovery, "report_up")
+    @patch("lighthouse.identity.socket")
+    def test_report_batch__failed_transaction(self, mock_socket, report_up,
+                                              report_down, mock_client):
+        mock_socket.getfqdn.return_value = "redis1.int.local"
+        mock_socket.gethostbyname.return_value = "10.0.1.8"
+
+        zk = ZookeeperDiscovery()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+        zk.connect()
+        zk.connected.set()
+
+        zk.client.client_id = ("0xasdf", "asf")
+        zk.client.exists_async.return_value.get.return_value = None
+
+        txn = zk.client.transaction.return_value
+        txn.commit.return_value = [
+            exceptions.NodeExistsError(), exceptions.RolledBackError()
+        ]
+
+        service = Mock(metadata={})
+        service.name = "webcache"
+        zk.znode_owners["/lighthouse/webcache/redis1.int.local:9000"] = "0x1"
+
+        zk.report_batch(service, [6379], [9000])
+
+        report_up.assert_called_once_with(service, 6379)
+        report_down.assert_called_once_with(service, 9000)
+        self.assertEqual(zk.znode_owners, {})
+        self.assertEqual(zk.ensured_paths, set())
+
+    def test_report_batch__nothing_to_do(self, mock_client):
+        zk = ZookeeperDiscovery()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+        zk.connect()
+        zk.connected.set()
+        zk.client.transaction.return_value.operations = []
+
+        service = Mock()
+        service.name = "webcache"
+
+        zk.report_batch(service, [], [])
+
+        self.assertFalse(zk.client.ensure_path.called)
+        self.assertFalse(zk.client.transaction.return_value.commit.called)
+
+    def test_session_lost_forgets_znode_owners(self, mock_client):
+        zk = ZookeeperDiscovery()
+        zk.znode_owners["/lighthouse/webcache/redis1.int.local:6379"] = "0x1"
+
+        zk.handle_connection_change(mock_client.KazooState.LOST)
+
+        self.assertEqual(zk.znode_owners, {})
+
     @patch("lighthouse.zookeeper.wait_on_any")
     def test_report_down_waits_for_connection(self, wait_on_any, mock_client):
         zk = ZookeeperDiscovery()
@@ -373,7 +566,7 @@ class ZookeeperTests(unittest.TestCase):
 
         self.assertIn(zk.connected, args)
 
-    @patch("lighthouse.node.socket")
+    @patch("lighthouse.identity.socket")
     def test_report_down(self, mock_socket, mock_client):
         mock_socket.getfqdn.return_value = "pg01.int.local"
         zk = ZookeeperDiscovery()
@@ -462,33 +655,32 @@ class ZookeeperTests(unittest.TestCase):
         cluster.name = "webapp"
 
         child_payloads = [
-            [b"some invalid string ok"],
-            [json.dumps(
+            (b"some invalid string ok", Mock()),
+            (json.dumps(
                 {"host": "app03", "ip": "10.0.1.8", "port": "8888"}
-            ).encode()],
-            [json.dumps({
+            ).encode(), Mock()),
+            (json.dumps({
                 "host": "app04", "ip": "10.0.1.3", "port": "8888",
                 "peer": json.dumps(
                     {"name": "app04.int", "ip": "10.0.1.3", "port": 1024}
                 ),
-            }).encode()],
+            }).encode(), Mock()),
         ]
 
         def get_child_payload(*args):
-            return child_payloads.pop(0)
+            return Mock(get=Mock(return_value=child_payloads.pop(0)))
 
-        zk.client.get.side_effect = get_child_payload
+        zk.client.get_async.side_effect = get_child_payload
 
-        def fire_immediately(watch):
-            watch(["app01:8888", "app03:8888", "app04:8888"])
-
-        zk.client.ChildrenWatch.return_value.side_effect = fire_immediately
+        zk.client.get_children.return_value = (
+            ["app01:8888", "app03:8888", "app04:8888"], Mock(cversion=3)
+        )
 
         zk.start_watching(cluster, callback)
 
         wait_on_any.assert_called_once_with(zk.connected, zk.shutdown)
 
-        callback.assert_called_once_with()
+        callback.assert_called_once_with(cluster.nodes, [])
 
         self.assertEqual(len(cluster.nodes), 2)
         self.assertEqual(cluster.nodes[0].host, "app03")
@@ -499,6 +691,283 @@ class ZookeeperTests(unittest.TestCase):
         self.assertEqual(cluster.nodes[1].peer.ip, "10.0.1.3")
         self.assertEqual(cluster.nodes[1].peer.port, 1024)
 
+    @patch("lighthouse.zookeeper.MAX_CONCURRENT_FETCHES", 2)
+    def test_fetch_nodes_bounds_requests_in_flight(self, mock_client):
+        zk = ZookeeperDiscovery()
+        zk.connect()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+
+        in_flight = []
+        max_in_flight = []
+
+        def get_async(path):
+            host = path.split("/")[-1]
+            result = Mock()
+
+            def get():
+                in_flight.remove(result)
+                if host == "gone":
+                    raise exceptions.NoNodeError
+                return (
+                    json.dumps(
+                        {"host": host, "ip": "10.0.1.8", "port": 8888}
+                    ).encode(),
+                    Mock()
+                )
+
+            result.get.side_effect = get
+            in_flight.append(result)
+            max_in_flight.append(len(in_flight))
+            return result
+
+        zk.client.get_async.side_effect = get_async
+
+        results = zk.fetch_nodes(
+            "/lighthouse/webapp", ["app01", "app02", "gone", "app03", "app04"]
+        )
+
+        self.assertEqual(
+            sorted(results), ["app01", "app02", "app03", "app04"]
+        )
+        self.assertEqual(results["app03"][1].host, "app03")
+        self.assertEqual(max(max_in_flight), 2)
+        self.assertEqual(in_flight, [])
+        zk.client.get_async.assert_has_calls([
+            call("/lighthouse/webapp/app01"),
+            call("/lighthouse/webapp/app02"),
+            call("/lighthouse/webapp/gone"),
+            call("/lighthouse/webapp/app03"),
+            call("/lighthouse/webapp/app04"),
+        ])
+
+    @patch("lighthouse.zookeeper.wait_on_any")
+    def test_children_change_only_fetches_new_children(self,
+                                                       wait_on_any,
+                                                       mock_client):
+        zk = ZookeeperDiscovery()
+        zk.connect()
+        zk.connected.set()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+
+        def get_async(path):
+            host = path.split("/")[-1]
+            data = json.dumps({"host": host, "ip": "10.0.1.8", "port": 8888})
+            return Mock(get=Mock(return_value=(data.encode(), Mock())))
+
+        zk.client.get_async.side_effect = get_async
+
+        zk.client.get_children.return_value = (
+            ["app01", "app02"], Mock(cversion=2)
+        )
+
+        callback = Mock()
+        cluster = Mock()
+        cluster.name = "webapp"
+
+        zk.start_watching(cluster, callback)
+
+        zk.client.get_children.assert_called_once_with(
+            "/lighthouse/webapp", watch=ANY, include_data=True
+        )
+        self.assertEqual(
+            [node.host for node in cluster.nodes], ["app01", "app02"]
+        )
+        self.assertEqual(zk.client.get_async.call_count, 2)
+
+        zk.client.get_async.reset_mock()
+        callback.reset_mock()
+
+        self.fire_children_watch(zk, ["app02", "app03"], 4)
+
+        zk.client.get_async.assert_called_once_with("/lighthouse/webapp/app03")
+        self.assertEqual(
+            [node.host for node in cluster.nodes], ["app02", "app03"]
+        )
+        added, removed = callback.call_args[0]
+        self.assertEqual([node.host for node in added], ["app03"])
+        self.assertEqual([node.host for node in removed], ["app01"])
+
+        zk.client.get_async.reset_mock()
+        callback.reset_mock()
+
+        self.fire_children_watch(zk, ["app02", "app03"], 4)
+
+        self.assertFalse(zk.client.get_async.called)
+        callback.assert_called_once_with([], [])
+
+        zk.stop_watching(cluster)
+
+        self.assertNotIn("/lighthouse/webapp", zk.node_caches)
+        self.assertNotIn("/lighthouse/webapp", zk.child_versions)
+
+    @patch("lighthouse.zookeeper.wait_on_any")
+    def test_children_change_refetches_recreated_children(self,
+                                                          wait_on_any,
+                                                          mock_client):
+        zk = ZookeeperDiscovery()
+        zk.connect()
+        zk.connected.set()
+        zk.apply_config(
+            {"hosts": ["zk01.int", "zk02.int"], "path": "/lighthouse"}
+        )
+
+        znodes = {
+            "app01": ({"type": "master"}, 10), "app02": ({}, 11),
+        }
+
+        def get_async(path):
+            host = path.split("/")[-1]
+            metadata, zxid = znodes[host]
+            data = json.dumps({
+                "host": host, "ip": "10.0.1.8", "port": 8888,
+                "metadata": json.dumps(metadata),
+            })
+            return Mock(
+                get=Mock(return_value=(data.encode(), Mock(mzxid=zxid)))
+            )
+
+        zk.client.get_async.side_effect = get_async
+
+        zk.client.get_children.return_value = (
+            ["app01", "app02"], Mock(cversion=2)
+        )
+
+        callback = Mock()
+        cluster = Mock()
+        cluster.name = "webapp"
+
+        zk.start_watching(cluster, callback)
+
+        old_node = cluster.nodes[0]
+        zk.client.get_async.reset_mock()
+        callback.reset_mock()
+
+        # app01 deleted and re-created with new data in one transaction
+        znodes["app01"] = ({"type": "slave"}, 12)
+        self.fire_children_watch(zk, ["app01", "app02"], 4)
+
+        self.assertEqual(zk.client.get_async.call_count, 2)
+        self.assertEqual(
+            [node.metadata for node in cluster.nodes], [{"type": "slave"}, {}]
+        )
+        added, removed = callback.call_args[0]
+        self.assertEqual(
+            [node.metadata for node in added], [{"type": "slave"}]
+        )
+        self.assertEqual(removed, [old_node])
+
+    @patch("lighthouse.zookeeper.wait_on_any")
+    def test_data_watch_propagates_node_changes(self,
+                                                wait_on_any,
+                                                mock_client):
+        zk = ZookeeperDiscovery()
+        zk.connect()
+        zk.connected.set()
+        zk.apply_config({
+            "hosts": ["zk01.int"], "path": "/lighthouse",
+            "watch_node_data": True
+        })
+
+        ports = {"app01": 8888, "app02": 8888}
+        data_watches = []
+
+        def get_async(path, watch=None):
+            data_watches.append(watch)
+            host = path.split("/")[-1]
+            result = Mock()
+            if host not in ports:
+                result.get.side_effect = exceptions.NoNodeError
+                return result
+            data = json.dumps(
+                {"host": host, "ip": "10.0.1.8", "port": ports[host]}
+            )
+            result.get.return_value = (data.encode(), Mock(mzxid=ports[host]))
+            return result
+
+        zk.client.get_async.side_effect = get_async
+
+        zk.client.get_children.return_value = (
+            ["app01", "app02"], Mock(cversion=2)
+        )
+
+        callback = Mock()
+        cluster = Mock()
+        cluster.name = "webapp"
+
+        zk.start_watching(cluster, callback)
+
+        self.assertEqual(
+            sorted(node.host for node in cluster.nodes), ["app01", "app02"]
+        )
+        data_changed = data_watches[0]
+        self.assertIsNotNone(data_changed)
+        self.assertEqual(data_watches, [data_changed, data_changed])
+
+        old_node = cluster.nodes[0]
+        callback.reset_mock()
+        ports["app01"] = 9999
+
+        data_changed(
+            WatchedEvent(EventType.CHANGED, None, "/lighthouse/webapp/app01")
+        )
+
+        zk.client.get_async.assert_called_with(
+            "/lighthouse/webapp/app01", watch=data_changed
+        )
+        self.assertEqual(
+            sorted((node.host, node.port) for node in cluster.nodes),
+            [("app01", 9999), ("app02", 8888)]
+        )
+        added, removed = callback.call_args[0]
+        self.assertEqual([node.port for node in added], [9999])
+        self.assertEqual(removed, [old_node])
+
+        # deleted and re-created: re-fetched, which re-sets the data watch
+        callback.reset_mock()
+        ports["app02"] = 7777
+
+        data_changed(
+            WatchedEvent(EventType.DELETED, None, "/lighthouse/webapp/app02")
+        )
+
+        zk.client.get_async.assert_called_with(
+            "/lighthouse/webapp/app02", watch=data_changed
+        )
+        self.assertEqual(
+            sorted((node.host, node.port) for node in cluster.nodes),
+            [("app01", 9999), ("app02", 7777)]
+        )
+        added, removed = callback.call_args[0]
+        self.assertEqual([node.port for node in added], [7777])
+
+        # deleted for good: dropped
+        callback.reset_mock()
+        del ports["app02"]
+        old_node = [node for node in cluster.nodes if node.host == "app02"]
+
+        data_changed(
+            WatchedEvent(EventType.DELETED, None, "/lighthouse/webapp/app02")
+        )
+
+        self.assertEqual(
+            [node.host for node in cluster.nodes], ["app01"]
+        )
+        self.assertNotIn("app02", zk.node_caches["/lighthouse/webapp"])
+        callback.assert_called_once_with([], old_node)
+
+        # unmodified: nothing to do
+        callback.reset_mock()
+
+        data_changed(
+            WatchedEvent(EventType.CHANGED, None, "/lighthouse/webapp/app01")
+        )
+
+        self.assertFalse(callback.called)
+
     @patch("lighthouse.zookeeper.wait_on_any")
     def test_watch_no_node_at_first(self, wait_on_any, mock_client):
         zk = ZookeeperDiscovery()
@@ -563,3 +1032,86 @@ class ZookeeperTests(unittest.TestCase):
         zk.start_watching(cluster, callback)
 
         wait_on_any.assert_called_once_with(zk.connected, zk.shutdown)
+
+
+class ChildrenStatWatchTests(unittest.TestCase):
+
+    def test_reads_children_and_stat_at_once(self):
+        kazoo_client = Mock()
+        stat = Mock(cversion=3)
+        kazoo_client.get_children.return_value = (["app01"], stat)
+        func = Mock(return_value=None)
+
+        watch = ChildrenStatWatch(kazoo_client, "/lighthouse/webapp", func)
+
+        kazoo_client.get_children.assert_called_once_with(
+            "/lighthouse/webapp", watch=watch.handle_event, include_data=True
+        )
+        func.assert_called_once_with(["app01"], stat)
+
+        watch.handle_event(WatchedEvent(EventType.NONE, None, None))
+
+        self.assertEqual(func.call_count, 1)
+
+        watch.handle_event(
+            WatchedEvent(EventType.CHILD, None, "/lighthouse/webapp")
+        )
+
+        self.assertEqual(func.call_count, 2)
+
+    def test_stops_when_func_returns_false(self):
+        kazoo_client = Mock()
+        kazoo_client.get_children.return_value = ([], Mock())
+        func = Mock(return_value=False)
+
+        watch = ChildrenStatWatch(kazoo_client, "/lighthouse/webapp", func)
+        watch.handle_event(
+            WatchedEvent(EventType.CHILD, None, "/lighthouse/webapp")
+        )
+
+        self.assertEqual(func.call_count, 1)
+        kazoo_client.remove_listener.assert_called_once_with(
+            watch.handle_connection_change
+        )
+
+    def test_stops_when_znode_is_gone(self):
+        kazoo_client = Mock()
+        kazoo_client.get_children.side_effect = exceptions.NoNodeError
+        func = Mock()
+
+        watch = ChildrenStatWatch(kazoo_client, "/lighthouse/webapp", func)
+
+        self.assertTrue(watch.stopped)
+        self.assertFalse(func.called)
+
+    def test_rereads_once_reconnected(self):
+        kazoo_client = Mock()
+        kazoo_client.get_children.side_effect = exceptions.ConnectionLoss
+        func = Mock(return_value=None)
+
+        watch = ChildrenStatWatch(kazoo_client, "/lighthouse/webapp", func)
+
+        self.assertFalse(watch.stopped)
+        self.assertFalse(func.called)
+
+        watch.handle_connection_change(client.KazooState.CONNECTED)
+
+        kazoo_client.handler.spawn.assert_called_once_with(
+            watch.get_children
+        )
+
+        kazoo_client.get_children.side_effect = None
+        kazoo_client.get_children.return_value = (["app01"], Mock())
+        watch.get_children()
+        kazoo_client.handler.spawn.reset_mock()
+
+        watch.handle_connection_change(client.KazooState.CONNECTED)
+
+        self.assertFalse(kazoo_client.handler.spawn.called)
+
+        watch.handle_connection_change(client.KazooState.SUSPENDED)
+        watch.handle_connection_change(client.KazooState.CONNECTED)
+
+        kazoo_client.handler.spawn.assert_called_once_with(
+            watch.get_children
+        )